@@ -1,199 +1,402 @@
-from fastapi import FastAPI, UploadFile, File
+from fastapi import FastAPI, UploadFile, File, Request, Response, HTTPException
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse
+from starlette.datastructures import Headers
+from starlette.exceptions import HTTPException as StarletteHTTPException
 import json
-import numpy as np
-from PIL import Image
-from VehicleDetectionTracker.VehicleDetectionTracker import VehicleDetectionTracker
-from fastanpr import FastANPR
 import asyncio
-from io import BytesIO
+import logging
 import os
-from datetime import datetime
+import time
+from contextlib import asynccontextmanager, contextmanager
+from model_registry import ModelRegistry
+from batch_scheduler import MicroBatchScheduler
+from image_decoder import Prefetcher
+from pipeline import analyze_detections, decode_image, detect_vehicles_batch, result_version, scale_result
+from request_profiler import RequestProfiler
+from result_cache import ResultCache
+from VehicleDetectionTracker.instrumentation import metrics
+
+# Uygulama açılışında zamanlayıcıyı başlatma ve modelleri arka planda yükleyip ısındırma; kapanırken
+# zamanlayıcıyı durdurma, dedektör iş parçacıklarını ve önbelleği kapatma
+@asynccontextmanager
+async def lifespan(app):
+    await scheduler.start()
+    startup["task"] = asyncio.create_task(prepare_models())
+    try:
+        yield
+    finally:
+        await scheduler.stop()
+        await asyncio.get_running_loop().run_in_executor(None, registry.close)
+        result_cache.close()
 
 # FastAPI uygulamasını oluşturuyoruz
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
+logger = logging.getLogger(__name__)
+
+# Aşama süreleri ve sayaçlar /metrics altında Prometheus biçiminde sunulur (VRS_METRICS=0 ile kapatılır)
+metrics.enable(os.environ.get("VRS_METRICS", "1") == "1")
+metrics.histogram("vrs_request_seconds", "Latency of the API endpoints.")
+metrics.counter("vrs_requests_total", "Requests per endpoint.")
+metrics.counter("vrs_images_total", "Images analyzed per endpoint.")
+
+# Modeller süreç başına bir kez yüklenir ve istekler arasında paylaşılır
+registry = ModelRegistry(model_path=os.environ.get("VRS_DETECTOR_MODEL", "yolov8n.pt"),
+                         pool_size=int(os.environ.get("VRS_DETECTOR_POOL_SIZE", "1")))
+
+# Aynı görüntü içeriği ve model sürümleri için sonuç önbelleği (bellekte LRU, isteğe bağlı SQLite)
+result_cache = ResultCache(max_bytes=int(float(os.environ.get("VRS_CACHE_MAX_MB", "64")) * 1024 * 1024),
+                           sqlite_path=os.environ.get("VRS_CACHE_DB") or None)
+
+# İstek bazında isteğe bağlı profil çıkarma (X-Profile: 1 başlığı veya ?profile=1), dakikada sınırlı sayıda
+profiler = RequestProfiler(directory=os.environ.get("VRS_PROFILE_DIR", "profiles"),
+                           max_per_minute=int(os.environ.get("VRS_PROFILE_MAX_PER_MINUTE", "6")),
+                           max_profiles=int(os.environ.get("VRS_PROFILE_MAX_STORED", "100")))
+
+# Birden fazla görüntü için araç ve plaka analizi: YOLO, sınıflandırıcılar ve FastANPR tüm grup için birer kez çalışır
+async def analyze_images(img_arrays):
+    loop = asyncio.get_running_loop()
+    with registry.detector() as vehicle_detection:
+        with metrics.timer("detect_batch"):
+            detection_results = await loop.run_in_executor(None, detect_vehicles_batch, vehicle_detection, img_arrays)
+    with metrics.timer("analyze_plates"):
+        return await analyze_detections(registry.fast_anpr, img_arrays, detection_results)
+
+# İstekler arası dinamik mikro-gruplama; havuzdaki her dedektör için bir grup aynı anda çalışabilir
+scheduler = MicroBatchScheduler(analyze_images,
+                                max_batch_size=int(os.environ.get("VRS_BATCH_MAX_SIZE", "8")),
+                                max_latency_ms=float(os.environ.get("VRS_BATCH_MAX_LATENCY_MS", "20")),
+                                max_concurrent_batches=registry.pool_size)
+
+# Tek bir görüntü için araç ve plaka analizi
+async def analyze_image(img_array):
+    return await scheduler.submit(img_array)
+
+# Devam eden analizler; aynı içerik aynı anda birden fazla kez gönderilirse tek kez işlenir
+pending_results = {}
+
+# Önbellek anahtarları ve önbellekteki sonuçlar; model dosyalarının özeti, görüntü özetleri ve SQLite okuması
+# olay döngüsünü bloklamamak için iş parçacığında yapılır
+def lookup_cached(contents_list):
+    version = result_version(registry)
+    keys = [ResultCache.key(contents, version) for contents in contents_list]
+    return keys, [result_cache.get(key) for key in keys]
+
+# Sonuçları önbelleğe yazma (SQLite yazması da olabileceğinden iş parçacığında çağrılır)
+def store_cached(results):
+    for key, result in results.items():
+        result_cache.put(key, result)
+
+async def analyze_and_cache(key, contents):
+    # Çözme olay döngüsünü bloklamamak için iş parçacığında yapılır
+    loop = asyncio.get_running_loop()
+    decoded = await loop.run_in_executor(None, decode_image, contents)
+    result = scale_result(await analyze_image(decoded.image), decoded.scale)
+    await loop.run_in_executor(None, store_cached, {key: result})
+    return result
+
+# Görüntü baytları için önbellekli analiz
+async def analyze_contents(contents):
+    with metrics.timer("cache_lookup"):
+        (key,), (result,) = await asyncio.get_running_loop().run_in_executor(None, lookup_cached, [contents])
+    if result is not None:
+        return result
+    pending = pending_results.get(key)
+    if pending is None:
+        pending = pending_results[key] = asyncio.ensure_future(analyze_and_cache(key, contents))
+        pending.add_done_callback(lambda _: pending_results.pop(key, None))
+    return await asyncio.shield(pending)
+
+# Toplu yükleme (/process_batch/) sınırları: dosya sayısı ve toplam boyut
+batch_max_files = int(os.environ.get("VRS_UPLOAD_MAX_FILES", "64"))
+batch_max_bytes = int(float(os.environ.get("VRS_UPLOAD_MAX_MB", "100")) * 1024 * 1024)
+
+# Yükleme boyutu sınırı gövde ayrıştırılmadan önce uygulanır: Content-Length sınırı aşan istek hiç okunmadan,
+# Content-Length'siz (chunked) istek ise akış sırasında sınır aşıldığı anda 413 ile reddedilir
+class UploadLimitMiddleware:
+    def __init__(self, app, paths, max_bytes):
+        self.app = app
+        self.paths = set(paths)
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+        detail = f"Request larger than {self.max_bytes} bytes"
+        content_length = Headers(scope=scope).get("content-length")
+        if content_length and content_length.isdigit() and int(content_length) > self.max_bytes:
+            await JSONResponse({"detail": detail}, status_code=413)(scope, receive, send)
+            return
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    raise HTTPException(status_code=413, detail=detail)
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+app.add_middleware(UploadLimitMiddleware, paths={"/process_batch/"}, max_bytes=batch_max_bytes)
+
+# /process_batch/ gövdesini kendisi ayrıştırdığı için OpenAPI şeması elle verilir
+batch_request_body = {"requestBody": {"required": True, "content": {"multipart/form-data": {"schema": {
+    "type": "object", "required": ["files"],
+    "properties": {"files": {"type": "array", "items": {"type": "string", "format": "binary"}}}}}}}}
+
+# Çok parçalı gövdenin ayrıştırılması; dosya sayısı sınırı aşılınca Starlette kalan gövdeyi okumadan durur
+async def read_batch_form(request):
+    try:
+        return await request.form(max_files=batch_max_files)
+    except StarletteHTTPException as e:
+        if str(e.detail).startswith("Too many files"):
+            raise HTTPException(status_code=413, detail=f"At most {batch_max_files} images per request")
+        raise
+
+# Çözülmüş görüntülerde araç tespiti: YOLO ve sınıflandırıcılar zamanlayıcının grup boyutunda parçalar halinde çalışır
+def detect_decoded(decoded):
+    img_arrays = [image.image for image in decoded]
+    detection_results = []
+    with registry.detector() as vehicle_detection:
+        for start in range(0, len(img_arrays), scheduler.max_batch_size):
+            detection_results.extend(
+                detect_vehicles_batch(vehicle_detection, img_arrays[start:start + scheduler.max_batch_size]))
+    return img_arrays, detection_results
+
+# Bir istekteki tüm görüntülerin birlikte analizi; mikro-gruplama beklemeden doğrudan çalışır ve
+# FastANPR önbellekte olmayan tüm görüntüler için tek bir çağrıyla çalışır
+async def analyze_batch(contents_list):
+    loop = asyncio.get_running_loop()
+    with metrics.timer("cache_lookup"):
+        keys, results = await loop.run_in_executor(None, lookup_cached, contents_list)
+    # Önbellekte olmayan görüntüler; aynı içerik bir kez işlenir
+    missing = {}
+    for index, key in enumerate(keys):
+        if results[index] is None:
+            missing.setdefault(key, index)
+    if missing:
+        decoded = await asyncio.gather(*(loop.run_in_executor(None, decode_image, contents_list[index])
+                                         for index in missing.values()))
+        with metrics.timer("detect_batch"):
+            img_arrays, detection_results = await loop.run_in_executor(None, detect_decoded, decoded)
+        with metrics.timer("analyze_plates"):
+            analyzed = await analyze_detections(registry.fast_anpr, img_arrays, detection_results)
+        analyzed = {key: scale_result(result, image.scale) for key, image, result in zip(missing, decoded, analyzed)}
+        await loop.run_in_executor(None, store_cached, analyzed)
+        results = [result if result is not None else analyzed[key] for key, result in zip(keys, results)]
+    return results
+
+# Açılışta modeller yüklendikten sonra örnek görüntülerle ısındırılır (VRS_WARMUP=0 ile yalnızca yüklenir);
+# bu bitene kadar /ready 503 döner, böylece yük dengeleyici ilk istekleri soğuk modellere göndermez
+warm_up_enabled = os.environ.get("VRS_WARMUP", "1") == "1"
+startup = {"task": None, "error": None}
+
+def service_ready():
+    return registry.ready if warm_up_enabled else registry.loaded
+
+async def prepare_models():
+    loop = asyncio.get_running_loop()
+    try:
+        await loop.run_in_executor(None, registry.warm_up if warm_up_enabled else registry.load)
+    except Exception as e:
+        startup["error"] = f"{type(e).__name__}: {e}"
+        logger.exception("Model loading or warm-up failed")
+
+# Profil çıkarılan isteklerde analiz tek bir iş parçacığında, önbellek ve mikro-gruplama olmadan yapılır;
+# böylece profil yalnızca bu isteğin çözme, YOLO, sınıflandırıcı ve FastANPR çalışmasını içerir
+def analyze_contents_profiled(contents_list):
+    results = []
+    for start in range(0, len(contents_list), scheduler.max_batch_size):
+        decoded = [decode_image(contents) for contents in contents_list[start:start + scheduler.max_batch_size]]
+        img_arrays = [image.image for image in decoded]
+        with registry.detector() as vehicle_detection:
+            detection_results = detect_vehicles_batch(vehicle_detection, img_arrays)
+        batch_results = asyncio.run(analyze_detections(registry.fast_anpr, img_arrays, detection_results))
+        results.extend(scale_result(result, image.scale) for result, image in zip(batch_results, decoded))
+    return results
+
+# İstek profil isterse ve sınır aşılmadıysa profil kimliğini döndürme
+def profile_request_id(request, response):
+    flag = request.headers.get("x-profile") or request.query_params.get("profile")
+    if flag not in ("1", "true", "yes"):
+        return None
+    if not profiler.allow():
+        response.headers["X-Profile"] = "rate-limited"
+        return None
+    request_id = profiler.new_id(request.headers.get("x-request-id"))
+    response.headers["X-Profile"] = "captured"
+    response.headers["X-Profile-Id"] = request_id
+    return request_id
+
+# Görüntü baytlarını profil çıkararak analiz etme
+async def analyze_with_profile(request_id, endpoint, contents_list):
+    if not registry.loaded:
+        await asyncio.get_running_loop().run_in_executor(None, registry.load)
+    metadata = {"endpoint": endpoint, "images": len(contents_list), "bytes": sum(map(len, contents_list))}
+    return await asyncio.get_running_loop().run_in_executor(
+        None, lambda: profiler.profile(request_id, analyze_contents_profiled, contents_list, metadata=metadata))
+
+# Önbellek, zamanlayıcı ve model yükleme değerleri /metrics çıktısına okuma anında eklenir
+def collect_service_metrics():
+    cache = result_cache.stats()
+    batching = scheduler.stats()
+    return [
+        ("vrs_cache_hits_total", "counter", "Result cache hits (memory and disk).", [({}, cache["hits"])]),
+        ("vrs_cache_disk_hits_total", "counter", "Result cache hits served from SQLite.", [({}, cache["disk_hits"])]),
+        ("vrs_cache_misses_total", "counter", "Result cache misses.", [({}, cache["misses"])]),
+        ("vrs_cache_evictions_total", "counter", "Results evicted from the in-memory cache.", [({}, cache["evictions"])]),
+        ("vrs_cache_memory_bytes", "gauge", "Serialized results held in memory.", [({}, cache["memory_bytes"])]),
+        ("vrs_batch_queue_depth", "gauge", "Images waiting for the micro-batch scheduler.", [({}, batching["queue_depth"])]),
+        ("vrs_batches_total", "counter", "Batches run by the micro-batch scheduler.", [({}, batching["batches"])]),
+        ("vrs_batch_items_total", "counter", "Images run by the micro-batch scheduler.", [({}, batching["items"])]),
+        ("vrs_model_load_seconds", "gauge", "Time spent loading each model.",
+         [({"model": name}, seconds) for name, seconds in registry.load_times.items()]),
+        ("vrs_model_warm_up_seconds", "gauge", "Time spent on the warm-up inference of each model.",
+         [({"model": name}, seconds) for name, seconds in registry.warm_up_times.items()]),
+        ("vrs_ready", "gauge", "Whether the models are loaded and warmed up.", [({}, int(service_ready()))]),
+    ]
+
+metrics.register_collector(collect_service_metrics)
+
+# Uç noktaların süre ve istek sayısı ölçümü
+@contextmanager
+def endpoint_timer(endpoint, images=1):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.observe("vrs_request_seconds", time.perf_counter() - start, endpoint=endpoint)
+        metrics.inc("vrs_requests_total", endpoint=endpoint)
+        metrics.inc("vrs_images_total", images, endpoint=endpoint)
 
-# Araç türleri
-vehicle_types_to_display = {"car", "bus", "truck", "minibus", "lorry", "motorcycle", "ship", "taxi"}
+# Canlılık: süreç ayakta ve istek kabul ediyor (modellerin durumundan bağımsız)
+@app.get("/healthz")
+async def healthz():
+    return {"status": "ok"}
 
-# Araç tespit fonksiyonu
-def detect_vehicles(vehicle_detection, img_array):
-    response = vehicle_detection.process_frame(img_array, datetime.now())
-    if 'detected_vehicles' in response and response['detected_vehicles']:
-        return response
-    return None
+# Hazırlık: modeller yüklenip ısındırıldıysa 200, aksi halde 503
+@app.get("/ready")
+async def ready():
+    body = {
+        "ready": service_ready(),
+        "loaded": registry.loaded,
+        "warm_up": warm_up_enabled,
+        "warm_up_times_seconds": {name: round(seconds, 3) for name, seconds in registry.warm_up_times.items()},
+        "error": startup["error"],
+    }
+    return JSONResponse(body, status_code=200 if body["ready"] else 503)
 
-# Plaka tanıma fonksiyonu
-async def recognize_plates(fast_anpr, image_arrays):
-    number_plates = await fast_anpr.run(image_arrays)
-    return number_plates
+# Yüklü modeller ve yükleme süreleri
+@app.get("/models/")
+async def models_info():
+    return registry.describe()
+
+# Mikro-gruplama kuyruğu ve grup boyutu istatistikleri
+@app.get("/scheduler/stats")
+async def scheduler_stats():
+    return scheduler.stats()
+
+# Sonuç önbelleği isabet/ıskalama sayaçları
+@app.get("/cache/stats")
+async def cache_stats():
+    return result_cache.stats()
+
+# Prometheus biçiminde ölçümler
+@app.get("/metrics")
+async def metrics_endpoint():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+# Kaydedilmiş profillerin listesi ve sınırlayıcı durumu
+@app.get("/profiles/")
+async def list_profiles():
+    return {"profiler": profiler.stats(), "profiles": profiler.list()}
+
+# Tek bir profil: metin özeti (varsayılan), ham cProfile dosyası (format=prof) veya üst veri (format=json)
+@app.get("/profiles/{request_id}")
+async def get_profile(request_id: str, format: str = "txt"):
+    path = profiler.path(request_id, format)
+    if path is None:
+        raise HTTPException(status_code=404, detail=f"Profile not found: {request_id}")
+    if format == "txt":
+        with open(path) as f:
+            return PlainTextResponse(f.read())
+    media_type = "application/json" if format == "json" else "application/octet-stream"
+    return FileResponse(path, media_type=media_type, filename=os.path.basename(path))
 
 # Resim işleme endpoint'i (Fotoğraf Yükleme)
 @app.post("/process_image/")
-async def process_image(file: UploadFile = File(...)):
-    contents = await file.read()
-    img = Image.open(BytesIO(contents)).convert('RGB')
-    img_array = np.array(img)
-
-    vehicle_detection = VehicleDetectionTracker()
-    fast_anpr = FastANPR()
-
-    detection_result = detect_vehicles(vehicle_detection, img_array)
-    result_data = {"vehicles": [], "plates": []}
-    vehicles_info = []
-    plates_info = []
-
-    if detection_result:
-        cropped_images = []
-        for vehicle in detection_result['detected_vehicles']:
-            vehicle_type = vehicle.get("vehicle_type", "").lower()
-            if vehicle_type not in vehicle_types_to_display:
-                continue
-            bbox = vehicle["vehicle_coordinates"]
-            x, y, w, h = int(bbox["x"]), int(bbox["y"]), int(bbox["width"]), int(bbox["height"])
-            cropped_vehicle = img_array[int(y - h / 2):int(y + h / 2), int(x - w / 2):int(x + w / 2)]
-            if cropped_vehicle.size > 0:
-                cropped_images.append(cropped_vehicle)
-                vehicles_info.append({
-                    "vehicle_id": vehicle["vehicle_id"],
-                    "vehicle_type": vehicle["vehicle_type"],
-                    "detection_confidence": vehicle["detection_confidence"],
-                    "color_info": vehicle.get("color_info", "Unknown"),
-                    "model_info": vehicle.get("model_info", "Unknown"),
-                    "bbox": {"x": x, "y": y, "width": w, "height": h}
-                })
-
-        number_plates = await recognize_plates(fast_anpr, cropped_images)
-        plates_info_dict = {}
-        for idx, plates in enumerate(number_plates):
-            vehicle_id = detection_result['detected_vehicles'][idx]["vehicle_id"]
-            for plate in plates:
-                bbox = plate.det_box if plate.det_box is not None else [0, 0, 0, 0]
-                plates_info_dict[vehicle_id] = {
-                    "recognition_text": plate.rec_text,
-                    "recognition_confidence": round(plate.rec_conf, 2) if plate.rec_conf is not None else None,
-                    "detection_bbox": {"xmin": bbox[0], "ymin": bbox[1], "xmax": bbox[2], "ymax": bbox[3]}
-                }
-
-        for vehicle in vehicles_info:
-            vehicle_id = vehicle["vehicle_id"]
-            plate_info = plates_info_dict.get(vehicle_id, {})
-            vehicle.update(plate_info)
-        result_data["vehicles"] = vehicles_info
-
-        if not any(vehicle.get("recognition_text") for vehicle in vehicles_info):
-            original_number_plates = await recognize_plates(fast_anpr, [img_array])
-            for plate in original_number_plates[0]:
-                bbox = plate.det_box if plate.det_box is not None else [0, 0, 0, 0]
-                plates_info.append({
-                    "recognition_text": plate.rec_text,
-                    "recognition_confidence": round(plate.rec_conf, 2) if plate.rec_conf is not None else None,
-                    "detection_bbox": {"xmin": bbox[0], "ymin": bbox[1], "xmax": bbox[2], "ymax": bbox[3]}
-                })
-            result_data["plates"] = plates_info
-
-    else:
-        number_plates = await recognize_plates(fast_anpr, [img_array])
-        plates_result = []
-        for plates in number_plates:
-            for plate in plates:
-                bbox = plate.det_box if plate.det_box is not None else [0, 0, 0, 0]
-                plates_result.append({
-                    "recognition_text": plate.rec_text,
-                    "recognition_confidence": round(plate.rec_conf, 2) if plate.rec_conf is not None else None,
-                    "detection_bbox": {"xmin": bbox[0], "ymin": bbox[1], "xmax": bbox[2], "ymax": bbox[3]}
-                })
-        result_data["plates"] = plates_result
-
-    return result_data
+async def process_image(request: Request, response: Response, file: UploadFile = File(...)):
+    with endpoint_timer("process_image"):
+        contents = await file.read()
+        request_id = profile_request_id(request, response)
+        if request_id is not None:
+            return (await analyze_with_profile(request_id, "process_image", [contents]))[0]
+        return await analyze_contents(contents)
+
+
+# Çoklu resim işleme endpoint'i: tek bir multipart istekte birden fazla fotoğraf, sonuçlar dosya adına göre döner
+# Boyut ve dosya sayısı sınırları gövde ayrıştırılırken uygulanır (UploadLimitMiddleware ve read_batch_form)
+@app.post("/process_batch/", openapi_extra=batch_request_body)
+async def process_batch(request: Request, response: Response):
+    form = await read_batch_form(request)
+    try:
+        files = [value for value in form.getlist("files") if not isinstance(value, str)]
+        if not files:
+            raise HTTPException(status_code=400, detail="No images in the 'files' field")
+        filenames = [file.filename or f"image_{index}" for index, file in enumerate(files)]
+        if len(set(filenames)) != len(filenames):
+            raise HTTPException(status_code=400, detail="Filenames must be unique")
+
+        with endpoint_timer("process_batch", images=len(files)):
+            contents_list = [await file.read() for file in files]
+            request_id = profile_request_id(request, response)
+            if request_id is not None:
+                results = await analyze_with_profile(request_id, "process_batch", contents_list)
+            else:
+                results = await analyze_batch(contents_list)
+        return dict(zip(filenames, results))
+    finally:
+        await form.close()
 
 
 # JSON işleme endpoint'i (JSON içindeki filePath'lerle çalışma)
 @app.post("/process_json/")
-async def process_json(file: UploadFile = File(...)):
+async def process_json(request: Request, response: Response, file: UploadFile = File(...)):
     contents = await file.read()
     data = json.loads(contents)
 
-    results = []
     for entry in data:
         file_path = entry["filePath"]
 
         if not os.path.exists(file_path):
             return {"error": f"File not found: {file_path}"}
 
-        img = Image.open(file_path).convert('RGB')
-        img_array = np.array(img)
-
-        vehicle_detection = VehicleDetectionTracker()
-        fast_anpr = FastANPR()
-
-        detection_result = detect_vehicles(vehicle_detection, img_array)
-        result_data = {"vehicles": [], "plates": []}
-        vehicles_info = []
-        plates_info = []
-
-        if detection_result:
-            cropped_images = []
-            for vehicle in detection_result['detected_vehicles']:
-                vehicle_type = vehicle.get("vehicle_type", "").lower()
-                if vehicle_type not in vehicle_types_to_display:
-                    continue
-                bbox = vehicle["vehicle_coordinates"]
-                x, y, w, h = int(bbox["x"]), int(bbox["y"]), int(bbox["width"]), int(bbox["height"])
-                cropped_vehicle = img_array[int(y - h / 2):int(y + h / 2), int(x - w / 2):int(x + w / 2)]
-                if cropped_vehicle.size > 0:
-                    cropped_images.append(cropped_vehicle)
-                    vehicles_info.append({
-                        "vehicle_id": vehicle["vehicle_id"],
-                        "vehicle_type": vehicle["vehicle_type"],
-                        "detection_confidence": vehicle["detection_confidence"],
-                        "color_info": vehicle.get("color_info", "Unknown"),
-                        "model_info": vehicle.get("model_info", "Unknown"),
-                        "bbox": {"x": x, "y": y, "width": w, "height": h}
-                    })
-
-            number_plates = await recognize_plates(fast_anpr, cropped_images)
-            plates_info_dict = {}
-            for idx, plates in enumerate(number_plates):
-                vehicle_id = detection_result['detected_vehicles'][idx]["vehicle_id"]
-                for plate in plates:
-                    bbox = plate.det_box if plate.det_box is not None else [0, 0, 0, 0]
-                    plates_info_dict[vehicle_id] = {
-                        "recognition_text": plate.rec_text,
-                        "recognition_confidence": round(plate.rec_conf, 2) if plate.rec_conf is not None else None,
-                        "detection_bbox": {"xmin": bbox[0], "ymin": bbox[1], "xmax": bbox[2], "ymax": bbox[3]}
-                    }
-
-            for vehicle in vehicles_info:
-                vehicle_id = vehicle["vehicle_id"]
-                plate_info = plates_info_dict.get(vehicle_id, {})
-                vehicle.update(plate_info)
-            result_data["vehicles"] = vehicles_info
-
-            if not any(vehicle.get("recognition_text") for vehicle in vehicles_info):
-                original_number_plates = await recognize_plates(fast_anpr, [img_array])
-                for plate in original_number_plates[0]:
-                    bbox = plate.det_box if plate.det_box is not None else [0, 0, 0, 0]
-                    plates_info.append({
-                        "recognition_text": plate.rec_text,
-                        "recognition_confidence": round(plate.rec_conf, 2) if plate.rec_conf is not None else None,
-                        "detection_bbox": {"xmin": bbox[0], "ymin": bbox[1], "xmax": bbox[2], "ymax": bbox[3]}
-                    })
-                result_data["plates"] = plates_info
-
-        else:
-            number_plates = await recognize_plates(fast_anpr, [img_array])
-            plates_result = []
-            for plates in number_plates:
-                for plate in plates:
-                    bbox = plate.det_box if plate.det_box is not None else [0, 0, 0, 0]
-                    plates_result.append({
-                        "recognition_text": plate.rec_text,
-                        "recognition_confidence": round(plate.rec_conf, 2) if plate.rec_conf is not None else None,
-                        "detection_bbox": {"xmin": bbox[0], "ymin": bbox[1], "xmax": bbox[2], "ymax": bbox[3]}
-                    })
-            result_data["plates"] = plates_result
-
-        results.append(result_data)
+    with endpoint_timer("process_json", images=len(data)):
+        # Profil istenirse tüm girdiler tek iş parçacığında, önbellek kullanılmadan işlenir
+        request_id = profile_request_id(request, response)
+        if request_id is not None:
+            contents_list = []
+            for entry in data:
+                with open(entry["filePath"], 'rb') as image_file:
+                    contents_list.append(image_file.read())
+            return await analyze_with_profile(request_id, "process_json", contents_list)
+
+        # Girdiler zamanlayıcıya birlikte gönderilir, böylece aynı grupta işlenirler;
+        # önbellekte olan veya aynı grupta tekrar eden görüntüler yeniden işlenmez.
+        # Sonraki grubun dosyaları bu grup işlenirken iş parçacıklarında okunur
+        results = []
+        contents_list = []
+        with Prefetcher([entry["filePath"] for entry in data], depth=2 * scheduler.max_batch_size) as files:
+            async for contents in files:
+                contents_list.append(contents)
+                if len(contents_list) == scheduler.max_batch_size:
+                    results.extend(await asyncio.gather(*(analyze_contents(contents) for contents in contents_list)))
+                    contents_list = []
+        if contents_list:
+            results.extend(await asyncio.gather(*(analyze_contents(contents) for contents in contents_list)))
 
     return results
 
@@ -0,0 +1,267 @@
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import multiprocessing
+import os
+import time
+
+import numpy as np
+
+from pipeline import analyze_detections, decode_image, detect_vehicles_batch, result_version, scale_result
+from result_cache import ResultCache
+from result_log import JsonlWriter, completed_keys, jsonl_to_json, record_key
+
+logger = logging.getLogger(__name__)
+
+# Models, result cache and event loop of the current worker process, set up once by `_init_worker`
+_worker = {}
+
+
+def threads_per_worker(workers):
+    """
+    CPU threads each of `workers` processes may use without oversubscribing the machine.
+    """
+    return max(1, (os.cpu_count() or 1) // max(1, int(workers)))
+
+
+def _init_worker(model_path, cache_path=None, cache_max_bytes=64 * 1024 * 1024, threads=1):
+    """
+    Pool initializer: load every model once per worker process.
+
+    The thread pools of torch, OpenCV and the classifier backend are limited to `threads`, so the
+    workers together use about one thread per core instead of one pool per core each.
+    """
+    import cv2
+    import torch
+    from model_registry import ModelRegistry
+
+    torch.set_num_threads(threads)
+    cv2.setNumThreads(threads)
+    registry = ModelRegistry(model_path=model_path, intra_op_threads=threads, inter_op_threads=1).load()
+    _worker["registry"] = registry
+    _worker["version"] = result_version(registry)
+    # The SQLite store is shared by all workers; the in-memory part is per worker
+    _worker["cache"] = ResultCache(max_bytes=cache_max_bytes, sqlite_path=cache_path)
+    _worker["loop"] = asyncio.new_event_loop()
+
+
+def _record_error(record, error):
+    logger.error("Failed to process %s", record["filePath"], exc_info=error)
+    record.update({"vehicles": [], "plates": [], "error": f"{type(error).__name__}: {error}"})
+
+
+def _process_entries(items):
+    """
+    Analyze a group of manifest entries in a worker.
+
+    The entries missing from the cache go through the detector and the classifiers in one batch and
+    through FastANPR in one call, as in /process_batch/. A file that cannot be read or decoded fails
+    only its own entry; a failing model call fails the uncached entries of the group.
+
+    Returns:
+        list of tuple: (index, result record, seconds spent on the entry, whether the result came from
+        the cache) per entry. The seconds of an entry are its share of the time spent on the group.
+    """
+    start = time.perf_counter()
+    registry = _worker["registry"]
+    cache = _worker["cache"]
+    records = []
+    cached = []
+    missing = []  # (position in the group, cache key, decoded image) of the entries to analyze
+    for index, entry in items:
+        record = {"index": index, "filePath": entry["filePath"], "docName": entry.get("DocName")}
+        records.append(record)
+        cached.append(False)
+        try:
+            with open(entry["filePath"], 'rb') as image_file:
+                contents = image_file.read()
+            key = ResultCache.key(contents, _worker["version"])
+            result = cache.get(key)
+            if result is not None:
+                record.update(result)
+                cached[-1] = True
+            else:
+                missing.append((len(records) - 1, key, decode_image(contents)))
+        except Exception as e:
+            _record_error(record, e)
+    if missing:
+        try:
+            img_arrays = [decoded.image for _, _, decoded in missing]
+            with registry.detector() as vehicle_detection:
+                detection_results = detect_vehicles_batch(vehicle_detection, img_arrays)
+            results = _worker["loop"].run_until_complete(
+                analyze_detections(registry.fast_anpr, img_arrays, detection_results))
+            for (position, key, decoded), result in zip(missing, results):
+                result = scale_result(result, decoded.scale)
+                cache.put(key, result)
+                records[position].update(result)
+        except Exception as e:
+            for position, _, _ in missing:
+                _record_error(records[position], e)
+    seconds = (time.perf_counter() - start) / max(1, len(records))
+    return [(record["index"], record, seconds, hit) for record, hit in zip(records, cached)]
+
+
+def _groups(items, size):
+    """
+    Split the (index, entry) pairs into lists of up to `size`.
+    """
+    items = iter(items)
+    while True:
+        group = list(itertools.islice(items, size))
+        if not group:
+            return
+        yield group
+
+
+def summarize(latencies, wall_seconds):
+    """
+    Throughput and per-entry latency of a batch run.
+
+    Args:
+        latencies (list of float): Seconds spent on each entry, measured in the workers.
+        wall_seconds (float): Duration of the whole run.
+    """
+    latencies_ms = np.asarray(latencies, dtype=np.float64) * 1000.0
+    if latencies_ms.size == 0:
+        return {"entries": 0, "wall_seconds": round(wall_seconds, 3), "images_per_second": 0.0}
+    return {
+        "entries": int(latencies_ms.size),
+        "wall_seconds": round(wall_seconds, 3),
+        "images_per_second": round(latencies_ms.size / wall_seconds, 3) if wall_seconds > 0 else None,
+        "latency_ms": {
+            "mean": round(float(latencies_ms.mean()), 1),
+            "p50": round(float(np.percentile(latencies_ms, 50)), 1),
+            "p95": round(float(np.percentile(latencies_ms, 95)), 1),
+            "max": round(float(latencies_ms.max()), 1),
+        },
+    }
+
+
+def iter_results(items, workers=None, model_path="yolov8n.pt", chunksize=8, cache_path=None,
+                 cache_max_bytes=64 * 1024 * 1024, threads=None):
+    """
+    Analyze manifest entries in a pool of worker processes.
+
+    Each worker loads the detector, both classifiers and FastANPR once in its initializer and then
+    processes groups of `chunksize` entries, each group with one detector batch and one FastANPR call.
+    Results are yielded in manifest order; a failing entry yields a record with an `error` field
+    instead of stopping the run.
+
+    Args:
+        items (iterable): (index in the manifest, entry) pairs; entries have `filePath` and `DocName`.
+        workers (int, optional): Number of worker processes; one per CPU core by default.
+        model_path (str): YOLO model used by every worker.
+        chunksize (int): Entries sent to a worker and analyzed together.
+        cache_path (str, optional): SQLite result cache shared by the workers and later runs.
+        cache_max_bytes (int): Size of the in-memory result cache of each worker.
+        threads (int, optional): CPU threads per worker; the cores divided among the workers by default.
+
+    Yields:
+        tuple: (result record, seconds spent on the entry, cache hit). Records carry the manifest `index`.
+    """
+    workers = max(1, int(workers or os.cpu_count() or 1))
+    threads = max(1, int(threads or threads_per_worker(workers)))
+    # Spawned workers do not inherit TensorFlow or torch state from the parent process
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(processes=workers, initializer=_init_worker,
+                      initargs=(model_path, cache_path, cache_max_bytes, threads)) as pool:
+        for group in pool.imap(_process_entries, _groups(items, max(1, int(chunksize)))):
+            for _, record, seconds, cached in group:
+                yield record, seconds, cached
+
+
+def run_batch(manifest_path, output_path, workers=None, model_path="yolov8n.pt", chunksize=8, resume=False,
+              legacy_output_path=None, fsync=False, cache_path=None, cache_max_bytes=64 * 1024 * 1024,
+              threads=None):
+    """
+    Analyze every entry of a manifest file and append the results to a JSON Lines log.
+
+    Every record is written and flushed as soon as its entry is done, so memory does not grow with
+    the job and an interrupted run keeps everything finished so far.
+
+    Args:
+        manifest_path (str): JSON array of entries with `filePath` and `DocName`.
+        output_path (str): JSON Lines result log, one record per entry.
+        resume (bool): Skip entries (same manifest index and `filePath`) already in the log; otherwise
+            the log is started over.
+        legacy_output_path (str, optional): Also write all results of the log as one JSON array at the end.
+        fsync (bool): Force every record to disk.
+        cache_path (str, optional): SQLite result cache; identical images are analyzed only once.
+        cache_max_bytes (int): Size of the in-memory result cache of each worker.
+        threads (int, optional): CPU threads per worker, see `iter_results`.
+
+    Returns:
+        dict: Throughput and latency summary, see `summarize`, plus the numbers of skipped entries and
+        cache hits.
+    """
+    with open(manifest_path, 'r') as json_file:
+        entries = json.load(json_file)
+    if resume:
+        done = completed_keys(output_path)
+    else:
+        done = set()
+        if os.path.exists(output_path):
+            os.remove(output_path)
+    items = [(index, entry) for index, entry in enumerate(entries)
+             if record_key(index, entry["filePath"]) not in done]
+
+    start = time.perf_counter()
+    latencies = []
+    cache_hits = 0
+    with JsonlWriter(output_path, fsync=fsync) as log:
+        if items:
+            for record, seconds, cached in iter_results(items, workers=workers, model_path=model_path,
+                                                        chunksize=chunksize, cache_path=cache_path,
+                                                        cache_max_bytes=cache_max_bytes, threads=threads):
+                log.write(record)
+                latencies.append(seconds)
+                cache_hits += cached
+    summary = summarize(latencies, time.perf_counter() - start)
+    summary["skipped"] = len(entries) - len(items)
+    summary["cache_hits"] = cache_hits
+    if legacy_output_path:
+        jsonl_to_json(output_path, legacy_output_path)
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Analyze the images of a manifest file (filePath, DocName) "
+                                                 "in parallel worker processes.")
+    parser.add_argument("manifest", help="JSON array of entries with filePath and DocName")
+    parser.add_argument("output", help="JSON Lines file the results are appended to")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="Number of worker processes (default: one per CPU core)")
+    parser.add_argument("--model", default=os.environ.get("VRS_DETECTOR_MODEL", "yolov8n.pt"),
+                        help="YOLO model file")
+    parser.add_argument("--chunksize", type=int, default=8,
+                        help="Entries sent to a worker and analyzed together (one detector batch and one "
+                             "FastANPR call)")
+    parser.add_argument("--resume", action="store_true",
+                        help="Skip entries already present in the output instead of starting over")
+    parser.add_argument("--legacy-json", metavar="PATH",
+                        help="Also convert the output to a single JSON array at the end")
+    parser.add_argument("--fsync", action="store_true", help="Force every record to disk")
+    parser.add_argument("--cache-db", default=os.environ.get("VRS_CACHE_DB") or None, metavar="PATH",
+                        help="SQLite result cache shared by the workers and kept between runs")
+    parser.add_argument("--cache-max-mb", type=float, default=float(os.environ.get("VRS_CACHE_MAX_MB", "64")),
+                        help="In-memory result cache size per worker")
+    parser.add_argument("--threads", type=int, default=None,
+                        help="CPU threads per worker (default: CPU cores divided by the number of workers)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    summary = run_batch(args.manifest, args.output, workers=args.workers, model_path=args.model,
+                        chunksize=args.chunksize, resume=args.resume, legacy_output_path=args.legacy_json,
+                        fsync=args.fsync, cache_path=args.cache_db,
+                        cache_max_bytes=int(args.cache_max_mb * 1024 * 1024), threads=args.threads)
+    print(f"Results saved to JSON Lines file: {args.output}")
+    if args.legacy_json:
+        print(f"Results saved to JSON file: {args.legacy_json}")
+    print(json.dumps(summary, indent=4))
+
+
+if __name__ == "__main__":
+    main()
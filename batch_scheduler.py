@@ -0,0 +1,145 @@
+import asyncio
+import time
+from collections import Counter
+
+
+class MicroBatchScheduler:
+    """
+    Collects concurrent requests into small batches for a batch handler.
+
+    Requests are queued by `submit()`. A single worker task takes the oldest request, waits at
+    most `max_latency_ms` for more to arrive (or until `max_batch_size` are queued) and passes
+    the payloads to `handler` in one call. The handler is a coroutine that receives a list of
+    payloads and must return a list of results in the same order; each result is sent back to
+    the request that submitted it. If the handler raises, or returns a different number of
+    results than payloads, every request of that batch gets an exception.
+
+    Up to `max_concurrent_batches` batches run at the same time, e.g. one per detector of a
+    `ModelRegistry` pool. While all of them are busy, new requests keep queuing and form the next
+    batch.
+    """
+
+    def __init__(self, handler, max_batch_size=8, max_latency_ms=20.0, max_concurrent_batches=1):
+        """
+        Args:
+            handler (coroutine function): Called with a list of payloads, returns a list of results.
+            max_batch_size (int): Largest batch passed to the handler.
+            max_latency_ms (float): How long the oldest request may wait for the batch to fill up.
+            max_concurrent_batches (int): Batches handled at the same time.
+        """
+        self.handler = handler
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_latency = max(0.0, float(max_latency_ms)) / 1000.0
+        self.max_concurrent_batches = max(1, int(max_concurrent_batches))
+        self._queue = None
+        self._worker = None
+        self._slots = None
+        self._running = set()  # Tasks of the batches being handled
+        self._batch_sizes = Counter()  # batch size -> number of batches of that size
+        self._items = 0
+        self._batches = 0
+        self._queue_wait_seconds = 0.0
+        self._handler_seconds = 0.0
+
+    async def start(self):
+        if self._worker is None:
+            self._queue = asyncio.Queue()
+            self._slots = asyncio.Semaphore(self.max_concurrent_batches)
+            self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        running = list(self._running)
+        for task in running:
+            task.cancel()
+        await asyncio.gather(*running, return_exceptions=True)
+
+    async def submit(self, payload):
+        """
+        Queue a payload and wait for its result.
+        """
+        if self._worker is None:
+            await self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((payload, future, time.perf_counter()))
+        return await future
+
+    async def _next_batch(self):
+        batch = [await self._queue.get()]
+        deadline = time.perf_counter() + self.max_latency
+        while len(batch) < self.max_batch_size:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            # A free slot is taken before the batch is formed, so requests that arrive while every
+            # slot is busy end up in the same, larger batch
+            await self._slots.acquire()
+            try:
+                batch = await self._next_batch()
+            except BaseException:
+                self._slots.release()
+                raise
+            task = asyncio.create_task(self._run_batch(batch))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _run_batch(self, batch):
+        started = time.perf_counter()
+        self._batches += 1
+        self._items += len(batch)
+        self._batch_sizes[len(batch)] += 1
+        self._queue_wait_seconds += sum(started - queued_at for _, _, queued_at in batch)
+        try:
+            results = await self.handler([payload for payload, _, _ in batch])
+            if len(results) != len(batch):
+                raise RuntimeError(f"Batch handler returned {len(results)} results for {len(batch)} payloads")
+        except BaseException as e:
+            # Every request of the batch is answered, also when the scheduler is stopped
+            error = e if isinstance(e, Exception) else RuntimeError("Scheduler stopped")
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(error)
+            if not isinstance(e, Exception):
+                raise
+        else:
+            for (_, future, _), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+        finally:
+            self._handler_seconds += time.perf_counter() - started
+            self._slots.release()
+
+    def stats(self):
+        """
+        Queue depth and batch-size statistics since start-up.
+        """
+        return {
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "max_batch_size": self.max_batch_size,
+            "max_latency_ms": self.max_latency * 1000.0,
+            "max_concurrent_batches": self.max_concurrent_batches,
+            "running_batches": len(self._running),
+            "batches": self._batches,
+            "items": self._items,
+            "mean_batch_size": self._items / self._batches if self._batches else 0.0,
+            "batch_size_histogram": {str(size): count for size, count in sorted(self._batch_sizes.items())},
+            "mean_queue_wait_ms": 1000.0 * self._queue_wait_seconds / self._items if self._items else 0.0,
+            "mean_batch_time_ms": 1000.0 * self._handler_seconds / self._batches if self._batches else 0.0,
+        }
@@ -0,0 +1,158 @@
+import asyncio
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from typing import NamedTuple
+
+import cv2
+import numpy as np
+from PIL import Image, ImageOps
+
+# Reduced-resolution JPEG decode flags, largest reduction first
+_REDUCED_FLAGS = ((8, cv2.IMREAD_REDUCED_COLOR_8), (4, cv2.IMREAD_REDUCED_COLOR_4), (2, cv2.IMREAD_REDUCED_COLOR_2))
+
+# Images are reduced only while their long side stays at or above this many pixels (0 disables reduction).
+# It is twice the detector input, so plates keep enough pixels for OCR.
+DEFAULT_TARGET_SIZE = int(os.environ.get("VRS_DECODE_TARGET_SIZE", "1280"))
+
+
+class DecodedImage(NamedTuple):
+    image: np.ndarray  # RGB, uint8, EXIF orientation applied
+    scale: int  # Pixels of the original image per pixel of `image`
+
+
+def image_header(contents):
+    """
+    Format and (width, height) of an encoded image, read from its header without decoding it.
+
+    Returns:
+        tuple: (format, (width, height)), or (None, None) if the header cannot be read.
+    """
+    try:
+        with Image.open(BytesIO(contents)) as img:
+            return img.format, img.size
+    except Exception:
+        return None, None
+
+
+def reduction_factor(size, target_size=DEFAULT_TARGET_SIZE):
+    """
+    Largest JPEG reduction (8, 4 or 2) that keeps the long side of `size` at or above `target_size`, or 1.
+    """
+    if not target_size or size is None:
+        return 1
+    long_side = max(size)
+    for factor, _ in _REDUCED_FLAGS:
+        if long_side // factor >= target_size:
+            return factor
+    return 1
+
+
+def decode(contents, target_size=DEFAULT_TARGET_SIZE):
+    """
+    Decode image bytes straight from the buffer into an RGB array.
+
+    JPEGs much larger than `target_size` are decoded at 1/2, 1/4 or 1/8 scale by libjpeg itself,
+    which is faster and allocates less than decoding at full size and resizing. EXIF orientation
+    is applied. Formats OpenCV cannot read (e.g. GIF) fall back to Pillow.
+
+    Args:
+        contents (bytes): Encoded image.
+        target_size (int): See `reduction_factor`; 0 always decodes at full size.
+
+    Returns:
+        DecodedImage: The image and its reduction factor; multiply coordinates by `scale` to map
+        them back to the original image.
+    """
+    image_format, size = image_header(contents)
+    factor = reduction_factor(size, target_size) if image_format in ("JPEG", "MPO") else 1
+    flags = dict(_REDUCED_FLAGS).get(factor, cv2.IMREAD_COLOR)
+    # imdecode applies the EXIF orientation at every reduction. `size` is the stored size, before
+    # rotation, but the factor only depends on the long side, which rotation keeps.
+    image = cv2.imdecode(np.frombuffer(contents, dtype=np.uint8), flags)
+    if image is None:
+        with Image.open(BytesIO(contents)) as img:
+            return DecodedImage(np.array(ImageOps.exif_transpose(img).convert("RGB")), 1)
+    # The channels are swapped in place, so decoding makes a single full-size allocation
+    cv2.cvtColor(image, cv2.COLOR_BGR2RGB, dst=image)
+    return DecodedImage(image, factor)
+
+
+def read_file(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+class Prefetcher:
+    """
+    Loads upcoming manifest entries on a thread pool while the caller works on earlier ones.
+
+    Meant for a single process working through a manifest, like the /process_json/ endpoint. The
+    batch runner does not need it: its worker processes already read their files in parallel.
+
+    At most `depth` loads are in flight or waiting to be consumed, so memory stays bounded however
+    long the manifest is. Results come back in input order. Both plain and `async for` iteration
+    are supported; the async form waits without blocking the event loop.
+
+    Example:
+        with Prefetcher(paths, read_file) as contents_list:
+            async for contents in contents_list:
+                ...
+    """
+
+    def __init__(self, items, load=read_file, workers=4, depth=8):
+        """
+        Args:
+            items (iterable): Inputs of `load`, e.g. file paths.
+            load (callable): Reads one item; runs on the thread pool.
+            workers (int): Loader threads.
+            depth (int): Items loaded ahead of the consumer.
+        """
+        self._items = iter(items)
+        self._load = load
+        self._depth = max(1, int(depth))
+        self._executor = ThreadPoolExecutor(max_workers=max(1, int(workers)), thread_name_prefix="prefetch")
+        self._pending = deque()
+        self._fill()
+
+    def _fill(self):
+        while len(self._pending) < self._depth:
+            try:
+                item = next(self._items)
+            except StopIteration:
+                return
+            self._pending.append(self._executor.submit(self._load, item))
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if not self._pending:
+            raise StopIteration
+        future = self._pending.popleft()
+        self._fill()
+        return future.result()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self._pending:
+            raise StopAsyncIteration
+        future = self._pending.popleft()
+        self._fill()
+        return await asyncio.wrap_future(future)
+
+    def close(self):
+        for future in self._pending:
+            future.cancel()
+        self._pending.clear()
+        self._executor.shutdown(wait=False)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
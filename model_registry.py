@@ -0,0 +1,248 @@
+import asyncio
+import hashlib
+import logging
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from importlib import metadata
+
+import numpy as np
+
+from VehicleDetectionTracker.VehicleDetectionTracker import VehicleDetectionTracker
+from VehicleDetectionTracker.color_classifier.classifier import Classifier as ColorClassifier
+from VehicleDetectionTracker.model_classifier.classifier import Classifier as ModelClassifier
+from VehicleDetectionTracker.color_classifier import config as color_config
+from VehicleDetectionTracker.model_classifier import config as model_config
+
+logger = logging.getLogger(__name__)
+
+
+def _file_version(path):
+    # Model files are identified by name and a hash of their content, so weights retrained to the same
+    # size or replaced in place never reuse results cached for the old ones
+    if not os.path.exists(path):
+        return os.path.basename(path)
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return f"{os.path.basename(path)}:{digest.hexdigest()[:16]}"
+
+
+def _package_version(name):
+    try:
+        return metadata.version(name)
+    except metadata.PackageNotFoundError:
+        return "unknown"
+
+
+class ModelRegistry:
+    """
+    Process-wide holder for the loaded models.
+
+    The YOLO detector, both classifiers and FastANPR are loaded once by `load()` and then handed
+    out to requests. YOLO objects keep predictor/tracker state, so the registry keeps a small pool
+    of detectors and gives each request exclusive use of one; the classifiers and FastANPR are
+    shared. Every detector is reset when it is checked out, so stateless image requests never see
+    tracks from an earlier request.
+    """
+
+    def __init__(self, model_path="yolov8n.pt", pool_size=1, intra_op_threads=None, inter_op_threads=None):
+        """
+        Args:
+            model_path (str): Path to the YOLO model file.
+            pool_size (int): Number of detector instances that can run at the same time.
+            intra_op_threads (int, optional): Threads inside one classifier operation; the classifier
+                configuration by default.
+            inter_op_threads (int, optional): Classifier operations run in parallel; the classifier
+                configuration by default.
+        """
+        self.model_path = model_path
+        self.pool_size = max(1, int(pool_size))
+        self.intra_op_threads = intra_op_threads
+        self.inter_op_threads = inter_op_threads
+        self.color_classifier = None
+        self.model_classifier = None
+        self.fast_anpr = None
+        self.load_times = {}  # Seconds spent loading each model
+        self.warm_up_times = {}  # Seconds spent on the warm-up inference of each model
+        self._detectors = queue.Queue()
+        self._load_lock = threading.Lock()
+        self._loaded = False
+        self._warm = False
+        self._version = None
+        self._file_versions = {}  # path -> name and content hash of the model files that exist
+
+    @property
+    def loaded(self):
+        return self._loaded
+
+    @property
+    def ready(self):
+        """
+        Whether the models are loaded and warmed up.
+        """
+        return self._loaded and self._warm
+
+    def _timed(self, name, loader):
+        start = time.perf_counter()
+        value = loader()
+        self.load_times[name] = self.load_times.get(name, 0.0) + time.perf_counter() - start
+        return value
+
+    def load(self):
+        """
+        Load every model once. Calling it again is a no-op.
+        """
+        with self._load_lock:
+            if self._loaded:
+                return self
+            # The frameworks are imported here, not at module import, so that importing the
+            # service (and tools that only need its configuration) stays fast
+            from fastanpr import FastANPR
+            from ultralytics import YOLO
+
+            threads = {"intra_op_threads": self.intra_op_threads, "inter_op_threads": self.inter_op_threads}
+            self.color_classifier = self._timed("color_classifier", lambda: ColorClassifier(**threads))
+            self.model_classifier = self._timed("model_classifier", lambda: ModelClassifier(**threads))
+            self.fast_anpr = self._timed("fast_anpr", FastANPR)
+            for _ in range(self.pool_size):
+                model = self._timed("detector", lambda: YOLO(self.model_path))
+                self._detectors.put(VehicleDetectionTracker(model=model,
+                                                            color_classifier=self.color_classifier,
+                                                            model_classifier=self.model_classifier))
+            self._loaded = True
+            for name, seconds in self.load_times.items():
+                logger.info("Loaded %s in %.2f s", name, seconds)
+            return self
+
+    def warm_up(self, image_sizes=((480, 640), (720, 1280)), seed=0):
+        """
+        Run dummy inputs through every model once, loading them first if needed.
+
+        The first inference of each model pays for one-off work: TensorFlow graph and session
+        setup, torch kernel selection, and the PaddleOCR setup inside FastANPR. The warm-up does
+        that work before any request arrives:
+
+        - every pooled detector gets images of the typical upload sizes
+        - both classifiers get a single crop and a full batch at their input sizes (224 and 128)
+        - FastANPR gets the images
+
+        The dummy images are seeded noise. They rarely contain vehicles, so the classifiers are
+        fed directly instead of through the detector.
+
+        Must not be called from a thread that runs an event loop, as FastANPR is driven with
+        `asyncio.run`.
+
+        Args:
+            image_sizes (tuple): (height, width) of the dummy images.
+            seed (int): Seed of the dummy images.
+
+        Returns:
+            dict: Seconds spent per model.
+        """
+        self.load()
+        rng = np.random.default_rng(seed)
+        images = [rng.integers(0, 256, (height, width, 3), dtype=np.uint8) for height, width in image_sizes]
+
+        def timed(name, function):
+            start = time.perf_counter()
+            function()
+            self.warm_up_times[name] = self.warm_up_times.get(name, 0.0) + time.perf_counter() - start
+
+        # Every pooled detector owns a predictor, so each one is warmed
+        detectors = [self._detectors.get() for _ in range(self.pool_size)]
+        try:
+            for vehicle_detection in detectors:
+                timed("detector", lambda: vehicle_detection.process_images(images, lean=True))
+                vehicle_detection.reset()
+        finally:
+            for vehicle_detection in detectors:
+                self._detectors.put(vehicle_detection)
+        for name, classifier in (("color_classifier", self.color_classifier),
+                                 ("model_classifier", self.model_classifier)):
+            crops = [rng.integers(0, 256, tuple(classifier.input_size) + (3,), dtype=np.uint8)
+                     for _ in range(classifier.max_batch_size)]
+            timed(name, lambda: (classifier.predict_proba_batch(crops[:1]), classifier.predict_proba_batch(crops)))
+        timed("fast_anpr", lambda: asyncio.run(self.fast_anpr.run(images)))
+        self._warm = True
+        for name, seconds in self.warm_up_times.items():
+            logger.info("Warmed up %s in %.2f s", name, seconds)
+        return dict(self.warm_up_times)
+
+    @contextmanager
+    def detector(self):
+        """
+        Check out a detector with fresh tracking state for the duration of the block.
+        """
+        if not self._loaded:
+            self.load()
+        vehicle_detection = self._detectors.get()
+        try:
+            vehicle_detection.reset()
+            yield vehicle_detection
+        finally:
+            self._detectors.put(vehicle_detection)
+
+    def close(self):
+        """
+        Stop the worker threads of the pooled detectors. Waits for detectors that are checked out.
+        """
+        for _ in range(self.pool_size if self._loaded else 0):
+            vehicle_detection = self._detectors.get()
+            try:
+                vehicle_detection.close()
+            finally:
+                self._detectors.put(vehicle_detection)
+
+    def version(self):
+        """
+        Identifier of the models in use, e.g. for keying cached results. It changes whenever the
+        content of a model file, the classifier backend or precision, or the version of ultralytics or
+        FastANPR changes, and does not require `load()`. The files are hashed once per registry, as
+        soon as all of them exist; until then a missing file (e.g. YOLO weights that `load()` has yet
+        to download) is identified by its name only and checked again on the next call.
+        """
+        if self._version is not None:
+            return self._version
+        files = {"detector": self.model_path, "color": color_config.model_file,
+                 "make_model": model_config.model_file}
+        parts = [f"{name}={self._file_version(path)}" for name, path in files.items()]
+        parts += [f"classifier_backend={color_config.backend}", f"classifier_precision={color_config.precision}"]
+        if color_config.precision == "int8":
+            # INT8 results come from the quantized files, which are made separately from the graphs
+            int8_files = {"color_int8": color_config.int8_onnx_file, "make_model_int8": model_config.int8_onnx_file}
+            parts += [f"{name}={self._file_version(path)}" for name, path in int8_files.items()]
+            files.update(int8_files)
+        parts += [f"ultralytics={_package_version('ultralytics')}", f"fastanpr={_package_version('fastanpr')}"]
+        version = ";".join(parts)
+        if all(path in self._file_versions for path in files.values()):
+            self._version = version
+        return version
+
+    def _file_version(self, path):
+        # Existing files are hashed once; a missing one is looked for again on every call
+        file_version = self._file_versions.get(path)
+        if file_version is None:
+            exists = os.path.exists(path)  # Checked first, so weights written meanwhile are hashed next time
+            file_version = _file_version(path)
+            if exists:
+                self._file_versions[path] = file_version
+        return file_version
+
+    def describe(self):
+        """
+        Summary of the loaded models, whether they are warmed up and how long loading and warm-up took.
+        """
+        return {
+            "loaded": self._loaded,
+            "ready": self.ready,
+            "detector_model": self.model_path,
+            "detector_pool_size": self.pool_size,
+            "version": self.version(),
+            "load_times_seconds": {name: round(seconds, 3) for name, seconds in self.load_times.items()},
+            "total_load_time_seconds": round(sum(self.load_times.values()), 3),
+            "warm_up_times_seconds": {name: round(seconds, 3) for name, seconds in self.warm_up_times.items()},
+        }
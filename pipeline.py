@@ -0,0 +1,99 @@
+import image_decoder
+from VehicleDetectionTracker.instrumentation import metrics
+from VehicleDetectionTracker.plate_association import associate_plates
+
+# Sonuç biçimi değiştiğinde artırılır; önbellekteki eski sonuçlar böylece geçersiz olur
+RESULT_FORMAT_VERSION = 2
+
+# Araç türleri
+vehicle_types_to_display = {"car", "bus", "truck", "minibus", "lorry", "motorcycle", "ship", "taxi"}
+
+# Kodlanmış görüntü baytlarını doğrudan tampondan RGB diziye çevirme; EXIF yönü uygulanır, çok büyük JPEG'ler
+# küçültülerek çözülür. DecodedImage döner: görüntü ve ölçek (sonuç kutuları scale_result ile geri ölçeklenir)
+def decode_image(contents):
+    with metrics.timer("decode"):
+        return image_decoder.decode(contents)
+
+# Küçültülerek çözülmüş görüntüdeki araç ve plaka kutularını özgün görüntü koordinatlarına çevirme
+def scale_result(result, scale):
+    if scale == 1:
+        return result
+    for item in result["vehicles"] + result["plates"]:
+        for field in ("bbox", "detection_bbox"):
+            if field in item:
+                item[field] = {key: value * scale for key, value in item[field].items()}
+    return result
+
+# Sonuç önbelleği anahtarı için modellerin, sonuç biçiminin ve çözme ayarının sürümü
+def result_version(registry):
+    return f"{registry.version()};format={RESULT_FORMAT_VERSION};decode={image_decoder.DEFAULT_TARGET_SIZE}"
+
+# Araç tespit fonksiyonu (birden fazla görüntü tek seferde)
+def detect_vehicles_batch(vehicle_detection, img_arrays):
+    responses = vehicle_detection.process_images(img_arrays, lean=True)
+    return [response if response['detected_vehicles'] else None for response in responses]
+
+# Plaka tanıma fonksiyonu
+async def recognize_plates(fast_anpr, image_arrays):
+    metrics.inc("vrs_ocr_calls_total")
+    metrics.inc("vrs_ocr_images_total", len(image_arrays))
+    with metrics.timer("anpr"):
+        number_plates = await fast_anpr.run(image_arrays)
+    return number_plates
+
+# Plaka bilgisini sözlüğe dönüştürme
+def plate_to_dict(plate):
+    bbox = plate.det_box if plate.det_box is not None else [0, 0, 0, 0]
+    return {
+        "detection_confidence": round(plate.det_conf, 2) if plate.det_conf is not None else None,
+        "recognition_text": plate.rec_text,
+        "recognition_confidence": round(plate.rec_conf, 2) if plate.rec_conf is not None else None,
+        "detection_bbox": {"xmin": int(bbox[0]), "ymin": int(bbox[1]), "xmax": int(bbox[2]), "ymax": int(bbox[3])}
+    }
+
+# Görüntüden araç bilgilerini ve araç kutularını (x1, y1, x2, y2) çıkarma
+def collect_vehicles(detection_result):
+    vehicles_info = []
+    vehicle_boxes = []
+    for vehicle in detection_result['detected_vehicles']:
+        vehicle_type = vehicle.get("vehicle_type", "").lower()
+        if vehicle_type not in vehicle_types_to_display:
+            continue
+        bbox = vehicle["vehicle_coordinates"]
+        x, y, w, h = int(bbox["x"]), int(bbox["y"]), int(bbox["width"]), int(bbox["height"])
+        if vehicle["vehicle_frame"].size > 0:
+            corners = vehicle["vehicle_bbox"]
+            vehicle_boxes.append([corners["x1"], corners["y1"], corners["x2"], corners["y2"]])
+            vehicles_info.append({
+                "vehicle_id": vehicle["vehicle_id"],
+                "vehicle_type": vehicle["vehicle_type"],
+                "detection_confidence": vehicle["detection_confidence"],
+                "color_info": vehicle.get("color_info", "Unknown"),
+                "model_info": vehicle.get("model_info", "Unknown"),
+                "bbox": {"x": x, "y": y, "width": w, "height": h}
+            })
+    return vehicles_info, vehicle_boxes
+
+# Araç tespit sonuçları üzerine plaka analizi: FastANPR tüm grup için tek kez, tam görüntüler üzerinde çalışır
+async def analyze_detections(fast_anpr, img_arrays, detection_results):
+    results = [{"vehicles": [], "plates": []} for _ in img_arrays]
+    vehicle_boxes = [[] for _ in img_arrays]
+    for index, detection_result in enumerate(detection_results):
+        if detection_result:
+            results[index]["vehicles"], vehicle_boxes[index] = collect_vehicles(detection_result)
+
+    # Plakalar araç kutularına konum (kapsama/IoU) ile atanır; hiçbir araca düşmeyenler ayrıca döndürülür
+    number_plates = await recognize_plates(fast_anpr, img_arrays) if img_arrays else []
+    for index, plates in enumerate(number_plates):
+        plates = list(plates)
+        plate_boxes = [plate.det_box if plate.det_box is not None else [0, 0, 0, 0] for plate in plates]
+        plate_scores = [plate.det_conf if plate.det_conf is not None else 0.0 for plate in plates]
+        with metrics.timer("plate_association"):
+            assignment = associate_plates(plate_boxes, vehicle_boxes[index], plate_scores=plate_scores)
+        for plate, vehicle_index in zip(plates, assignment):
+            if vehicle_index >= 0:
+                results[index]["vehicles"][vehicle_index].update(plate_to_dict(plate))
+            else:
+                results[index]["plates"].append(plate_to_dict(plate))
+
+    return results
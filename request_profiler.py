@@ -0,0 +1,150 @@
+import cProfile
+import io
+import json
+import os
+import pstats
+import re
+import threading
+import time
+import uuid
+from collections import deque
+
+_REQUEST_ID = re.compile(r"^[A-Za-z0-9_.-]{1,64}$")
+
+
+class RequestProfiler:
+    """
+    cProfile captures of single requests, written to a local directory.
+
+    A request asks to be profiled (for example with a header); `allow()` grants at most
+    `max_per_minute` profiles in any 60 second window, so the overhead cannot pile up under load.
+    `profile()` runs the request's work under cProfile in the calling thread and writes three
+    files named after the request id: the raw profile (`.prof`, for pstats/snakeviz), a text
+    summary sorted by cumulative time (`.txt`) and the request metadata (`.json`). Only the
+    newest `max_profiles` captures are kept.
+    """
+
+    def __init__(self, directory="profiles", max_per_minute=6, max_profiles=100, top=60):
+        """
+        Args:
+            directory (str): Where the profiles are written.
+            max_per_minute (int): Profiles allowed per 60 seconds; 0 disables profiling.
+            max_profiles (int): Profiles kept on disk, oldest deleted first.
+            top (int): Functions listed in the text summary.
+        """
+        self.directory = directory
+        self.max_per_minute = max(0, int(max_per_minute))
+        self.max_profiles = max(1, int(max_profiles))
+        self.top = top
+        self._granted = deque()  # Times of the profiles granted in the last minute
+        self._lock = threading.Lock()
+        # One capture at a time: from Python 3.12 cProfile cannot run in two threads at once
+        self._profile_lock = threading.Lock()
+        self.rejected = 0
+
+    def allow(self):
+        """
+        Whether one more profile may be taken now; counts it if so.
+        """
+        now = time.monotonic()
+        with self._lock:
+            while self._granted and now - self._granted[0] >= 60.0:
+                self._granted.popleft()
+            if len(self._granted) >= self.max_per_minute:
+                self.rejected += 1
+                return False
+            self._granted.append(now)
+            return True
+
+    @staticmethod
+    def new_id(requested=None):
+        """
+        The caller's request id if it is a safe file name, otherwise a new random one.
+        """
+        if requested and _REQUEST_ID.match(requested) and requested not in (".", ".."):
+            return requested
+        return uuid.uuid4().hex
+
+    def _path(self, request_id, extension):
+        return os.path.join(self.directory, f"{request_id}.{extension}")
+
+    def profile(self, request_id, function, *args, metadata=None):
+        """
+        Call `function(*args)` under cProfile and write the profile.
+
+        Only the calling thread is profiled, so `function` should do all of the request's work
+        itself rather than hand it to other threads or an event loop elsewhere.
+
+        Returns:
+            The return value of `function`.
+        """
+        with self._profile_lock:
+            profiler = cProfile.Profile()
+            started = time.time()
+            start = time.perf_counter()
+            profiler.enable()
+            try:
+                return function(*args)
+            finally:
+                profiler.disable()
+                seconds = time.perf_counter() - start
+                self._write(request_id, profiler, dict(metadata or {}, request_id=request_id, started=started,
+                                                       seconds=round(seconds, 6)))
+
+    def _write(self, request_id, profiler, metadata):
+        os.makedirs(self.directory, exist_ok=True)
+        profiler.dump_stats(self._path(request_id, "prof"))
+        summary = io.StringIO()
+        pstats.Stats(profiler, stream=summary).sort_stats("cumulative").print_stats(self.top)
+        with open(self._path(request_id, "txt"), "w") as f:
+            f.write(summary.getvalue())
+        with open(self._path(request_id, "json"), "w") as f:
+            json.dump(metadata, f)
+        self._prune()
+
+    def _prune(self):
+        profiles = self.list()
+        for stale in profiles[self.max_profiles:]:
+            for extension in ("prof", "txt", "json"):
+                try:
+                    os.remove(self._path(stale["request_id"], extension))
+                except FileNotFoundError:
+                    pass
+
+    def list(self):
+        """
+        Metadata of the stored profiles, newest first.
+        """
+        if not os.path.isdir(self.directory):
+            return []
+        profiles = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.directory, name)) as f:
+                    profiles.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        profiles.sort(key=lambda profile: profile.get("started", 0), reverse=True)
+        return profiles
+
+    def path(self, request_id, extension="txt"):
+        """
+        File of a stored profile (`prof`, `txt` or `json`), or None if there is none.
+        """
+        if extension not in ("prof", "txt", "json") or not _REQUEST_ID.match(request_id):
+            return None
+        path = self._path(request_id, extension)
+        return path if os.path.exists(path) else None
+
+    def stats(self):
+        with self._lock:
+            granted = len(self._granted)
+        return {
+            "directory": self.directory,
+            "max_per_minute": self.max_per_minute,
+            "granted_last_minute": granted,
+            "rejected": self.rejected,
+            "stored": len(self.list()),
+        }
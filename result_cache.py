@@ -0,0 +1,145 @@
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+class ResultCache:
+    """
+    Analysis results keyed by image content and model versions.
+
+    The key is the SHA-256 of the image bytes together with a string that identifies the models
+    in use, so identical uploads or files hit the cache, while changing any model invalidates it.
+    Results are stored as JSON: a hit returns a fresh copy that the caller may modify.
+
+    Recently used results are kept in memory up to `max_bytes` of JSON, least recently used
+    first out. With `sqlite_path` every result is also written to an SQLite database that
+    survives restarts and can be shared by several processes; memory misses fall back to it.
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, sqlite_path=None):
+        """
+        Args:
+            max_bytes (int): Size limit of the in-memory part, in bytes of serialized results.
+                0 disables it.
+            sqlite_path (str, optional): SQLite database file for the persistent part.
+        """
+        self.max_bytes = max(0, int(max_bytes))
+        self.sqlite_path = sqlite_path
+        self._entries = OrderedDict()  # key -> UTF-8 encoded JSON of the result, most recently used last
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._db = None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if sqlite_path:
+            self._db = sqlite3.connect(sqlite_path, timeout=30.0, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            self._db.commit()
+
+    @staticmethod
+    def key(content, model_version):
+        """
+        Cache key of an image.
+
+        Args:
+            content (bytes): Encoded image file (or any bytes that identify the image).
+            model_version (str): Identifier of the models, e.g. `ModelRegistry.version()`.
+        """
+        digest = hashlib.sha256()
+        digest.update(model_version.encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(content)
+        return digest.hexdigest()
+
+    def _remember(self, key, value):
+        # Called with the lock held
+        if len(value) > self.max_bytes:
+            return
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._bytes -= len(previous)
+        self._entries[key] = value
+        self._bytes += len(value)
+        while self._bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= len(evicted)
+            self.evictions += 1
+
+    def get(self, key):
+        """
+        Cached result for `key`, or None.
+        """
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return json.loads(value)
+            if self._db is not None:
+                row = self._db.execute("SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    self.hits += 1
+                    self.disk_hits += 1
+                    self._remember(key, row[0].encode("utf-8"))
+                    return json.loads(row[0])
+            self.misses += 1
+            return None
+
+    def put(self, key, result):
+        """
+        Store a JSON-serializable result.
+        """
+        try:
+            value = json.dumps(result, ensure_ascii=False)
+        except (TypeError, ValueError):
+            logger.warning("Result for %s is not JSON serializable; not cached", key)
+            return
+        with self._lock:
+            # Sized in encoded bytes: plate texts and labels may be non-ASCII
+            self._remember(key, value.encode("utf-8"))
+            if self._db is not None:
+                self._db.execute("INSERT OR REPLACE INTO results (key, value) VALUES (?, ?)", (key, value))
+                self._db.commit()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            if self._db is not None:
+                self._db.execute("DELETE FROM results")
+                self._db.commit()
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def stats(self):
+        """
+        Hit/miss counters and size of the cache.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            stats = {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "memory_entries": len(self._entries),
+                "memory_bytes": self._bytes,
+                "max_memory_bytes": self.max_bytes,
+                "evictions": self.evictions,
+                "sqlite_path": self.sqlite_path,
+            }
+            if self._db is not None:
+                stats["disk_entries"] = self._db.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+            return stats
@@ -0,0 +1,144 @@
+import json
+import os
+
+
+def _repair_tail(path):
+    """
+    Cut off a partially written last line, e.g. after a crash in the middle of a write, so that
+    appending continues on a fresh line.
+    """
+    with open(path, 'rb+') as log_file:
+        log_file.seek(0, os.SEEK_END)
+        size = log_file.tell()
+        if size == 0:
+            return
+        log_file.seek(size - 1)
+        if log_file.read(1) == b"\n":
+            return
+        # Walk back to the last complete line
+        position = size
+        while position > 0:
+            step = min(65536, position)
+            position -= step
+            log_file.seek(position)
+            newline = log_file.read(step).rfind(b"\n")
+            if newline != -1:
+                log_file.truncate(position + newline + 1)
+                return
+        log_file.truncate(0)
+
+
+class JsonlWriter:
+    """
+    Append-only JSON Lines log: one JSON record per line, flushed as soon as it is written.
+
+    A crash loses at most the record being written; everything before it stays readable and a
+    partially written last line is removed when the log is opened again.
+
+    Example:
+        with JsonlWriter("results.jsonl") as log:
+            log.write({"filePath": "1.jpg", "vehicles": []})
+    """
+
+    def __init__(self, path, fsync=False):
+        """
+        Args:
+            path (str): Log file; created if missing, appended to otherwise.
+            fsync (bool): Also force every record to disk, not only to the OS.
+        """
+        self.path = path
+        self.fsync = fsync
+        if os.path.exists(path):
+            _repair_tail(path)
+        self._file = open(path, 'a', encoding='utf-8')
+        self.written = 0
+
+    def write(self, record):
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+        self.written += 1
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def read_jsonl(path):
+    """
+    Yield the records of a JSON Lines file, skipping blank lines and a truncated last line.
+    """
+    error = None
+    with open(path, 'r', encoding='utf-8') as log_file:
+        for line in log_file:
+            line = line.strip()
+            if not line:
+                continue
+            if error is not None:
+                # Only the last line may be incomplete
+                raise error
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                error = e
+                continue
+            yield record
+
+
+def record_key(index, file_path):
+    """
+    Identity of a manifest entry in a result log: its position and its file.
+    """
+    return index, file_path
+
+
+def completed_keys(path):
+    """
+    Keys of the entries already present in a result log, for resuming a run. Entries that failed
+    (records with an `error` field) are not included, so a resumed run retries them.
+    """
+    if not os.path.exists(path):
+        return set()
+    return {record_key(record.get("index"), record.get("filePath")) for record in read_jsonl(path)
+            if "error" not in record}
+
+
+def jsonl_to_json(jsonl_path, json_path, key_field=None, value_field=None):
+    """
+    Convert a result log to the legacy single-document format.
+
+    Records written by the batch runner become a JSON array in manifest order, without their
+    `index` field. With `key_field` the output is instead an object mapping that field of each record
+    to the rest of the record, or only to its `value_field` when given. When an entry was written more
+    than once, the last record wins.
+
+    Returns:
+        int: Number of records written.
+    """
+    records = {}
+    for record in read_jsonl(jsonl_path):
+        if key_field is not None:
+            if value_field is not None:
+                records[record[key_field]] = record.get(value_field)
+            else:
+                records[record[key_field]] = {key: value for key, value in record.items() if key != key_field}
+        else:
+            records[record_key(record.get("index"), record.get("filePath"))] = record
+    if key_field is not None:
+        output = records
+    else:
+        ordered = sorted(records.values(), key=lambda record: (record.get("index") is None, record.get("index") or 0))
+        output = [{key: value for key, value in record.items() if key != "index"} for record in ordered]
+    # Write next to the target first so a crash never leaves a half-written legacy file
+    temporary_path = json_path + ".tmp"
+    with open(temporary_path, 'w', encoding='utf-8') as json_file:
+        json.dump(output, json_file, indent=4, ensure_ascii=False)
+    os.replace(temporary_path, json_path)
+    return len(output)
@@ -0,0 +1,8 @@
+import sys
+from pathlib import Path
+
+# The service modules live at the repository root and import the VehicleDetectionTracker package
+ROOT = Path(__file__).parent.parent
+for path in (ROOT, ROOT / 'vehicle_detection_tracker-main'):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
@@ -0,0 +1,65 @@
+import pytest
+
+pytest.importorskip('fastapi')
+pytest.importorskip('multipart')
+pytest.importorskip('httpx')
+
+from fastapi.testclient import TestClient
+
+import API
+from VehicleDetectionTracker.instrumentation import metrics
+
+
+@pytest.fixture
+def enabled_metrics():
+    enabled = metrics.enabled
+    metrics.enable()
+    yield metrics
+    metrics.enable(enabled)
+
+
+def metric_value(text, sample):
+    for line in text.splitlines():
+        if line.startswith(sample + ' '):
+            return float(line.split()[-1])
+    return None
+
+
+def test_metrics_endpoint_renders_stage_timings_and_counters(enabled_metrics):
+    client = TestClient(API.app)
+    before = client.get('/metrics').text
+
+    with metrics.timer('cache_lookup'):
+        pass
+    metrics.inc('vrs_ocr_calls_total')
+    with API.endpoint_timer('/process_batch/', images=3):
+        pass
+    response = client.get('/metrics')
+
+    assert response.status_code == 200
+    assert response.headers['content-type'].startswith('text/plain')
+    text = response.text
+    stage_count = 'vrs_stage_seconds_count{stage="cache_lookup"}'
+    assert metric_value(text, stage_count) == (metric_value(before, stage_count) or 0) + 1
+    assert metric_value(text, 'vrs_ocr_calls_total') == (metric_value(before, 'vrs_ocr_calls_total') or 0) + 1
+    images = 'vrs_images_total{endpoint="/process_batch/"}'
+    assert metric_value(text, images) == (metric_value(before, images) or 0) + 3
+    assert metric_value(text, 'vrs_request_seconds_count{endpoint="/process_batch/"}') is not None
+    # Values owned by the cache, the scheduler and the registry are collected at render time
+    for name in ('vrs_cache_hits_total', 'vrs_batch_queue_depth', 'vrs_ready'):
+        assert f'# TYPE {name} ' in text
+        assert metric_value(text, name) is not None
+
+
+def test_disabled_metrics_add_no_samples(enabled_metrics):
+    client = TestClient(API.app)
+    metrics.enable(False)
+    before = client.get('/metrics').text
+
+    with metrics.timer('cache_lookup'):
+        pass
+    metrics.inc('vrs_ocr_calls_total')
+    with API.endpoint_timer('/process_image/'):
+        pass
+
+    assert client.get('/metrics').text == before
@@ -0,0 +1,92 @@
+import threading
+import time
+
+import pytest
+
+pytest.importorskip('fastapi')
+pytest.importorskip('multipart')
+pytest.importorskip('httpx')
+
+from fastapi.testclient import TestClient
+
+import API
+
+
+class StubRegistry:
+    """
+    Stands in for the model registry: warm-up waits until the test releases it, or fails.
+    """
+
+    pool_size = 1
+
+    def __init__(self, error=None):
+        self.release = threading.Event()
+        self.error = error
+        self.loaded = False
+        self.ready = False
+        self.closed = False
+        self.load_times = {}
+        self.warm_up_times = {}
+
+    def load(self):
+        self.loaded = True
+
+    def warm_up(self):
+        self.release.wait(5)
+        if self.error is not None:
+            raise self.error
+        self.loaded = self.ready = True
+        self.warm_up_times = {'detector': 0.25}
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    stub = StubRegistry()
+    monkeypatch.setattr(API, 'registry', stub)
+    monkeypatch.setattr(API, 'warm_up_enabled', True)
+    monkeypatch.setattr(API, 'startup', {'task': None, 'error': None})
+    return stub
+
+
+def wait_for_status(client, path, status_code, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        response = client.get(path)
+        if response.status_code == status_code or time.monotonic() > deadline:
+            return response
+        time.sleep(0.01)
+
+
+def test_ready_after_warm_up_while_healthz_stays_up(registry):
+    with TestClient(API.app) as client:
+        response = client.get('/ready')
+        assert response.status_code == 503
+        assert response.json()['ready'] is False
+        assert client.get('/healthz').status_code == 200
+
+        registry.release.set()
+        response = wait_for_status(client, '/ready', 200)
+
+        assert response.status_code == 200
+        assert response.json()['warm_up_times_seconds'] == {'detector': 0.25}
+        assert client.get('/healthz').status_code == 200
+
+    assert registry.closed
+
+
+def test_failed_warm_up_keeps_the_service_unready(registry):
+    registry.error = RuntimeError('weights missing')
+
+    with TestClient(API.app) as client:
+        registry.release.set()
+        deadline = time.monotonic() + 5
+        while API.startup['error'] is None and time.monotonic() < deadline:
+            time.sleep(0.01)
+        response = client.get('/ready')
+
+        assert response.status_code == 503
+        assert response.json()['error'] == 'RuntimeError: weights missing'
+        assert client.get('/healthz').status_code == 200
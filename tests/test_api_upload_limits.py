@@ -0,0 +1,116 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip('fastapi')
+pytest.importorskip('multipart')
+
+import API
+
+BOUNDARY = 'vrsboundary'
+
+
+def multipart_parts(count, size=1000):
+    """
+    One multipart body chunk per image, followed by the closing boundary.
+    """
+    parts = [(f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="files"; filename="{index}.jpg"\r\n'
+              'Content-Type: image/jpeg\r\n\r\n').encode() + b'\xff' * size + b'\r\n'
+             for index in range(count)]
+    return parts + [f'--{BOUNDARY}--\r\n'.encode()]
+
+
+def post(app, chunks, content_length=None):
+    """
+    Send the chunks as the request body of POST /process_batch/.
+
+    Returns:
+        tuple: (status code, number of chunks the application read).
+    """
+    headers = [(b'content-type', f'multipart/form-data; boundary={BOUNDARY}'.encode())]
+    if content_length is not None:
+        headers.append((b'content-length', str(content_length).encode()))
+    scope = {'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'POST',
+             'scheme': 'http', 'path': '/process_batch/', 'raw_path': b'/process_batch/', 'root_path': '',
+             'query_string': b'', 'headers': headers, 'client': ('test', 1), 'server': ('test', 80)}
+    read = 0
+    sent = []
+
+    async def receive():
+        nonlocal read
+        if read < len(chunks):
+            read += 1
+            return {'type': 'http.request', 'body': chunks[read - 1], 'more_body': read < len(chunks)}
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(app(scope, receive, send))
+    return sent[0]['status'], read
+
+
+def test_content_length_over_limit_is_rejected_before_reading():
+    chunks = multipart_parts(3)
+    app = API.UploadLimitMiddleware(API.app, paths={'/process_batch/'}, max_bytes=2000)
+
+    status, read = post(app, chunks, content_length=sum(map(len, chunks)))
+
+    assert status == 413
+    assert read == 0
+
+
+def test_chunked_body_over_limit_is_rejected_while_streaming():
+    chunks = multipart_parts(10)
+    app = API.UploadLimitMiddleware(API.app, paths={'/process_batch/'}, max_bytes=2500)
+
+    status, read = post(app, chunks)
+
+    assert status == 413
+    assert read == 3
+
+
+def test_too_many_files_are_rejected_while_parsing(monkeypatch):
+    monkeypatch.setattr(API, 'batch_max_files', 2)
+    chunks = multipart_parts(10)
+
+    status, read = post(API.app, chunks)
+
+    assert status == 413
+    assert read < len(chunks)
+
+
+def test_other_paths_are_not_limited():
+    app = API.UploadLimitMiddleware(API.app, paths={'/process_batch/'}, max_bytes=10)
+    scope = {'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+             'scheme': 'http', 'path': '/scheduler/stats', 'raw_path': b'/scheduler/stats', 'root_path': '',
+             'query_string': b'', 'headers': [(b'content-length', b'100')], 'client': ('test', 1),
+             'server': ('test', 80)}
+    sent = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(app(scope, receive, send))
+
+    assert sent[0]['status'] == 200
+
+
+def test_request_within_limits_is_analyzed(monkeypatch):
+    analyzed = []
+
+    async def analyze_batch(contents_list):
+        analyzed.extend(contents_list)
+        return [{'vehicles': [], 'plates': []} for _ in contents_list]
+
+    monkeypatch.setattr(API, 'analyze_batch', analyze_batch)
+    monkeypatch.setattr(API, 'batch_max_files', 3)
+
+    status, read = post(API.app, multipart_parts(3, size=10))
+
+    assert status == 200
+    assert read == 4
+    assert analyzed == [b'\xff' * 10] * 3
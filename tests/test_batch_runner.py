@@ -0,0 +1,205 @@
+import asyncio
+import json
+from contextlib import contextmanager
+
+import cv2
+import numpy as np
+import pytest
+
+import batch_runner
+from result_cache import ResultCache
+from result_log import read_jsonl
+
+
+class InlinePool:
+    """
+    Runs the worker tasks in the test process, in order, like a pool with one process.
+    """
+
+    groups = []
+
+    def __init__(self, processes, initializer, initargs):
+        assert processes == 1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def imap(self, func, iterable):
+        for group in iterable:
+            InlinePool.groups.append([index for index, _ in group])
+            yield func(group)
+
+
+class InlineContext:
+    Pool = InlinePool
+
+
+def stub_process_entries(items):
+    # Entries whose file name contains "bad" fail; every result is reported as a cache miss
+    results = []
+    for index, entry in items:
+        record = {'index': index, 'filePath': entry['filePath'], 'docName': entry.get('DocName')}
+        if 'bad' in entry['filePath']:
+            record.update({'vehicles': [], 'plates': [], 'error': 'ValueError: unreadable'})
+        else:
+            record.update({'vehicles': [{'vehicle_type': 'car'}], 'plates': []})
+        results.append((index, record, 0.01, False))
+    return results
+
+
+@pytest.fixture
+def inline_pool(monkeypatch):
+    InlinePool.groups = []
+    monkeypatch.setattr(batch_runner.multiprocessing, 'get_context', lambda method: InlineContext())
+    monkeypatch.setattr(batch_runner, '_process_entries', stub_process_entries)
+    return InlinePool
+
+
+def write_manifest(path, files):
+    path.write_text(json.dumps([{'filePath': file, 'DocName': f'doc-{i}'} for i, file in enumerate(files)]))
+    return str(path)
+
+
+def test_run_batch_writes_one_record_per_entry(tmp_path, inline_pool):
+    manifest = write_manifest(tmp_path / 'manifest.json', ['a.jpg', 'bad.jpg', 'c.jpg'])
+    output = str(tmp_path / 'results.jsonl')
+
+    summary = batch_runner.run_batch(manifest, output, workers=1, chunksize=2)
+
+    records = list(read_jsonl(output))
+    assert [record['index'] for record in records] == [0, 1, 2]
+    assert records[1]['error'] == 'ValueError: unreadable'
+    assert records[2]['docName'] == 'doc-2'
+    assert inline_pool.groups == [[0, 1], [2]]
+    assert (summary['entries'], summary['skipped'], summary['cache_hits']) == (3, 0, 0)
+
+
+def test_resume_skips_completed_entries_and_retries_errors(tmp_path, inline_pool):
+    manifest = write_manifest(tmp_path / 'manifest.json', ['a.jpg', 'bad.jpg', 'c.jpg'])
+    output = tmp_path / 'results.jsonl'
+    batch_runner.run_batch(manifest, str(output), workers=1)
+    # An interrupted run leaves a partially written last line
+    with open(output, 'a', encoding='utf-8') as log:
+        log.write('{"index": 2, "filePa')
+    inline_pool.groups = []
+
+    summary = batch_runner.run_batch(manifest, str(output), workers=1, resume=True)
+
+    # Only the failed entry runs again; the truncated line is dropped before appending
+    assert inline_pool.groups == [[1]]
+    assert summary['skipped'] == 2
+    assert [record['index'] for record in read_jsonl(str(output))] == [0, 1, 2, 1]
+
+
+def test_without_resume_the_log_starts_over(tmp_path, inline_pool):
+    manifest = write_manifest(tmp_path / 'manifest.json', ['a.jpg', 'c.jpg'])
+    output = str(tmp_path / 'results.jsonl')
+    batch_runner.run_batch(manifest, output, workers=1)
+
+    batch_runner.run_batch(manifest, output, workers=1)
+
+    assert [record['index'] for record in read_jsonl(output)] == [0, 1]
+
+
+def test_legacy_json_output(tmp_path, inline_pool):
+    manifest = write_manifest(tmp_path / 'manifest.json', ['a.jpg', 'bad.jpg'])
+    output = str(tmp_path / 'results.jsonl')
+    legacy = tmp_path / 'results.json'
+
+    batch_runner.run_batch(manifest, output, workers=1, legacy_output_path=str(legacy))
+
+    assert json.loads(legacy.read_text(encoding='utf-8')) == [
+        {'filePath': 'a.jpg', 'docName': 'doc-0', 'vehicles': [{'vehicle_type': 'car'}], 'plates': []},
+        {'filePath': 'bad.jpg', 'docName': 'doc-1', 'vehicles': [], 'plates': [], 'error': 'ValueError: unreadable'},
+    ]
+
+
+def test_cli(tmp_path, inline_pool, capsys):
+    manifest = write_manifest(tmp_path / 'manifest.json', ['a.jpg', 'c.jpg', 'd.jpg'])
+    output = str(tmp_path / 'results.jsonl')
+    legacy = str(tmp_path / 'results.json')
+
+    batch_runner.main([manifest, output, '--workers', '1', '--chunksize', '2', '--legacy-json', legacy])
+
+    printed = capsys.readouterr().out
+    assert f'Results saved to JSON Lines file: {output}' in printed
+    assert f'Results saved to JSON file: {legacy}' in printed
+    assert json.loads(printed[printed.index('{'):])['entries'] == 3
+    assert inline_pool.groups == [[0, 1], [2]]
+    assert len(json.loads(open(legacy, encoding='utf-8').read())) == 3
+
+
+class StubRegistry:
+    fast_anpr = None
+
+    def __init__(self):
+        self.batches = []
+
+    @contextmanager
+    def detector(self):
+        yield self
+
+
+@pytest.fixture
+def worker(monkeypatch):
+    registry = StubRegistry()
+    loop = asyncio.new_event_loop()
+    monkeypatch.setattr(batch_runner, '_worker', {'registry': registry, 'version': 'test', 'cache': ResultCache(),
+                                                  'loop': loop})
+
+    def detect(vehicle_detection, img_arrays):
+        vehicle_detection.batches.append(len(img_arrays))
+        return [None] * len(img_arrays)
+
+    async def analyze(fast_anpr, img_arrays, detection_results):
+        return [{'vehicles': [], 'plates': [], 'width': image.shape[1]} for image in img_arrays]
+
+    monkeypatch.setattr(batch_runner, 'detect_vehicles_batch', detect)
+    monkeypatch.setattr(batch_runner, 'analyze_detections', analyze)
+    yield registry
+    loop.close()
+
+
+def write_image(path, width):
+    cv2.imwrite(str(path), np.zeros((16, width, 3), np.uint8))
+    return str(path)
+
+
+def test_group_is_analyzed_in_one_batch(tmp_path, worker):
+    (tmp_path / 'bad.jpg').write_bytes(b'not an image')
+    items = [(0, {'filePath': write_image(tmp_path / 'a.jpg', 20)}),
+             (1, {'filePath': str(tmp_path / 'missing.jpg')}),
+             (2, {'filePath': str(tmp_path / 'bad.jpg')}),
+             (3, {'filePath': write_image(tmp_path / 'b.jpg', 30)})]
+
+    results = batch_runner._process_entries(items)
+
+    assert [index for index, *_ in results] == [0, 1, 2, 3]
+    records = [record for _, record, _, _ in results]
+    assert [record.get('width') for record in records] == [20, None, None, 30]
+    assert records[1]['error'].startswith('FileNotFoundError')
+    assert 'error' in records[2]
+    assert worker.batches == [2]
+
+    # Analyzed images come from the cache the next time, without a model call
+    results = batch_runner._process_entries([items[3], items[0]])
+    assert [cached for *_, cached in results] == [True, True]
+    assert [record['width'] for _, record, _, _ in results] == [30, 20]
+    assert worker.batches == [2]
+
+
+def test_model_failure_fails_only_the_uncached_entries(tmp_path, worker, monkeypatch):
+    first = (0, {'filePath': write_image(tmp_path / 'a.jpg', 20)})
+    batch_runner._process_entries([first])
+
+    def fail(vehicle_detection, img_arrays):
+        raise RuntimeError('detector crashed')
+
+    monkeypatch.setattr(batch_runner, 'detect_vehicles_batch', fail)
+    results = batch_runner._process_entries([first, (1, {'filePath': write_image(tmp_path / 'b.jpg', 30)})])
+
+    assert 'error' not in results[0][1]
+    assert results[1][1]['error'] == 'RuntimeError: detector crashed'
@@ -0,0 +1,158 @@
+import asyncio
+
+from batch_scheduler import MicroBatchScheduler
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_full_batch_is_sent_without_waiting_for_the_deadline():
+    batches = []
+
+    async def handler(payloads):
+        batches.append(list(payloads))
+        return [payload * 10 for payload in payloads]
+
+    async def main():
+        # A deadline far in the future: only filling the batch can flush it
+        scheduler = MicroBatchScheduler(handler, max_batch_size=4, max_latency_ms=60_000)
+        results = await asyncio.wait_for(asyncio.gather(*(scheduler.submit(i) for i in range(4))), timeout=5)
+        await scheduler.stop()
+        return results
+
+    assert run(main()) == [0, 10, 20, 30]
+    assert batches == [[0, 1, 2, 3]]
+
+
+def test_partial_batch_is_flushed_after_the_latency_budget():
+    batches = []
+
+    async def handler(payloads):
+        batches.append(list(payloads))
+        return payloads
+
+    async def main():
+        scheduler = MicroBatchScheduler(handler, max_batch_size=8, max_latency_ms=10)
+        results = await asyncio.wait_for(asyncio.gather(scheduler.submit('a'), scheduler.submit('b')), timeout=5)
+        stats = scheduler.stats()
+        await scheduler.stop()
+        return results, stats
+
+    results, stats = run(main())
+    assert results == ['a', 'b']
+    assert batches == [['a', 'b']]
+    assert stats['batches'] == 1 and stats['items'] == 2
+    assert stats['batch_size_histogram'] == {'2': 1}
+
+
+def test_results_are_routed_to_the_request_that_submitted_them():
+    async def handler(payloads):
+        # Uneven handler time, so completion order differs from submission order
+        await asyncio.sleep(0.001 * len(payloads))
+        return [f'result-{payload}' for payload in payloads]
+
+    async def main():
+        scheduler = MicroBatchScheduler(handler, max_batch_size=3, max_latency_ms=5)
+
+        async def client(i):
+            await asyncio.sleep(0.0005 * (i % 4))
+            return i, await scheduler.submit(i)
+
+        results = await asyncio.gather(*(client(i) for i in range(10)))
+        await scheduler.stop()
+        return results
+
+    for i, result in run(main()):
+        assert result == f'result-{i}'
+
+
+def test_handler_error_reaches_every_request_of_the_batch():
+    async def handler(payloads):
+        raise RuntimeError('model failed')
+
+    async def main():
+        scheduler = MicroBatchScheduler(handler, max_batch_size=2, max_latency_ms=60_000)
+        results = await asyncio.gather(scheduler.submit(1), scheduler.submit(2), return_exceptions=True)
+        await scheduler.stop()
+        return results
+
+    results = run(main())
+    assert len(results) == 2
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+def test_batch_size_is_capped():
+    sizes = []
+
+    async def handler(payloads):
+        sizes.append(len(payloads))
+        return payloads
+
+    async def main():
+        scheduler = MicroBatchScheduler(handler, max_batch_size=3, max_latency_ms=60_000)
+        await scheduler.start()
+        # Nine requests with a deadline that never expires: they can only go out as full batches of three
+        results = await asyncio.wait_for(asyncio.gather(*(scheduler.submit(i) for i in range(9))), timeout=5)
+        await scheduler.stop()
+        return results
+
+    assert run(main()) == list(range(9))
+    assert sizes == [3, 3, 3]
+
+
+def test_short_result_list_fails_every_request_instead_of_hanging():
+    async def handler(payloads):
+        return payloads[:-1]
+
+    async def main():
+        scheduler = MicroBatchScheduler(handler, max_batch_size=3, max_latency_ms=60_000)
+        results = await asyncio.wait_for(
+            asyncio.gather(*(scheduler.submit(i) for i in range(3)), return_exceptions=True), timeout=5)
+        await scheduler.stop()
+        return results
+
+    results = run(main())
+    assert len(results) == 3
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+def test_batches_run_concurrently_up_to_the_limit():
+    running = 0
+    peak = 0
+
+    async def handler(payloads):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.02)
+        running -= 1
+        return payloads
+
+    async def main(max_concurrent_batches):
+        scheduler = MicroBatchScheduler(handler, max_batch_size=1, max_latency_ms=0,
+                                        max_concurrent_batches=max_concurrent_batches)
+        results = await asyncio.wait_for(asyncio.gather(*(scheduler.submit(i) for i in range(6))), timeout=5)
+        await scheduler.stop()
+        return results
+
+    assert run(main(2)) == list(range(6))
+    assert peak == 2
+    peak = 0
+    assert run(main(1)) == list(range(6))
+    assert peak == 1
+
+
+def test_stop_answers_requests_of_running_batches():
+    async def handler(payloads):
+        await asyncio.sleep(60)
+
+    async def main():
+        scheduler = MicroBatchScheduler(handler, max_batch_size=1, max_latency_ms=0)
+        request = asyncio.ensure_future(scheduler.submit(1))
+        await asyncio.sleep(0.01)
+        await scheduler.stop()
+        return await asyncio.wait_for(asyncio.gather(request, return_exceptions=True), timeout=5)
+
+    result, = run(main())
+    assert isinstance(result, RuntimeError)
@@ -0,0 +1,99 @@
+from io import BytesIO
+
+import cv2
+import numpy as np
+import pytest
+from PIL import Image, ImageOps
+
+from image_decoder import decode, reduction_factor
+from pipeline import scale_result
+
+EXIF_ORIENTATION = 0x0112
+RED = (255, 0, 0)
+
+
+def jpeg_with_orientation(orientation, width=640, height=400):
+    """
+    Quadrant test card, red in the stored top-left corner, saved with an EXIF orientation tag.
+    """
+    image = np.zeros((height, width, 3), dtype=np.uint8)
+    image[:height // 2, :width // 2] = RED
+    image[:height // 2, width // 2:] = (0, 255, 0)
+    image[height // 2:, :width // 2] = (0, 0, 255)
+    image[height // 2:, width // 2:] = (255, 255, 0)
+    exif = Image.Exif()
+    exif[EXIF_ORIENTATION] = orientation
+    buffer = BytesIO()
+    Image.fromarray(image).save(buffer, 'JPEG', quality=95, exif=exif)
+    return buffer.getvalue()
+
+
+def pillow_decode(contents):
+    with Image.open(BytesIO(contents)) as img:
+        return np.array(ImageOps.exif_transpose(img).convert('RGB'))
+
+
+def red_bbox(image):
+    ys, xs = np.nonzero((image[..., 0] > 200) & (image[..., 1] < 60) & (image[..., 2] < 60))
+    return {'x': int(xs.min()), 'y': int(ys.min()),
+            'width': int(xs.max() - xs.min() + 1), 'height': int(ys.max() - ys.min() + 1)}
+
+
+@pytest.mark.parametrize('orientation', [1, 3, 6, 8])
+def test_full_size_decode_applies_exif_orientation(orientation):
+    contents = jpeg_with_orientation(orientation)
+    expected = pillow_decode(contents)
+
+    decoded = decode(contents, target_size=0)
+
+    assert decoded.scale == 1
+    assert decoded.image.shape == expected.shape
+    np.testing.assert_array_equal(decoded.image, expected)
+
+
+@pytest.mark.parametrize('orientation', [1, 3, 6, 8])
+def test_reduced_decode_applies_exif_orientation(orientation):
+    contents = jpeg_with_orientation(orientation)
+    expected = pillow_decode(contents)
+
+    decoded = decode(contents, target_size=150)
+
+    assert decoded.scale == 4
+    height, width = expected.shape[:2]
+    assert decoded.image.shape == (height // 4, width // 4, 3)
+    downscaled = cv2.resize(expected, (width // 4, height // 4), interpolation=cv2.INTER_AREA)
+    # libjpeg's reduced decode is not bit-identical to resizing, only close
+    assert np.abs(decoded.image.astype(int) - downscaled).mean() < 2
+
+
+@pytest.mark.parametrize('orientation', [1, 3, 6, 8])
+def test_scale_result_maps_reduced_boxes_to_oriented_image(orientation):
+    contents = jpeg_with_orientation(orientation)
+    expected = red_bbox(pillow_decode(contents))
+    decoded = decode(contents, target_size=150)
+    result = {'vehicles': [{'bbox': red_bbox(decoded.image)}], 'plates': []}
+
+    bbox = scale_result(result, decoded.scale)['vehicles'][0]['bbox']
+
+    for key in ('x', 'y', 'width', 'height'):
+        assert abs(bbox[key] - expected[key]) <= decoded.scale
+
+
+def test_reduction_depends_only_on_long_side():
+    # The header gives the stored size, before EXIF rotation; the factor is the same either way
+    assert reduction_factor((640, 400), 150) == reduction_factor((400, 640), 150) == 4
+    assert reduction_factor((640, 400), 0) == 1
+    assert reduction_factor(None, 150) == 1
+
+
+def test_formats_opencv_cannot_read_fall_back_to_pillow():
+    image = np.zeros((20, 30, 3), dtype=np.uint8)
+    image[:, :15] = RED
+    buffer = BytesIO()
+    Image.fromarray(image).save(buffer, 'GIF')
+
+    decoded = decode(buffer.getvalue())
+
+    assert decoded.scale == 1
+    assert decoded.image.shape == (20, 30, 3)
+    assert tuple(decoded.image[10, 5]) == RED
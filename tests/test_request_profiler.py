@@ -0,0 +1,101 @@
+import json
+import os
+import pstats
+
+import pytest
+
+import request_profiler
+from request_profiler import RequestProfiler
+
+
+def busy(n):
+    return sum(i * i for i in range(n))
+
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_rate_limit_per_minute(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(request_profiler.time, 'monotonic', clock)
+    profiler = RequestProfiler(max_per_minute=2)
+
+    assert [profiler.allow() for _ in range(3)] == [True, True, False]
+    clock.now += 59.9
+    assert not profiler.allow()
+    # The first two grants leave the 60 second window
+    clock.now += 0.1
+    assert [profiler.allow() for _ in range(3)] == [True, True, False]
+    assert profiler.rejected == 3
+    assert profiler.stats()['granted_last_minute'] == 2
+
+
+def test_zero_per_minute_disables_profiling():
+    profiler = RequestProfiler(max_per_minute=0)
+
+    assert not profiler.allow()
+
+
+def test_profile_writes_the_capture(tmp_path):
+    profiler = RequestProfiler(directory=str(tmp_path / 'profiles'))
+
+    assert profiler.profile('req-1', busy, 1000, metadata={'endpoint': '/process_image/'}) == busy(1000)
+
+    stats = pstats.Stats(profiler.path('req-1', 'prof'))
+    assert any(function == 'busy' for _, _, function in stats.stats)
+    with open(profiler.path('req-1', 'txt')) as f:
+        assert 'busy' in f.read()
+    metadata = json.loads(open(profiler.path('req-1', 'json')).read())
+    assert metadata['endpoint'] == '/process_image/'
+    assert metadata['request_id'] == 'req-1'
+    assert metadata['seconds'] >= 0
+    assert [profile['request_id'] for profile in profiler.list()] == ['req-1']
+
+
+def test_failed_request_is_still_written(tmp_path):
+    profiler = RequestProfiler(directory=str(tmp_path))
+
+    def fail():
+        raise ValueError('bad image')
+
+    with pytest.raises(ValueError):
+        profiler.profile('req-1', fail)
+    assert profiler.path('req-1', 'prof') is not None
+
+
+def test_prune_keeps_the_newest_profiles(tmp_path, monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(request_profiler.time, 'time', clock)
+    profiler = RequestProfiler(directory=str(tmp_path), max_profiles=2)
+
+    for request_id in ('first', 'second', 'third'):
+        clock.now += 1
+        profiler.profile(request_id, busy, 10)
+
+    assert [profile['request_id'] for profile in profiler.list()] == ['third', 'second']
+    assert sorted(os.listdir(tmp_path)) == sorted(f'{request_id}.{extension}' for request_id in ('second', 'third')
+                                                  for extension in ('prof', 'txt', 'json'))
+    assert profiler.stats()['stored'] == 2
+
+
+@pytest.mark.parametrize('requested', [None, '', '..', '../etc/passwd', 'a' * 65, 'id with spaces'])
+def test_unsafe_request_ids_are_replaced(requested):
+    request_id = RequestProfiler.new_id(requested)
+
+    assert request_id != requested
+    assert len(request_id) == 32
+
+
+def test_path_rejects_unknown_extensions_and_ids(tmp_path):
+    profiler = RequestProfiler(directory=str(tmp_path))
+    profiler.profile('req-1', busy, 10)
+
+    assert profiler.new_id('req-1') == 'req-1'
+    assert profiler.path('req-1', 'py') is None
+    assert profiler.path('../req-1') is None
+    assert profiler.path('missing') is None
@@ -0,0 +1,122 @@
+import json
+
+import model_registry
+from model_registry import ModelRegistry, _file_version
+from result_cache import ResultCache
+
+RESULT = {'vehicles': [{'vehicle_type': 'car', 'bbox': {'x': 1, 'y': 2, 'width': 3, 'height': 4}}], 'plates': []}
+
+
+def size_of(result):
+    return len(json.dumps(result, ensure_ascii=False).encode('utf-8'))
+
+
+def test_key_depends_on_content_and_model_version():
+    key = ResultCache.key(b'image', 'detector=a')
+    assert key == ResultCache.key(b'image', 'detector=a')
+    assert key != ResultCache.key(b'image', 'detector=b')
+    assert key != ResultCache.key(b'other', 'detector=a')
+
+
+def test_hit_returns_an_independent_copy():
+    cache = ResultCache()
+    cache.put('k', RESULT)
+    hit = cache.get('k')
+    hit['vehicles'].clear()
+
+    assert cache.get('k') == RESULT
+    assert cache.get('missing') is None
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses']) == (2, 1)
+
+
+def test_memory_is_bounded_and_least_recently_used_goes_first():
+    entry = {'value': 'x' * 100}
+    cache = ResultCache(max_bytes=3 * size_of(entry))
+    for key in 'abc':
+        cache.put(key, entry)
+    cache.get('a')  # b is now the least recently used
+    cache.put('d', entry)
+
+    assert cache.get('b') is None
+    assert all(cache.get(key) == entry for key in 'acd')
+    stats = cache.stats()
+    assert stats['memory_bytes'] <= stats['max_memory_bytes']
+    assert stats['evictions'] == 1
+
+
+def test_results_larger_than_the_memory_limit_are_not_kept_in_memory():
+    cache = ResultCache(max_bytes=10)
+    cache.put('k', RESULT)
+    assert cache.get('k') is None
+    assert cache.stats()['memory_bytes'] == 0
+
+
+def test_memory_is_measured_in_encoded_bytes():
+    entry = {'plate': 'İSTANBUL ŞĞÜ' * 10}
+    cache = ResultCache(max_bytes=size_of(entry))
+    cache.put('k', entry)
+
+    assert cache.stats()['memory_bytes'] == size_of(entry)
+    assert size_of(entry) > len(json.dumps(entry, ensure_ascii=False))
+    cache.put('l', entry)
+    assert cache.stats()['evictions'] == 1
+
+
+def test_sqlite_round_trip_across_instances(tmp_path):
+    path = str(tmp_path / 'cache.db')
+    writer = ResultCache(sqlite_path=path)
+    writer.put('k', RESULT)
+    writer.close()
+
+    reader = ResultCache(sqlite_path=path)
+    assert reader.get('k') == RESULT
+    assert reader.get('k') == RESULT
+    stats = reader.stats()
+    # The first hit came from disk and was then kept in memory
+    assert (stats['hits'], stats['disk_hits'], stats['disk_entries']) == (2, 1, 1)
+    reader.clear()
+    assert reader.get('k') is None
+    reader.close()
+
+
+def test_unserializable_results_are_skipped():
+    cache = ResultCache()
+    cache.put('k', {'frame': object()})
+    assert cache.get('k') is None
+
+
+def test_model_file_version_follows_content_not_size(tmp_path):
+    weights = tmp_path / 'weights.pb'
+    weights.write_bytes(b'A' * 64)
+    before = _file_version(str(weights))
+    weights.write_bytes(b'B' * 64)
+
+    assert _file_version(str(weights)) != before
+    assert _file_version(str(weights)).startswith('weights.pb:')
+    assert _file_version(str(tmp_path / 'missing.pt')) == 'missing.pt'
+
+
+def test_registry_version_is_cached_only_once_every_file_is_hashed(tmp_path, monkeypatch):
+    hashed = []
+    monkeypatch.setattr(model_registry, '_file_version', lambda path: hashed.append(path) or _file_version(path))
+    weights = tmp_path / 'yolov8n.pt'
+    registry = ModelRegistry(model_path=str(weights))
+
+    missing = registry.version()
+    assert 'detector=yolov8n.pt;' in missing
+    assert registry.version() == missing
+
+    # Weights downloaded by load() are hashed as soon as they appear
+    weights.write_bytes(b'weights')
+    hashed.clear()
+    version = registry.version()
+    assert version != missing
+    assert f'detector={_file_version(str(weights))};' in version
+    # The classifier graphs were already hashed by the first call
+    assert hashed == [str(weights)]
+
+    weights.write_bytes(b'retrained')
+    hashed.clear()
+    assert registry.version() == version
+    assert hashed == []
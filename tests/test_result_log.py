@@ -0,0 +1,85 @@
+import json
+
+import pytest
+
+from result_log import JsonlWriter, completed_keys, jsonl_to_json, read_jsonl, record_key
+
+
+def write_lines(path, text):
+    path.write_bytes(text.encode('utf-8'))
+
+
+def test_records_are_appended_and_read_back(tmp_path):
+    path = tmp_path / 'results.jsonl'
+    with JsonlWriter(str(path)) as log:
+        log.write({'index': 0, 'filePath': 'a.jpg', 'plates': ['34 ABC 123']})
+    with JsonlWriter(str(path)) as log:
+        log.write({'index': 1, 'filePath': 'ş.jpg'})
+        assert log.written == 1
+
+    assert list(read_jsonl(str(path))) == [{'index': 0, 'filePath': 'a.jpg', 'plates': ['34 ABC 123']},
+                                           {'index': 1, 'filePath': 'ş.jpg'}]
+
+
+def test_partial_last_line_is_truncated_before_appending(tmp_path):
+    path = tmp_path / 'results.jsonl'
+    write_lines(path, '{"index": 0, "filePath": "a.jpg"}\n{"index": 1, "filePa')
+
+    # A crash mid-write leaves a broken last line; readers skip it
+    assert [record['index'] for record in read_jsonl(str(path))] == [0]
+    with JsonlWriter(str(path)) as log:
+        log.write({'index': 1, 'filePath': 'b.jpg'})
+
+    assert path.read_text().splitlines() == ['{"index": 0, "filePath": "a.jpg"}', '{"index": 1, "filePath": "b.jpg"}']
+
+
+def test_a_single_partial_line_is_removed_entirely(tmp_path):
+    path = tmp_path / 'results.jsonl'
+    write_lines(path, '{"index": 0, "file')
+    with JsonlWriter(str(path)) as log:
+        log.write({'index': 0})
+    assert list(read_jsonl(str(path))) == [{'index': 0}]
+
+
+def test_a_broken_line_before_the_end_is_an_error(tmp_path):
+    path = tmp_path / 'results.jsonl'
+    write_lines(path, '{"index": 0}\nnot json\n{"index": 2}\n')
+    with pytest.raises(json.JSONDecodeError):
+        list(read_jsonl(str(path)))
+
+
+def test_resume_skips_finished_entries_and_retries_failures(tmp_path):
+    path = tmp_path / 'results.jsonl'
+    with JsonlWriter(str(path)) as log:
+        log.write({'index': 0, 'filePath': 'a.jpg', 'vehicles': []})
+        log.write({'index': 1, 'filePath': 'b.jpg', 'vehicles': [], 'error': 'OSError: missing'})
+        log.write({'index': 2, 'filePath': 'a.jpg', 'vehicles': []})
+
+    assert completed_keys(str(path)) == {record_key(0, 'a.jpg'), record_key(2, 'a.jpg')}
+    assert completed_keys(str(tmp_path / 'missing.jsonl')) == set()
+
+
+def test_legacy_array_is_in_manifest_order_with_last_record_winning(tmp_path):
+    path = tmp_path / 'results.jsonl'
+    with JsonlWriter(str(path)) as log:
+        log.write({'index': 2, 'filePath': 'c.jpg', 'vehicles': []})
+        log.write({'index': 0, 'filePath': 'a.jpg', 'error': 'failed'})
+        log.write({'index': 1, 'filePath': 'b.jpg', 'vehicles': []})
+        log.write({'index': 0, 'filePath': 'a.jpg', 'vehicles': ['car']})  # retried on resume
+
+    output = tmp_path / 'results.json'
+    assert jsonl_to_json(str(path), str(output)) == 3
+    assert json.loads(output.read_text()) == [{'filePath': 'a.jpg', 'vehicles': ['car']},
+                                              {'filePath': 'b.jpg', 'vehicles': []},
+                                              {'filePath': 'c.jpg', 'vehicles': []}]
+
+
+def test_legacy_object_keyed_by_field(tmp_path):
+    path = tmp_path / 'anpr_results.jsonl'
+    with JsonlWriter(str(path)) as log:
+        log.write({'file': '1.jpg', 'plates': [{'recognition_text': 'ABC'}]})
+        log.write({'file': '2.jpg', 'plates': []})
+
+    output = tmp_path / 'anpr_results.json'
+    jsonl_to_json(str(path), str(output), key_field='file', value_field='plates')
+    assert json.loads(output.read_text()) == {'1.jpg': [{'recognition_text': 'ABC'}], '2.jpg': []}
@@ -2,54 +2,271 @@ import json
 import math
 import cv2
 import base64
-from collections import defaultdict
-from ultralytics import YOLO
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
-from ultralytics.utils.plotting import colors
 from VehicleDetectionTracker.color_classifier.classifier import Classifier as ColorClassifier
 from VehicleDetectionTracker.model_classifier.classifier import Classifier as ModelClassifier
+from VehicleDetectionTracker.instrumentation import metrics
+from VehicleDetectionTracker.preprocessing import ClassifierPreprocessor
+from VehicleDetectionTracker.track_state import TrackStore
+from VehicleDetectionTracker.attribute_cache import TrackAttributeCache
+from VehicleDetectionTracker.kinematics import KinematicsEstimator, direction_to_label
+from VehicleDetectionTracker.video_pipeline import VideoPipeline
 from datetime import datetime
 
 
 class VehicleDetectionTracker:
 
-    def __init__(self, model_path="yolov8n.pt"):
+    def __init__(self, model_path="yolov8n.pt", model=None, color_classifier=None, model_classifier=None,
+                 max_track_history=30, track_max_age_frames=90, track_max_age_seconds=None, speed_smoothing=0.3,
+                 tracker_config="bytetrack.yaml", tracker_frame_rate=30, attribute_max_samples=5,
+                 attribute_area_gain=1.3, attribute_sharpness_gain=1.3, plate_reader=None):
         """
         Initialize the VehicleDetection class.
 
         Args:
             model_path (str): Path to the YOLO model file.
+            model (YOLO, optional): An already loaded YOLO model. When given, `model_path` is ignored.
+            color_classifier (Classifier, optional): An already loaded color classifier to share.
+            model_classifier (Classifier, optional): An already loaded make/model classifier to share.
+            max_track_history (int): Positions and timestamps kept per track.
+            track_max_age_frames (int or None): Forget tracks not seen for this many frames.
+            track_max_age_seconds (float or None): Forget tracks not seen for this many seconds.
+            speed_smoothing (float): Weight of the newest sample in the smoothed speed and heading.
+            tracker_config (str): ByteTrack configuration file.
+            tracker_frame_rate (int): Frame rate assumed by ByteTrack to size its lost-track buffer.
+            attribute_max_samples (int): Times a track is classified at most; later frames reuse the result.
+            attribute_area_gain (float): A track is classified again when a crop this much larger appears.
+            attribute_sharpness_gain (float): A track is classified again when a crop this much sharper appears.
+            plate_reader (TrackPlateReader, optional): Reads each track's plate until it is certain and
+                attaches it to the vehicles as `plate_info`.
         """
         # Load the YOLO model and set up data structures for tracking.
-        self.model = YOLO(model_path)
-        self.track_history = defaultdict(lambda: [])  # History of vehicle tracking
-        self.detected_vehicles = set()  # Set of detected vehicles
-        self.color_classifier = None
-        self.model_classifier = None
-        self.vehicle_timestamps = defaultdict(list)  # Keep track of timestamps for each tracked vehicle
+        if model is None:
+            # ultralytics (and torch) are only imported once a detector is actually needed
+            from ultralytics import YOLO
+
+            model = YOLO(model_path)
+        self.model = model
+        # Bounded position/timestamp history of every live track
+        self.tracks = TrackStore(max_history=max_track_history, max_age_frames=track_max_age_frames,
+                                 max_age_seconds=track_max_age_seconds)
+        self.frame_index = 0  # Number of frames processed by process_frame
+        self.kinematics = KinematicsEstimator(smoothing=speed_smoothing)  # Incremental speed and heading per track
+        # ByteTrack state is owned by this instance, not by the YOLO predictor, so several trackers can share one model
+        self.tracker_config = tracker_config
+        self.tracker_frame_rate = tracker_frame_rate
+        self._tracker = None
+        # Color and make/model per track, aggregated over a few good crops instead of classified every frame
+        self.attributes = TrackAttributeCache(max_samples=attribute_max_samples, area_gain=attribute_area_gain,
+                                              sharpness_gain=attribute_sharpness_gain)
+        self.plate_reader = plate_reader
+        self.color_classifier = color_classifier
+        self.model_classifier = model_classifier
+        self._classifier_executor = None  # Runs the color and make/model classifiers side by side
+        self._preprocessor = None  # Builds the inputs of both classifiers from each crop in one call
 
     def _initialize_classifiers(self):
         if self.color_classifier is None:
             self.color_classifier = ColorClassifier()
         if self.model_classifier is None:
             self.model_classifier = ModelClassifier()
+        if self._classifier_executor is None:
+            self._classifier_executor = ThreadPoolExecutor(max_workers=2)
+        if self._preprocessor is None:
+            self._preprocessor = ClassifierPreprocessor(
+                [self.color_classifier.input_size, self.model_classifier.input_size],
+                capacity=min(self.color_classifier.max_batch_size, self.model_classifier.max_batch_size))
+
+    def _classify_vehicles(self, vehicle_frames):
+        """
+        Classify the color and make/model of all vehicle crops of a frame.
+
+        Both classifiers receive the whole list as one batch and run concurrently.
+
+        Args:
+            vehicle_frames (list of numpy.ndarray): Vehicle crops.
+
+        Returns:
+            tuple: (color predictions, make/model predictions), one entry per crop (None for empty crops).
+        """
+        # Empty crops (boxes that collapse after clipping to the frame) cannot be classified
+        valid = [i for i, vehicle_frame in enumerate(vehicle_frames) if vehicle_frame.size > 0]
+        color_infos = [None] * len(vehicle_frames)
+        model_infos = [None] * len(vehicle_frames)
+        if not valid:
+            return color_infos, model_infos
+        color_probs, model_probs = self._classify_crops_proba([vehicle_frames[i] for i in valid])
+        for i, color_info, model_info in zip(valid, self.color_classifier.decode_predictions(color_probs),
+                                             self.model_classifier.decode_predictions(model_probs)):
+            color_infos[i] = color_info
+            model_infos[i] = model_info
+        return color_infos, model_infos
+
+    def close(self):
+        """
+        Stop the classifier worker threads. The tracker can still be used afterwards; the threads are
+        started again on the next classification.
+        """
+        executor, self._classifier_executor = self._classifier_executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
+
+    def reset(self):
+        """
+        Clear all tracking state so the next frame starts a new, unrelated sequence.
+
+        The loaded models are kept; only the per-track state and the ByteTrack tracker are reset.
+        """
+        self.tracks.clear()
+        self.kinematics.clear()
+        self.attributes.clear()
+        if self.plate_reader is not None:
+            self.plate_reader.clear()
+        self.frame_index = 0
+        self._tracker = None
+
+    def _track(self, result, frame):
+        """
+        Associate the detections of one frame with the existing tracks.
+
+        Args:
+            result (ultralytics.engine.results.Results): YOLO detections of the frame.
+            frame (numpy.ndarray): The frame the detections come from.
+
+        Returns:
+            Results: The tracked detections, with track ids in `boxes.id`.
+        """
+        import torch
+
+        if self._tracker is None:
+            from ultralytics.trackers.byte_tracker import BYTETracker
+            from ultralytics.utils import IterableSimpleNamespace, yaml_load
+            from ultralytics.utils.checks import check_yaml
+
+            tracker_args = IterableSimpleNamespace(**yaml_load(check_yaml(self.tracker_config)))
+            self._tracker = BYTETracker(args=tracker_args, frame_rate=self.tracker_frame_rate)
+        det = result.boxes.cpu().numpy()
+        if len(det) == 0:
+            return result
+        tracks = self._tracker.update(det, frame)
+        if len(tracks) == 0:
+            return result
+        idx = tracks[:, -1].astype(int)
+        result = result[idx]
+        result.update(boxes=torch.as_tensor(tracks[:, :-1]))
+        return result
+
+    def _attach_vehicle_classes(self, vehicles, vehicle_frames):
+        """
+        Classify the crops and store the predictions in the matching vehicle entries.
+        """
+        color_infos, model_infos = self._classify_vehicles(vehicle_frames)
+        for vehicle, color_info, model_info in zip(vehicles, color_infos, model_infos):
+            vehicle["color_info"] = json.dumps(color_info)
+            vehicle["model_info"] = json.dumps(model_info)
+
+    def _classify_crops_proba(self, crops):
+        """
+        Color and make/model probabilities of non-empty crops, both classifiers running concurrently.
+
+        Returns:
+            tuple: (color probabilities, make/model probabilities), one row per crop.
+        """
+        if not crops:
+            return [], []
+        self._initialize_classifiers()
+        color_results = []
+        model_results = []
+        for start in range(0, len(crops), self._preprocessor.capacity):
+            # One letterbox/normalize pass per crop and size, into buffers reused across calls
+            with metrics.timer("classifier_preprocess"):
+                color_inputs, model_inputs = self._preprocessor.prepare(crops[start:start + self._preprocessor.capacity])
+            color_future = self._classifier_executor.submit(metrics.timed_call, "color_classifier",
+                                                            self.color_classifier.predict_proba_inputs, color_inputs)
+            model_future = self._classifier_executor.submit(metrics.timed_call, "make_model_classifier",
+                                                            self.model_classifier.predict_proba_inputs, model_inputs)
+            color_results.append(color_future.result())
+            model_results.append(model_future.result())
+        return np.concatenate(color_results, axis=0), np.concatenate(model_results, axis=0)
+
+    def _select_track_crops(self, vehicles, vehicle_frames):
+        """
+        Pick the crops whose tracks need a (new) classification.
+
+        Returns:
+            list: (index into `vehicles`, crop quality) pairs.
+        """
+        selected = []
+        for i, (vehicle, vehicle_frame) in enumerate(zip(vehicles, vehicle_frames)):
+            quality = self.attributes.wants_sample(vehicle["vehicle_id"], vehicle_frame)
+            if quality is not None:
+                selected.append((i, quality))
+        return selected
+
+    def _apply_track_classes(self, vehicles, selected, color_probs, model_probs):
+        """
+        Add new classifications to the track aggregates and store the aggregated predictions in
+        the vehicle entries.
+        """
+        for (i, quality), color_row, model_row in zip(selected, color_probs, model_probs):
+            self.attributes.add(vehicles[i]["vehicle_id"], quality, color_row, model_row)
+        self.attributes.reused += len(vehicles) - len(selected)
+        for vehicle in vehicles:
+            state = self.attributes.get(vehicle["vehicle_id"])
+            if state is None:
+                # Only empty crops so far
+                vehicle["color_info"] = json.dumps(None)
+                vehicle["model_info"] = json.dumps(None)
+                continue
+            if state.info is None:
+                # Decode in the classifiers' own precision so the probabilities print as before
+                color_mean, model_mean = (probs.astype(np.float32) for probs in state.probabilities())
+                state.info = (json.dumps(self.color_classifier.decode_predictions(color_mean[None])[0]),
+                              json.dumps(self.model_classifier.decode_predictions(model_mean[None])[0]))
+            vehicle["color_info"], vehicle["model_info"] = state.info
+
+    def _attach_track_classes(self, vehicles, vehicle_frames):
+        """
+        Classify the tracked vehicles of a frame through the per-track attribute cache.
+        """
+        selected = self._select_track_crops(vehicles, vehicle_frames)
+        color_probs, model_probs = [], []
+        if selected:
+            color_probs, model_probs = self._classify_crops_proba([vehicle_frames[i] for i, _ in selected])
+        self._apply_track_classes(vehicles, selected, color_probs, model_probs)
+
+    @property
+    def live_tracks(self):
+        """
+        Number of tracks currently held in memory.
+        """
+        return len(self.tracks)
+
+    def track_memory_bytes(self):
+        """
+        Bytes used by the history buffers of the live tracks.
+        """
+        return self.tracks.memory_bytes()
+
+    def _timestamp_seconds(self, frame_timestamp):
+        """
+        Convert a frame timestamp (datetime or seconds) to seconds.
+        """
+        if isinstance(frame_timestamp, datetime):
+            return frame_timestamp.timestamp()
+        return float(frame_timestamp)
 
     def _map_direction_to_label(self, direction):
-        # Define direction ranges in radians and their corresponding labels
-        direction_ranges = {
-            (-math.pi / 8, math.pi / 8): "Right",
-            (math.pi / 8, 3 * math.pi / 8): "Bottom Right",
-            (3 * math.pi / 8, 5 * math.pi / 8): "Bottom",
-            (5 * math.pi / 8, 7 * math.pi / 8): "Bottom Left",
-            (7 * math.pi / 8, -7 * math.pi / 8): "Left",
-            (-7 * math.pi / 8, -5 * math.pi / 8): "Top Left",
-            (-5 * math.pi / 8, -3 * math.pi / 8): "Top",
-            (-3 * math.pi / 8, -math.pi / 8): "Top Right"
-        }
-        for angle_range, label in direction_ranges.items():
-            if angle_range[0] <= direction <= angle_range[1]:
-                return label
-        return "Unknown"  # Return "Unknown" if the direction doesn't match any defined range
+        # Constant-time lookup of the 45° sector the direction (in radians) falls into
+        return direction_to_label(direction)
 
     def _encode_image_base64(self, image):
         """
@@ -61,8 +278,9 @@ class VehicleDetectionTracker:
         Returns:
             str: Base64-encoded image.
         """
-        _, buffer = cv2.imencode('.jpg', image)
-        image_base64 = base64.b64encode(buffer).decode()
+        with metrics.timer("base64"):
+            _, buffer = cv2.imencode('.jpg', image)
+            image_base64 = base64.b64encode(buffer).decode()
         return image_base64
 
     def _decode_image_base64(self, image_base64):
@@ -83,6 +301,33 @@ class VehicleDetectionTracker:
         except Exception as e:
             return None
 
+    def _vehicle_bbox(self, x, y, w, h, shape):
+        """
+        Convert a YOLO xywh box into integer corner coordinates clipped to the frame.
+
+        Returns:
+            tuple: (x1, y1, x2, y2) usable directly as `frame[y1:y2, x1:x2]`.
+        """
+        frame_h, frame_w = shape[:2]
+        x1 = min(max(int(x - w / 2), 0), frame_w)
+        y1 = min(max(int(y - h / 2), 0), frame_h)
+        x2 = min(max(int(x + w / 2), 0), frame_w)
+        y2 = min(max(int(y + h / 2), 0), frame_h)
+        return x1, y1, x2, y2
+
+    def _vehicle_frame_info(self, vehicle_frame, bbox, lean):
+        """
+        Image fields of a vehicle entry: the crop as base64, or in lean mode the crop itself
+        (a view into the frame, not a copy) together with its integer bounding box.
+        """
+        if not lean:
+            return {"vehicle_frame_base64": self._encode_image_base64(vehicle_frame)}
+        x1, y1, x2, y2 = bbox
+        return {
+            "vehicle_frame": vehicle_frame,
+            "vehicle_bbox": {"x1": x1, "y1": y1, "x2": x2, "y2": y2}
+        }
+
     def _increase_brightness(self, image, factor=1.5):
         """
         Increases the brightness of an image by multiplying its pixels by a factor.
@@ -91,7 +336,8 @@ class VehicleDetectionTracker:
         :param factor: The brightness increase factor. A value greater than 1 will increase brightness.
         :return: The image with increased brightness.
         """
-        brightened_image = cv2.convertScaleAbs(image, alpha=factor, beta=0)
+        with metrics.timer("brightness"):
+            brightened_image = cv2.convertScaleAbs(image, alpha=factor, beta=0)
         return brightened_image
 
     def _convert_meters_per_second_to_kmph(self, meters_per_second):
@@ -118,130 +364,110 @@ class VehicleDetectionTracker:
                 "error": "Failed to decode the base64 image"
             }
 
-    def process_frame(self, frame, frame_timestamp):
+    def process_frame(self, frame, frame_timestamp, lean=False, annotate=False):
         """
         Process a single video frame to detect and track vehicles.
 
         Args:
             frame (numpy.ndarray): Input frame for processing.
+            frame_timestamp (datetime or float): Capture time of the frame (seconds when numeric). Prefer
+                the video clock (e.g. `CAP_PROP_POS_MSEC`) over the wall clock for recorded video.
+            lean (bool): Skip plotting and all JPEG/base64 encoding. Each vehicle then carries its crop
+                as a numpy view (`vehicle_frame`) and its integer box (`vehicle_bbox`) instead of
+                `vehicle_frame_base64`, and both frame fields of the response stay None.
+            annotate (bool): Also return the annotated frame as a numpy array (`annotated_frame`), e.g. for
+                display. Works together with `lean`.
 
         Returns:
             dict: Processed information including tracked vehicles' details, the annotated frame in base64, and the original frame in base64.
         """
         self._initialize_classifiers()
+        with metrics.timer("process_frame"):
+            # Perform vehicle detection in the frame; tracking is done by this instance's ByteTrack tracker
+            bright_frame = self._increase_brightness(frame)
+            with metrics.timer("predict"):
+                results = self.model.predict(bright_frame, verbose=False)
+            response, vehicle_frames = self._process_detections(frame, results[0], frame_timestamp, lean, annotate)
+            # Classify the tracks that need it in one batch per classifier; the others reuse their aggregate
+            with metrics.timer("classify"):
+                self._attach_track_classes(response["detected_vehicles"], vehicle_frames)
+            # Read plates only for the tracks whose plate is not final yet
+            if self.plate_reader is not None:
+                self.plate_reader.update_sync(response["detected_vehicles"], vehicle_frames)
+        return response
+
+    def _process_detections(self, frame, result, frame_timestamp, lean=False, annotate=False):
+        """
+        Track the YOLO detections of one frame and build its response, except for the color and
+        make/model predictions.
+
+        Returns:
+            tuple: (response, vehicle crops in the order of `response["detected_vehicles"]`).
+        """
         response = {
             "number_of_vehicles_detected": 0,  # Counter for vehicles detected in this frame
             "detected_vehicles": [],  # List of information about detected vehicles
             "annotated_frame_base64": None,  # Annotated frame as a base64 encoded image
             "original_frame_base64": None  # Original frame as a base64 encoded image
         }
-        # Process a single video frame and return detection results, an annotated frame, and the original frame as base64.
-        results = self.model.track(self._increase_brightness(frame), persist=True,
-                                   tracker="bytetrack.yaml")  # Perform vehicle tracking in the frame
-        if results is not None and results[0] is not None and results[0].boxes is not None and results[
-            0].boxes.id is not None:
+        from ultralytics.utils.plotting import colors
+
+        timestamp = self._timestamp_seconds(frame_timestamp)
+        self.frame_index += 1
+        vehicle_frames = []  # Crops of the vehicles in this frame, classified by the caller
+        if result is not None and result.boxes is not None:
+            with metrics.timer("track"):
+                result = self._track(result, frame)
+        if result is not None and result.boxes is not None and result.boxes.id is not None:
             # Obtain bounding boxes (xywh format) of detected objects
-            boxes = results[0].boxes.xywh.cpu()
+            boxes = result.boxes.xywh.cpu()
             # Extract confidence scores for each detected object
-            conf_list = results[0].boxes.conf.cpu()
+            conf_list = result.boxes.conf.cpu()
             # Get unique IDs assigned to each tracked object
-            track_ids = results[0].boxes.id.int().cpu().tolist()
+            track_ids = result.boxes.id.int().cpu().tolist()
             # Obtain the class labels (e.g., 'car', 'truck') for detected objects
-            clss = results[0].boxes.cls.cpu().tolist()
+            clss = result.boxes.cls.cpu().tolist()
             # Retrieve the names of the detected objects based on class labels
-            names = results[0].names
-            # Get the annotated frame using results[0].plot() and encode it as base64
-            annotated_frame = results[0].plot()
+            names = result.names
+            # Get the annotated frame using result.plot() and encode it as base64
+            annotated_frame = result.plot() if annotate or not lean else None
 
-            for box, track_id, cls, conf in zip(boxes, track_ids, clss, conf_list):
+            # Update speed and heading of every track in the frame in one vectorized step
+            speeds, directions, reliabilities = self.kinematics.update(track_ids, boxes.numpy()[:, :2], timestamp)
+
+            for i, (box, track_id, cls, conf) in enumerate(zip(boxes, track_ids, clss, conf_list)):
                 x, y, w, h = box
                 label = str(names[cls])
                 # Bounding box plot
                 bbox_color = colors(cls, True)
                 track_thickness = 2
-                if track_id not in self.track_history:
-                    self.track_history[track_id] = []
-                # Retrieve or create a list to store the tracking history of the current vehicle (identified by track_id).
-                track = self.track_history[track_id]
-                # Append the current position (x, y) to the tracking history list.
-                track.append((float(x), float(y)))
-                # Limit the tracking history to the last 30 positions to avoid excessive memory usage.
-                max_history_length = 30
-                if len(track) > max_history_length:
-                    track.pop(0)
-                # Combine the tracked points into a NumPy array for drawing a polyline.
-                points = np.hstack(track).astype(np.int32).reshape((-1, 1, 2))
-                # Draw a polyline (tracking lines) on the annotated frame using the combined points.
-                cv2.polylines(annotated_frame, [points], isClosed=False, color=bbox_color, thickness=track_thickness)
-
-                if track_id not in self.vehicle_timestamps:
-                    self.vehicle_timestamps[track_id] = {"timestamps": [],
-                                                         "positions": []}  # Initialize timestamps and positions lists
-
-                # Store the timestamp for this frame
-                self.vehicle_timestamps[track_id]["timestamps"].append(frame_timestamp)
-                self.vehicle_timestamps[track_id]["positions"].append((x, y))
-                # Calculate the speed if there are enough timestamps (at least 2)
-                timestamps = self.vehicle_timestamps[track_id]["timestamps"]
-                positions = self.vehicle_timestamps[track_id]["positions"]
+                # Record the current position (x, y) and time in the bounded history of this track.
+                state = self.tracks.update(track_id, float(x), float(y), timestamp, self.frame_index)
+                if annotated_frame is not None:
+                    # Combine the tracked points into a NumPy array for drawing a polyline.
+                    points = state.positions.values().astype(np.int32).reshape((-1, 1, 2))
+                    # Draw a polyline (tracking lines) on the annotated frame using the combined points.
+                    cv2.polylines(annotated_frame, [points], isClosed=False, color=bbox_color, thickness=track_thickness)
+
+                # Speed and direction were updated for all tracks of the frame at once above
                 speed_kph = None
-                reliability = 0.0
                 direction_label = None
                 direction = None
-                if len(timestamps) >= 2:
-                    delta_t_list = []
-                    distance_list = []
-                    # Calculate time intervals (delta_t) and distances traveled between successive frames
-                    for i in range(1, len(timestamps)):
-                        t1, t2 = timestamps[i - 1], timestamps[i]
-                        delta_t = t2.timestamp() - t1.timestamp()
-                        if delta_t > 0:
-                            x1, y1 = positions[i - 1]
-                            x2, y2 = positions[i]
-                            distance = math.sqrt((x2 - x1) ** 2 + (y2 - y1) ** 2)
-                            delta_t_list.append(delta_t)
-                            distance_list.append(distance)
-
-                    # Calculate speeds in meters per second (mps) for each frame and then average them
-                    speeds = [distance / delta_t for distance, delta_t in zip(distance_list, delta_t_list)]
-                    if len(speeds) > 0:
-                        avg_speed_mps = sum(speeds) / len(speeds)
-                    else:
-                        avg_speed_mps = None
-
-                    # Convert the average speed from meters per second (mps) to kilometers per hour (kph)
-                    if avg_speed_mps is not None:
-                        speed_kph = self._convert_meters_per_second_to_kmph(avg_speed_mps)
-                    else:
-                        speed_kph = None
-                    # Calculate the direction based on the change in position between the first and last frame
-                    initial_x, initial_y = positions[0]
-                    final_x, final_y = positions[-1]
-                    direction = math.atan2(final_y - initial_y, final_x - initial_x)
+                if not math.isnan(speeds[i]):
+                    speed_kph = self._convert_meters_per_second_to_kmph(float(speeds[i]))
+                    direction = float(directions[i])
                     direction_label = self._map_direction_to_label(direction)
+                reliability = float(reliabilities[i])
 
-                    # Calculate reliability based on the number of samples used
-                    if len(timestamps) < 5:
-                        reliability = 0.5  # Low reliability if there are less than 5 samples
-                    elif len(timestamps) < 10:
-                        reliability = 0.7  # Moderate reliability if there are between 5 and 10 samples
-                    else:
-                        reliability = 1.0  # High reliability if there are 10 or more samples
-
-                # If the vehicle is new, process it
-                self.detected_vehicles.add(track_id)  # Add the vehicle to the set of detected vehicles
                 response["number_of_vehicles_detected"] += 1  # Increment the counter
 
                 # Extract the frame of the detected vehicle
-                vehicle_frame = frame[int(y - h / 2):int(y + h / 2), int(x - w / 2):int(x + w / 2)]
-                vehicle_frame_base64 = self._encode_image_base64(vehicle_frame)
-                color_info = self.color_classifier.predict(vehicle_frame)
-                color_info_json = json.dumps(color_info)
-                model_info = self.model_classifier.predict(vehicle_frame)
-                model_info_json = json.dumps(model_info)
+                bbox = self._vehicle_bbox(x, y, w, h, frame.shape)
+                vehicle_frame = frame[bbox[1]:bbox[3], bbox[0]:bbox[2]]
+                vehicle_frames.append(vehicle_frame)
 
                 # Add vehicle information to the response
-                response["detected_vehicles"].append({
+                vehicle = {
                     "vehicle_id": track_id,
                     "vehicle_type": label,
                     "detection_confidence": conf.item(),
@@ -251,117 +477,144 @@ class VehicleDetectionTracker:
                         "width": w.item(),
                         "height": h.item()
                     },
-                    "vehicle_frame_base64": vehicle_frame_base64,
-                    "color_info": color_info_json,
-                    "model_info": model_info_json,
+                    "color_info": None,
+                    "model_info": None,
                     "speed_info": {
                         "kph": speed_kph,
                         "reliability": reliability,
                         "direction_label": direction_label,
                         "direction": direction
                     }
-                })
-
-            annotated_frame_base64 = self._encode_image_base64(annotated_frame)
-            response["annotated_frame_base64"] = annotated_frame_base64
+                }
+                vehicle.update(self._vehicle_frame_info(vehicle_frame, bbox, lean))
+                response["detected_vehicles"].append(vehicle)
+
+            if not lean:
+                annotated_frame_base64 = self._encode_image_base64(annotated_frame)
+                response["annotated_frame_base64"] = annotated_frame_base64
+            if annotate:
+                response["annotated_frame"] = annotated_frame
+
+        # Forget tracks that have left the scene
+        evicted = self.tracks.evict(self.frame_index, timestamp)
+        self.kinematics.remove(evicted)
+        self.attributes.remove(evicted)
+        if self.plate_reader is not None:
+            self.plate_reader.remove(evicted)
 
         # Encode the original frame as base64
-        original_frame_base64 = self._encode_image_base64(frame)
-        response["original_frame_base64"] = original_frame_base64
+        if not lean:
+            original_frame_base64 = self._encode_image_base64(frame)
+            response["original_frame_base64"] = original_frame_base64
 
-        return response
+        metrics.observe("vrs_vehicles_per_frame", response["number_of_vehicles_detected"])
+        return response, vehicle_frames
+
+    def process_images(self, frames, lean=False):
+        """
+        Detect and classify vehicles in a list of unrelated still images.
+
+        Use this instead of `process_frame` whenever the images are not consecutive frames of one
+        video. All images go through YOLO in one batched `predict` call (no ByteTrack association)
+        and all vehicle crops of the batch are classified together. No tracking state is read or
+        written, so vehicle ids are simply 1..n within each image and no speed information is
+        reported.
+
+        Args:
+            frames (list of numpy.ndarray): Input images.
+            lean (bool): Attach each crop as a numpy view (`vehicle_frame`) with its integer box
+                (`vehicle_bbox`) instead of `vehicle_frame_base64`, as in `process_frame`.
 
-    def process_video(self, video_path, result_callback):
+        Returns:
+            list of dict: One response per input image, in the same order.
+        """
+        self._initialize_classifiers()
+        responses = [{"number_of_vehicles_detected": 0, "detected_vehicles": []} for _ in frames]
+        if len(frames) == 0:
+            return responses
+
+        bright_frames = [self._increase_brightness(frame) for frame in frames]
+        with metrics.timer("predict"):
+            results = self.model.predict(bright_frames, verbose=False)
+        vehicles = []  # Response entries of every vehicle in the batch, in crop order
+        vehicle_frames = []
+        for frame, result, response in zip(frames, results, responses):
+            if result is None or result.boxes is None:
+                continue
+            boxes = result.boxes.xywh.cpu()
+            conf_list = result.boxes.conf.cpu()
+            clss = result.boxes.cls.cpu().tolist()
+            names = result.names
+            for vehicle_id, (box, cls, conf) in enumerate(zip(boxes, clss, conf_list), start=1):
+                x, y, w, h = box
+                bbox = self._vehicle_bbox(x, y, w, h, frame.shape)
+                vehicle_frame = frame[bbox[1]:bbox[3], bbox[0]:bbox[2]]
+                vehicle_frames.append(vehicle_frame)
+                vehicle = {
+                    "vehicle_id": vehicle_id,
+                    "vehicle_type": str(names[cls]),
+                    "detection_confidence": conf.item(),
+                    "vehicle_coordinates": {
+                        "x": x.item(),
+                        "y": y.item(),
+                        "width": w.item(),
+                        "height": h.item()
+                    },
+                    "color_info": None,
+                    "model_info": None
+                }
+                vehicle.update(self._vehicle_frame_info(vehicle_frame, bbox, lean))
+                response["detected_vehicles"].append(vehicle)
+                response["number_of_vehicles_detected"] += 1
+                vehicles.append(vehicle)
+
+        # Classify the vehicles of all images in one batch per classifier
+        with metrics.timer("classify"):
+            self._attach_vehicle_classes(vehicles, vehicle_frames)
+        for response in responses:
+            metrics.observe("vrs_vehicles_per_frame", response["number_of_vehicles_detected"])
+
+        return responses
+
+    def detect_image(self, frame, lean=False):
+        """
+        Detect and classify vehicles in a single still image without touching tracking state.
+
+        Args:
+            frame (numpy.ndarray): Input image.
+            lean (bool): See `process_images`.
+
+        Returns:
+            dict: Detected vehicles' details, without speed information.
+        """
+        return self.process_images([frame], lean=lean)[0]
+
+    def process_video(self, video_path, result_callback, display=True, lean=False, **pipeline_options):
         """
         Process a video by calling a callback for each frame's results.
 
+        Frames are decoded on a background thread while the previous ones are being processed,
+        see `VideoPipeline` for the available options (stride, start/end time, queue size and
+        backpressure). Use `VideoPipeline` directly to iterate over the results instead.
+
         Args:
             video_path (str): Path to the video file.
             result_callback (function): A callback function to handle the processing results for each frame.
+            display (bool): Show the annotated frames in a window; press 'q' to stop.
+            lean (bool): Passed to `process_frame`.
         """
-        # Process a video frame by frame, calling a callback with the results.
-        cap = cv2.VideoCapture("C:\\Users\\Rasit\\OneDrive\\Masaüstü\\vehicle_detection_tracker-main\\deneme1.mp4")
-
-        while cap.isOpened():
-            success, frame = cap.read()
-            if success:
-                frame_rate = int(cap.get(cv2.CAP_PROP_FPS))
-                print(f"Frame rate: {frame_rate} FPS")
-                timestamp = datetime.now()
-                response = self.process_frame(frame, timestamp)
-                if 'annotated_frame_base64' in response:
-                    annotated_frame = self._decode_image_base64(response['annotated_frame_base64'])
-                    if annotated_frame is not None:
-                        # Display the annotated frame in a window
-                        cv2.imshow("Video Detection Tracker - YOLOv8 + bytetrack", annotated_frame)
+        window_name = "Video Detection Tracker - YOLOv8 + bytetrack"
+        pipeline = VideoPipeline(self, video_path, lean=lean, annotate=display, **pipeline_options)
+        try:
+            for result in pipeline:
+                if display:
+                    # Display the annotated frame in a window
+                    cv2.imshow(window_name, result.response.get("annotated_frame", result.frame))
                 # Call the callback with the response
-                result_callback(response)
+                result_callback(result.response)
                 # Break the loop if 'q' is pressed
-                if cv2.waitKey(1) & 0xFF == ord("q"):
+                if display and cv2.waitKey(1) & 0xFF == ord("q"):
                     break
-            else:
-                # Break the loop if the end of the video is reached
-                break
-
-        # Release the video capture object and close the display window
-        cap.release()
-        cv2.destroyAllWindows()
-
-        from VehicleDetectionTracker.VehicleDetectionTracker import VehicleDetectionTracker
-        from PIL import Image
-        import numpy as np
-        import cv2
-        from datetime import datetime
-        import matplotlib.pyplot as plt
-        import json
-        # Video yerine bir görüntü dosyası üzerinde çalışmak için yol belirleyin
-        file_path = 'C:\\Users\\Rasit\\OneDrive\\Masaüstü\\vehicle_detection_tracker-main\\examples\\Screenshot_11.jpg'
-        # Resmi açma
-        img = Image.open(file_path)
-
-        img = img.convert('RGB')
-        # Resmi numpy array'e dönüştürme
-        img_array = np.array(img)
-        """img = img.resize((2000, 2000))"""
-        """plt.imshow(img_array)
-        plt.axis('off')  # Eksenleri gizler
-        plt.show()"""
-        # Araç tespiti ve takibi için sınıfı başlatma
-        vehicle_detection = VehicleDetectionTracker()
-
-        # Sonuçların alınacağı callback fonksiyonu
-        result_callback = lambda result: print({
-            "number_of_vehicles_detected": result["number_of_vehicles_detected"],
-            "detected_vehicles": [
-                {
-                    "vehicle_id": vehicle["vehicle_id"],
-                    "vehicle_type": vehicle["vehicle_type"],
-                    "detection_confidence": vehicle["detection_confidence"],
-                    "color_info": vehicle["color_info"],
-                    "model_info": vehicle["model_info"],
-                    "speed_info": vehicle["speed_info"]
-                }
-                for vehicle in result['detected_vehicles']
-            ]
-        })
-
-        # Görüntüyü işleme ve sonuçları alma
-        response = vehicle_detection.process_frame(img_array, datetime.now())
-
-        if 'annotated_frame_base64' in response:
-            annotated_frame = vehicle_detection._decode_image_base64(response['annotated_frame_base64'])
-            if annotated_frame is not None:
-                """ Annotated frame'i bir pencerede göster
-                cv2.imshow("Detected Vehicles", annotated_frame)
-                cv2.waitKey(0)  # Pencerenin kapanması için herhangi bir tuşa basmayı bekler
-                cv2.destroyAllWindows()"""
-
-        # Callback fonksiyonu çağrısı ile sonuçların bastırılması
-        result_data = result_callback(response)
-
-        # JSON dosyasına kaydetme
-        json_file_path = 'vehicle_detection_result.json'  # Kaydetmek istediğiniz dosya adı
-        with open(json_file_path, 'w') as json_file:
-            json.dump(result_data, json_file, indent=4)
-
-        print(f"Sonuçlar JSON dosyasına kaydedildi: {json_file_path}")
+        finally:
+            if display:
+                cv2.destroyAllWindows()
@@ -0,0 +1,144 @@
+import cv2
+import numpy as np
+
+
+def crop_sharpness(crop):
+    """
+    Variance of the Laplacian of a crop; higher means sharper.
+    """
+    gray = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY) if crop.ndim == 3 else crop
+    return float(cv2.Laplacian(gray, cv2.CV_64F).var())
+
+
+class TrackAttributes:
+    """
+    Aggregated color and make/model probabilities of a single track.
+    """
+
+    __slots__ = ("samples", "color_sum", "model_sum", "weight_sum", "best_area", "best_sharpness", "info")
+
+    def __init__(self):
+        self.samples = 0
+        self.color_sum = None
+        self.model_sum = None
+        self.weight_sum = 0.0
+        self.best_area = 0
+        self.best_sharpness = 0.0
+        self.info = None  # Decoded predictions of the current aggregate, set by the caller
+
+    def probabilities(self):
+        """
+        Mean color and make/model probabilities over the samples, weighted by crop area.
+        """
+        if self.samples == 0:
+            return None, None
+        return self.color_sum / self.weight_sum, self.model_sum / self.weight_sum
+
+
+class TrackAttributeCache:
+    """
+    Color and make/model of every live track, classified a bounded number of times.
+
+    A track is classified on first sight. Afterwards a crop is only sent to the classifiers again
+    if it is noticeably larger (`area_gain`) or sharper (`sharpness_gain`) than the best crop seen
+    so far, and never more than `max_samples` times. The probabilities of all samples are averaged,
+    weighted by crop area, so the reported classes get more stable as better views arrive. All
+    other frames of the track reuse the aggregate.
+    """
+
+    def __init__(self, max_samples=5, area_gain=1.3, sharpness_gain=1.3):
+        """
+        Args:
+            max_samples (int): Classifications per track at most.
+            area_gain (float): Factor by which a crop must exceed the largest sampled area to be classified.
+            sharpness_gain (float): Factor by which a crop must exceed the sharpest sample to be classified.
+        """
+        self.max_samples = max(1, int(max_samples))
+        self.area_gain = area_gain
+        self.sharpness_gain = sharpness_gain
+        self._tracks = {}
+        self.classified = 0  # Crops sent to the classifiers
+        self.reused = 0  # Crops answered from the aggregate
+
+    def __len__(self):
+        return len(self._tracks)
+
+    def __contains__(self, track_id):
+        return track_id in self._tracks
+
+    def get(self, track_id):
+        return self._tracks.get(track_id)
+
+    def wants_sample(self, track_id, crop):
+        """
+        Decide whether a crop of a track should be classified.
+
+        Returns:
+            tuple or None: (area, sharpness) of the crop if it should be classified, otherwise None.
+        """
+        if crop.size == 0:
+            return None
+        state = self._tracks.get(track_id)
+        if state is not None and state.samples >= self.max_samples:
+            return None
+        area = crop.shape[0] * crop.shape[1]
+        sharpness = crop_sharpness(crop)
+        if state is None or state.samples == 0:
+            return area, sharpness
+        if area >= state.best_area * self.area_gain:
+            return area, sharpness
+        # A sharper view only counts if it is not smaller than the best one; the first comparison
+        # keeps featureless crops (sharpness 0) from counting as sharper than each other
+        if (area >= state.best_area and sharpness > state.best_sharpness
+                and sharpness >= state.best_sharpness * self.sharpness_gain):
+            return area, sharpness
+        return None
+
+    def add(self, track_id, quality, color_probs, model_probs):
+        """
+        Add the classifier output of one crop of a track to its aggregate.
+
+        Args:
+            track_id (int): Tracker id.
+            quality (tuple): (area, sharpness) as returned by `wants_sample`.
+            color_probs (numpy.ndarray): Color probabilities of the crop.
+            model_probs (numpy.ndarray): Make/model probabilities of the crop.
+
+        Returns:
+            TrackAttributes: The updated state.
+        """
+        area, sharpness = quality
+        state = self._tracks.get(track_id)
+        if state is None:
+            state = self._tracks[track_id] = TrackAttributes()
+        weight = float(area)
+        if state.samples == 0:
+            state.color_sum = np.asarray(color_probs, dtype=np.float64) * weight
+            state.model_sum = np.asarray(model_probs, dtype=np.float64) * weight
+        else:
+            state.color_sum += weight * np.asarray(color_probs, dtype=np.float64)
+            state.model_sum += weight * np.asarray(model_probs, dtype=np.float64)
+        state.weight_sum += weight
+        state.samples += 1
+        state.best_area = max(state.best_area, area)
+        state.best_sharpness = max(state.best_sharpness, sharpness)
+        state.info = None
+        self.classified += 1
+        return state
+
+    def remove(self, track_ids):
+        for track_id in track_ids:
+            self._tracks.pop(track_id, None)
+
+    def clear(self):
+        self._tracks.clear()
+
+    def stats(self):
+        """
+        Number of tracks and how many crops were classified versus answered from the cache.
+        """
+        return {
+            "tracks": len(self._tracks),
+            "classified": self.classified,
+            "reused": self.reused,
+        }
@@ -2,8 +2,8 @@
 # Licensed under the MIT License
 
 import numpy as np
-import tensorflow.compat.v1 as tf
-import cv2
+from VehicleDetectionTracker.inference_backend import create_backend
+from VehicleDetectionTracker.preprocessing import ClassifierPreprocessor
 import VehicleDetectionTracker.color_classifier.config as config
 
 model_file = config.model_file
@@ -11,15 +11,7 @@ label_file = config.label_file
 input_layer = config.input_layer
 output_layer = config.output_layer
 classifier_input_size = config.classifier_input_size
-
-def load_graph(model_file):
-    graph = tf.Graph()
-    graph_def = tf.GraphDef()
-    with open(model_file, "rb") as f:
-        graph_def.ParseFromString(f.read())
-    with graph.as_default():
-        tf.import_graph_def(graph_def)
-    return graph
+max_batch_size = config.max_batch_size
 
 def load_labels(label_file):
     label = []
@@ -29,84 +21,73 @@ def load_labels(label_file):
 
     return label
 
-def resizeAndPad(img, size, padColor=0):
-    h, w = img.shape[:2]
-    sh, sw = size
-
-    # interpolation method
-    if h > sh or w > sw: # shrinking image
-        interp = cv2.INTER_AREA
-    else: # stretching image
-        interp = cv2.INTER_CUBIC
-
-    # aspect ratio of image
-    aspect = w/h  # if on Python 2, you might need to cast as a float: float(w)/h
-
-    # compute scaling and pad sizing
-    if aspect > 1: # horizontal image
-        new_w = sw
-        new_h = np.round(new_w/aspect).astype(int)
-        pad_vert = (sh-new_h)/2
-        pad_top, pad_bot = np.floor(pad_vert).astype(int), np.ceil(pad_vert).astype(int)
-        pad_left, pad_right = 0, 0
-    elif aspect < 1: # vertical image
-        new_h = sh
-        new_w = np.round(new_h*aspect).astype(int)
-        pad_horz = (sw-new_w)/2
-        pad_left, pad_right = np.floor(pad_horz).astype(int), np.ceil(pad_horz).astype(int)
-        pad_top, pad_bot = 0, 0
-    else: # square image
-        new_h, new_w = sh, sw
-        pad_left, pad_right, pad_top, pad_bot = 0, 0, 0, 0
-
-    # set pad color
-    if len(img.shape) == 3 and not isinstance(padColor, (list, tuple, np.ndarray)): # color image but only one color provided
-        padColor = [padColor]*3
-
-    # scale and pad
-    scaled_img = cv2.resize(img, (new_w, new_h), interpolation=interp)
-    scaled_img = cv2.copyMakeBorder(scaled_img, pad_top, pad_bot, pad_left, pad_right, borderType=cv2.BORDER_CONSTANT, value=padColor)
-
-    return scaled_img
-
 class Classifier():
-    def __init__(self):
+    def __init__(self, backend=None, intra_op_threads=None, inter_op_threads=None, precision=None):
+        """
+        Args:
+            backend (str, optional): Inference backend, "tf", "onnxruntime" or "opencv"; `config.backend` by default.
+            intra_op_threads (int, optional): Threads inside one operation; `config.intra_op_threads` by default.
+            inter_op_threads (int, optional): Operations run in parallel; `config.inter_op_threads` by default.
+            precision (str, optional): "float32" or "int8" (the quantized ONNX model); `config.precision` by default.
+        """
         # uncomment the next 3 lines if you want to use CPU instead of GPU
         import os
         os.environ["CUDA_DEVICE_ORDER"] = "PCI_BUS_ID"
         os.environ['CUDA_VISIBLE_DEVICES'] = '-1'
 
-        self.graph = load_graph(model_file)
+        self.input_size = classifier_input_size
+        self.max_batch_size = max_batch_size
+        # Reused input buffers for the letterboxed crops
+        self.preprocessor = ClassifierPreprocessor([classifier_input_size], capacity=max_batch_size)
+        self.precision = precision or config.precision
+        self.backend_name = backend or ("onnxruntime" if self.precision == "int8" else config.backend)
+        self.intra_op_threads = config.intra_op_threads if intra_op_threads is None else intra_op_threads
+        self.inter_op_threads = config.inter_op_threads if inter_op_threads is None else inter_op_threads
+
+        self.backend = create_backend(self.backend_name, model_file, input_layer, output_layer,
+                                      onnx_file=config.onnx_file, intra_op_threads=self.intra_op_threads,
+                                      inter_op_threads=self.inter_op_threads, precision=self.precision,
+                                      int8_onnx_file=config.int8_onnx_file)
         self.labels = load_labels(label_file)
 
-        input_name = "import/" + input_layer
-        output_name = "import/" + output_layer
-        self.input_operation = self.graph.get_operation_by_name(input_name)
-        self.output_operation = self.graph.get_operation_by_name(output_name)
-
-        self.sess = tf.Session(graph=self.graph)
-        self.sess.graph.finalize()  # Graph is read-only after this statement.
-
     def predict(self, img):
-        # img = img[:, :, ::-1]
-        img = resizeAndPad(img, classifier_input_size)
-
-        # Add a forth dimension since Tensorflow expects a list of images
-        img = np.expand_dims(img, axis=0)
-
-        # Scale the input image to the range used in the trained network
-        img = img.astype(np.float32)
-        img /= 127.5
-        img -= 1.
-
-        results = self.sess.run(self.output_operation.outputs[0], {
-            self.input_operation.outputs[0]: img
-        })
-        results = np.squeeze(results)
-
-        top = 3
-        top_indices = results.argsort()[-top:][::-1]
+        return self.predict_batch([img])[0]
+
+    def predict_proba_batch(self, imgs):
+        """
+        Run the classifier on a list of crops and return the class probabilities.
+
+        The crops are letterboxed and normalized into preallocated buffers and sent to the backend
+        in chunks of at most `max_batch_size` images.
+
+        Returns:
+            numpy.ndarray: Array of shape (len(imgs), number of labels).
+        """
+        if len(imgs) == 0:
+            return np.zeros((0, len(self.labels)), dtype=np.float32)
+
+        results = []
+        for start in range(0, len(imgs), max_batch_size):
+            # img = img[:, :, ::-1]
+            batch, = self.preprocessor.prepare(imgs[start:start + max_batch_size])
+            results.append(self.predict_proba_inputs(batch))
+        return np.concatenate(results, axis=0)
+
+    def predict_proba_inputs(self, batch):
+        """
+        Run the classifier on an already letterboxed and normalized float32 batch.
+        """
+        return self.backend.run(batch)
+
+    def decode_predictions(self, results, top=3):
+        """
+        Turn a (batch, labels) probability array into the top-k classes of every row.
+        """
+        top_indices = np.argsort(results, axis=1)[:, -top:][:, ::-1]
         classes = []
-        for ix in top_indices:
-            classes.append({"color": self.labels[ix], "prob": str(results[ix])})
-        return(classes)
\ No newline at end of file
+        for row, indices in zip(results, top_indices):
+            classes.append([{"color": self.labels[ix], "prob": str(row[ix])} for ix in indices])
+        return classes
+
+    def predict_batch(self, imgs):
+        return self.decode_predictions(self.predict_proba_batch(imgs))
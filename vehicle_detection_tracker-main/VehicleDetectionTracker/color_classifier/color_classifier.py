@@ -2,8 +2,7 @@
 # Licensed under the MIT License
 
 import numpy as np
-import tensorflow.compat.v1 as tf
-import cv2
+from VehicleDetectionTracker.preprocessing import resizeAndPad
 import VehicleDetectionTracker.color_classifier.config as config
 
 model_file = config.model_file
@@ -13,6 +12,8 @@ output_layer = config.output_layer
 classifier_input_size = config.classifier_input_size
 
 def load_graph(model_file):
+    import tensorflow.compat.v1 as tf
+
     graph = tf.Graph()
     graph_def = tf.GraphDef()
     with open(model_file, "rb") as f:
@@ -29,47 +30,6 @@ def load_labels(label_file):
 
     return label
 
-def resizeAndPad(img, size, padColor=0):
-    h, w = img.shape[:2]
-    sh, sw = size
-
-    # interpolation method
-    if h > sh or w > sw: # shrinking image
-        interp = cv2.INTER_AREA
-    else: # stretching image
-        interp = cv2.INTER_CUBIC
-
-    # aspect ratio of image
-    aspect = w/h  # if on Python 2, you might need to cast as a float: float(w)/h
-
-    # compute scaling and pad sizing
-    if aspect > 1: # horizontal image
-        new_w = sw
-        new_h = np.round(new_w/aspect).astype(int)
-        pad_vert = (sh-new_h)/2
-        pad_top, pad_bot = np.floor(pad_vert).astype(int), np.ceil(pad_vert).astype(int)
-        pad_left, pad_right = 0, 0
-    elif aspect < 1: # vertical image
-        new_h = sh
-        new_w = np.round(new_h*aspect).astype(int)
-        pad_horz = (sw-new_w)/2
-        pad_left, pad_right = np.floor(pad_horz).astype(int), np.ceil(pad_horz).astype(int)
-        pad_top, pad_bot = 0, 0
-    else: # square image
-        new_h, new_w = sh, sw
-        pad_left, pad_right, pad_top, pad_bot = 0, 0, 0, 0
-
-    # set pad color
-    if len(img.shape) == 3 and not isinstance(padColor, (list, tuple, np.ndarray)): # color image but only one color provided
-        padColor = [padColor]*3
-
-    # scale and pad
-    scaled_img = cv2.resize(img, (new_w, new_h), interpolation=interp)
-    scaled_img = cv2.copyMakeBorder(scaled_img, pad_top, pad_bot, pad_left, pad_right, borderType=cv2.BORDER_CONSTANT, value=padColor)
-
-    return scaled_img
-
-
 class Classifier():
 
     def __init__(self):
@@ -93,6 +53,8 @@ class Classifier():
         self.input_operation = self.graph.get_operation_by_name(input_name)
         self.output_operation = self.graph.get_operation_by_name(output_name)
 
+        import tensorflow.compat.v1 as tf
+
         self.sess = tf.Session(graph=self.graph)
         self.sess.graph.finalize()  # Graph is read-only after this statement.
 
@@ -1,9 +1,18 @@
 # Copyright © 2019 by Spectrico
 # Licensed under the MIT License
-import pkg_resources
+import os
 
-model_file = pkg_resources.resource_filename('VehicleDetectionTracker', 'data/model-weights-spectrico-car-colors-mobilenet-224x224-052EAC82.pb')  # path to the car color classifier
-label_file = pkg_resources.resource_filename('VehicleDetectionTracker', "data/color_labels.txt")   # path to the text file, containing list with the supported makes and models
+from VehicleDetectionTracker.package_data import data_file
+
+model_file = data_file('model-weights-spectrico-car-colors-mobilenet-224x224-052EAC82.pb')  # path to the car color classifier
+label_file = data_file("color_labels.txt")   # path to the text file, containing list with the supported makes and models
 input_layer = "input_1"
 output_layer = "softmax/Softmax"
-classifier_input_size = (224, 224) # input size of the classifier
\ No newline at end of file
+classifier_input_size = (224, 224) # input size of the classifier
+max_batch_size = 32  # maximum number of crops sent to the classifier in one session run
+onnx_file = os.path.splitext(model_file)[0] + ".onnx"  # ONNX export of the classifier, created on first use by the onnxruntime backend
+int8_onnx_file = os.path.splitext(model_file)[0] + ".int8.onnx"  # INT8 model made by `python -m VehicleDetectionTracker.quantization`
+precision = os.environ.get("VRS_CLASSIFIER_PRECISION", "float32")  # "float32" or "int8" (INT8 runs on onnxruntime)
+backend = os.environ.get("VRS_CLASSIFIER_BACKEND", "onnxruntime" if precision == "int8" else "tf")  # inference backend: "tf", "onnxruntime" or "opencv"
+intra_op_threads = int(os.environ.get("VRS_CLASSIFIER_INTRA_OP_THREADS", "0"))  # threads inside one op, 0 = backend default
+inter_op_threads = int(os.environ.get("VRS_CLASSIFIER_INTER_OP_THREADS", "0"))  # ops run in parallel, 0 = backend default
@@ -0,0 +1,181 @@
+import os
+import threading
+
+import numpy as np
+
+
+class TFGraphBackend:
+    """
+    Runs a frozen TensorFlow graph (.pb) in a `tf.Session`.
+    """
+
+    name = "tf"
+
+    def __init__(self, model_file, input_layer, output_layer, intra_op_threads=0, inter_op_threads=0, **kwargs):
+        """
+        Args:
+            model_file (str): Path to the frozen graph.
+            input_layer (str): Name of the input operation, e.g. "input_1".
+            output_layer (str): Name of the output operation, e.g. "softmax/Softmax".
+            intra_op_threads (int): Threads used inside one operation, 0 lets TensorFlow decide.
+            inter_op_threads (int): Operations run in parallel, 0 lets TensorFlow decide.
+        """
+        import tensorflow.compat.v1 as tf
+
+        self.graph = tf.Graph()
+        graph_def = tf.GraphDef()
+        with open(model_file, "rb") as f:
+            graph_def.ParseFromString(f.read())
+        with self.graph.as_default():
+            tf.import_graph_def(graph_def)
+        self.input_operation = self.graph.get_operation_by_name("import/" + input_layer)
+        self.output_operation = self.graph.get_operation_by_name("import/" + output_layer)
+
+        session_config = tf.ConfigProto(intra_op_parallelism_threads=intra_op_threads,
+                                        inter_op_parallelism_threads=inter_op_threads)
+        self.sess = tf.Session(graph=self.graph, config=session_config)
+        self.sess.graph.finalize()  # Graph is read-only after this statement.
+
+    def run(self, batch):
+        return self.sess.run(self.output_operation.outputs[0], {
+            self.input_operation.outputs[0]: batch
+        })
+
+    def close(self):
+        self.sess.close()
+
+
+class ONNXRuntimeBackend:
+    """
+    Runs an ONNX export of the classifier graph with ONNX Runtime on the CPU.
+
+    The .onnx file is created from the frozen graph with `export_onnx` (needs tf2onnx) the first
+    time it is missing.
+    """
+
+    name = "onnxruntime"
+
+    def __init__(self, model_file, input_layer, output_layer, onnx_file=None, intra_op_threads=0,
+                 inter_op_threads=0, **kwargs):
+        """
+        Args:
+            model_file (str): Path to the frozen graph the ONNX model is exported from.
+            input_layer (str): Name of the input operation in the frozen graph.
+            output_layer (str): Name of the output operation in the frozen graph.
+            onnx_file (str, optional): Path of the ONNX model, by default next to `model_file`.
+            intra_op_threads (int): Threads used inside one operator, 0 lets ONNX Runtime decide.
+            inter_op_threads (int): Operators run in parallel, 0 lets ONNX Runtime decide.
+        """
+        import onnxruntime as ort
+
+        onnx_file = onnx_file or os.path.splitext(model_file)[0] + ".onnx"
+        if not os.path.exists(onnx_file):
+            export_onnx(model_file, input_layer, output_layer, onnx_file)
+        self.onnx_file = onnx_file
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = intra_op_threads
+        options.inter_op_num_threads = inter_op_threads
+        if inter_op_threads > 1:
+            options.execution_mode = ort.ExecutionMode.ORT_PARALLEL
+        self.session = ort.InferenceSession(onnx_file, sess_options=options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+        self.output_name = self.session.get_outputs()[0].name
+
+    def run(self, batch):
+        return self.session.run([self.output_name], {self.input_name: batch})[0]
+
+    def close(self):
+        self.session = None
+
+
+class OpenCVDNNBackend:
+    """
+    Runs the frozen graph with OpenCV's DNN module on the CPU.
+
+    `cv2.dnn` takes NCHW blobs, so the NHWC batch is transposed before every run. The thread
+    count is process-wide in OpenCV (`cv2.setNumThreads`). A `cv2.dnn.Net` is not safe to run from
+    several threads at once, so runs are serialized.
+    """
+
+    name = "opencv"
+
+    def __init__(self, model_file, input_layer, output_layer, intra_op_threads=0, **kwargs):
+        """
+        Args:
+            model_file (str): Path to the frozen graph.
+            input_layer (str): Name of the input operation in the frozen graph.
+            output_layer (str): Name of the output operation in the frozen graph.
+            intra_op_threads (int): OpenCV worker threads, 0 keeps OpenCV's default.
+        """
+        import cv2
+
+        if intra_op_threads > 0:
+            cv2.setNumThreads(intra_op_threads)
+        self.net = cv2.dnn.readNetFromTensorflow(model_file)
+        self.net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+        self.net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
+        self.output_layer = output_layer
+        self._lock = threading.Lock()
+
+    def run(self, batch):
+        blob = np.ascontiguousarray(batch.transpose(0, 3, 1, 2))
+        with self._lock:
+            self.net.setInput(blob)
+            output = self.net.forward(self.output_layer)
+        return output.reshape(len(batch), -1)
+
+    def close(self):
+        self.net = None
+
+
+BACKENDS = {
+    TFGraphBackend.name: TFGraphBackend,
+    ONNXRuntimeBackend.name: ONNXRuntimeBackend,
+    OpenCVDNNBackend.name: OpenCVDNNBackend,
+}
+
+
+def create_backend(name, model_file, input_layer, output_layer, onnx_file=None, intra_op_threads=0,
+                   inter_op_threads=0, precision="float32", int8_onnx_file=None):
+    """
+    Create the inference backend `name` ("tf", "onnxruntime" or "opencv") for a frozen classifier graph.
+
+    With `precision="int8"` the quantized model `int8_onnx_file` is run instead, which needs the
+    onnxruntime backend.
+
+    Returns:
+        Backend: Object with `run(batch)`, taking a float32 (n, height, width, 3) batch and
+        returning (n, number of labels) probabilities, and `close()`.
+    """
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown classifier backend {name!r}, expected one of {sorted(BACKENDS)}")
+    if precision == "int8":
+        if name != ONNXRuntimeBackend.name:
+            raise ValueError(f"INT8 classifiers run on the onnxruntime backend, not {name!r}")
+        if not int8_onnx_file or not os.path.exists(int8_onnx_file):
+            raise FileNotFoundError(f"INT8 model {int8_onnx_file} does not exist, create it with "
+                                    "python -m VehicleDetectionTracker.quantization")
+        onnx_file = int8_onnx_file
+    elif precision != "float32":
+        raise ValueError(f"Unknown classifier precision {precision!r}, expected 'float32' or 'int8'")
+    return BACKENDS[name](model_file, input_layer, output_layer, onnx_file=onnx_file,
+                          intra_op_threads=int(intra_op_threads), inter_op_threads=int(inter_op_threads))
+
+
+def export_onnx(model_file, input_layer, output_layer, onnx_file, opset=13):
+    """
+    Convert a frozen classifier graph to ONNX with tf2onnx.
+    """
+    try:
+        import tensorflow.compat.v1 as tf
+        import tf2onnx
+    except ImportError as e:
+        raise RuntimeError(f"{onnx_file} does not exist and converting {model_file} to ONNX needs "
+                           "tensorflow and tf2onnx (pip install tf2onnx)") from e
+    graph_def = tf.GraphDef()
+    with open(model_file, "rb") as f:
+        graph_def.ParseFromString(f.read())
+    tf2onnx.convert.from_graph_def(graph_def, input_names=[input_layer + ":0"], output_names=[output_layer + ":0"],
+                                   opset=opset, output_path=onnx_file)
+    return onnx_file
@@ -0,0 +1,223 @@
+import os
+import threading
+import time
+
+# Upper bounds (seconds) of the latency histogram buckets, from 1 ms to 10 s
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Upper bounds of the vehicles-per-frame histogram buckets
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for value in labels.values())
+    return "{" + ",".join(f'{name}="{value}"' for name, value in zip(labels, escaped)) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """
+    Cumulative-bucket histogram of one label set.
+    """
+
+    __slots__ = ("buckets", "counts", "sum", "count", "_lock")
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        with self._lock:
+            self.sum += value
+            self.count += 1
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    self.counts[i] += 1
+                    break
+
+    def samples(self, name, labels):
+        with self._lock:
+            counts, total, count = list(self.counts), self.sum, self.count
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets, counts):
+            cumulative += bucket_count
+            yield f"{name}_bucket", dict(labels, le=_format_value(float(bound))), cumulative
+        yield f"{name}_bucket", dict(labels, le="+Inf"), count
+        yield f"{name}_sum", labels, total
+        yield f"{name}_count", labels, count
+
+
+class Counter:
+    """
+    Monotonic counter of one label set.
+    """
+
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def samples(self, name, labels):
+        yield name, labels, self.value
+
+
+class _Family:
+    def __init__(self, name, kind, help, factory):
+        self.name = name
+        self.kind = kind
+        self.help = help
+        self.factory = factory
+        self.children = {}  # label values -> Histogram/Counter
+        self._lock = threading.Lock()
+
+    def labels(self, **labels):
+        key = tuple(sorted(labels.items()))
+        child = self.children.get(key)
+        if child is None:
+            with self._lock:
+                child = self.children.setdefault(key, self.factory())
+        return child
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _StageTimer:
+    __slots__ = ("histogram", "start")
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.start)
+        return False
+
+
+class Metrics:
+    """
+    Process-wide latency histograms and counters, rendered in the Prometheus text format.
+
+    Stages are timed with `with metrics.timer("predict"): ...`. While disabled, `timer` returns a
+    shared no-op context manager and `inc`/`observe` return immediately, so instrumented code
+    costs one attribute check per call. Values owned by other objects (cache statistics, model
+    load times) are added at render time by collectors registered with `register_collector`.
+
+    Example:
+        metrics.enable()
+        with metrics.timer("predict"):
+            results = model.predict(frame)
+        metrics.inc("vrs_ocr_calls_total")
+        text = metrics.render()
+    """
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self._families = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+        self._stages = self.histogram("vrs_stage_seconds", "Time spent in each pipeline stage.")
+
+    def enable(self, enabled=True):
+        self.enabled = enabled
+
+    def _family(self, name, kind, help, factory):
+        family = self._families.get(name)
+        if family is None:
+            with self._lock:
+                family = self._families.setdefault(name, _Family(name, kind, help, factory))
+        return family
+
+    def histogram(self, name, help, buckets=LATENCY_BUCKETS):
+        return self._family(name, "histogram", help, lambda: Histogram(buckets))
+
+    def counter(self, name, help):
+        return self._family(name, "counter", help, Counter)
+
+    def timer(self, stage):
+        """
+        Context manager that adds its duration to `vrs_stage_seconds{stage=...}`.
+        """
+        if not self.enabled:
+            return _NULL_TIMER
+        return _StageTimer(self._stages.labels(stage=stage))
+
+    def timed_call(self, stage, function, *args):
+        """
+        Call `function(*args)` under `timer(stage)`, e.g. for work submitted to an executor.
+        """
+        with self.timer(stage):
+            return function(*args)
+
+    def observe(self, name, value, **labels):
+        """
+        Add a value to a histogram created with `histogram`.
+        """
+        if self.enabled:
+            self._families[name].labels(**labels).observe(value)
+
+    def inc(self, name, amount=1, **labels):
+        """
+        Increase a counter created with `counter`.
+        """
+        if self.enabled:
+            self._families[name].labels(**labels).inc(amount)
+
+    def register_collector(self, collector):
+        """
+        Add a callable that returns (name, type, help, [(labels, value), ...]) tuples at render time.
+        """
+        self._collectors.append(collector)
+
+    def render(self):
+        """
+        All metrics in the Prometheus text exposition format (version 0.0.4).
+        """
+        lines = []
+        for family in list(self._families.values()):
+            lines.append(f"# HELP {family.name} {family.help}")
+            lines.append(f"# TYPE {family.name} {family.kind}")
+            for key, child in list(family.children.items()):
+                for name, labels, value in child.samples(family.name, dict(key)):
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        for collector in self._collectors:
+            for name, kind, help, samples in collector():
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+# Shared by the detector, the plate reader and the API; off unless enabled (VRS_METRICS=1 or metrics.enable())
+metrics = Metrics(enabled=os.environ.get("VRS_METRICS", "0") == "1")
+metrics.histogram("vrs_vehicles_per_frame", "Vehicles detected per frame or image.", buckets=COUNT_BUCKETS)
+metrics.counter("vrs_ocr_calls_total", "Calls to the plate reader.")
+metrics.counter("vrs_ocr_images_total", "Images and crops sent to the plate reader.")
@@ -0,0 +1,133 @@
+import math
+
+import numpy as np
+
+# Direction labels of the eight 45° sectors, starting at "Right" (angle 0) and turning clockwise
+# on screen (image y grows downwards, so a positive angle points to the bottom).
+DIRECTION_LABELS = ("Right", "Bottom Right", "Bottom", "Bottom Left", "Left", "Top Left", "Top", "Top Right")
+
+
+def direction_to_label(direction):
+    """
+    Label of a single direction in radians, or "Unknown" if it is not a finite number.
+    """
+    if direction is None or not math.isfinite(direction):
+        return "Unknown"
+    return DIRECTION_LABELS[int(math.floor((direction + math.pi / 8) / (math.pi / 4))) % 8]
+
+
+def reliability_from_samples(samples):
+    """
+    Reliability of the speed estimate given the number of observations of a track.
+    """
+    # Less than 5 samples: low, 5 to 9: moderate, 10 or more: high
+    return np.select([samples < 2, samples < 5, samples < 10], [0.0, 0.5, 0.7], default=1.0)
+
+
+class KinematicsEstimator:
+    """
+    Incremental speed and heading of many tracks.
+
+    Each track keeps only its last position and time, an exponentially smoothed speed and an
+    exponentially smoothed velocity vector, so an update costs O(1) per track regardless of how
+    long the track has been alive. All tracks seen in a frame are updated together with one
+    vectorized numpy step. Speeds are in the same units as the positions per second.
+    """
+
+    def __init__(self, smoothing=0.3, capacity=64):
+        """
+        Args:
+            smoothing (float): Weight of the newest sample in the moving averages (0 < smoothing <= 1).
+            capacity (int): Initial number of track slots; grows as needed.
+        """
+        self.smoothing = smoothing
+        self._slots = {}  # track id -> row in the state arrays
+        self._free = list(range(capacity - 1, -1, -1))
+        self._last_position = np.zeros((capacity, 2))
+        self._last_time = np.zeros(capacity)
+        self._speed = np.zeros(capacity)
+        self._velocity = np.zeros((capacity, 2))
+        self._speed_samples = np.zeros(capacity, dtype=np.int64)  # Number of speed measurements
+        self._samples = np.zeros(capacity, dtype=np.int64)  # Number of observations
+
+    def __len__(self):
+        return len(self._slots)
+
+    def _grow(self):
+        capacity = self._last_time.shape[0]
+        self._free.extend(range(capacity * 2 - 1, capacity - 1, -1))
+        self._last_position = np.concatenate((self._last_position, np.zeros((capacity, 2))))
+        self._last_time = np.concatenate((self._last_time, np.zeros(capacity)))
+        self._speed = np.concatenate((self._speed, np.zeros(capacity)))
+        self._velocity = np.concatenate((self._velocity, np.zeros((capacity, 2))))
+        self._speed_samples = np.concatenate((self._speed_samples, np.zeros(capacity, dtype=np.int64)))
+        self._samples = np.concatenate((self._samples, np.zeros(capacity, dtype=np.int64)))
+
+    def _slot(self, track_id):
+        slot = self._slots.get(track_id)
+        if slot is None:
+            if not self._free:
+                self._grow()
+            slot = self._slots[track_id] = self._free.pop()
+            self._samples[slot] = 0
+            self._speed_samples[slot] = 0
+            self._speed[slot] = 0.0
+            self._velocity[slot] = 0.0
+        return slot
+
+    def update(self, track_ids, positions, timestamp):
+        """
+        Add one observation for each of the given tracks, all taken at `timestamp`.
+
+        Args:
+            track_ids (list): Ids of the tracks seen in this frame (unique).
+            positions (array-like): (n, 2) box centers.
+            timestamp (float): Frame time in seconds.
+
+        Returns:
+            tuple: (speeds, directions, reliabilities) as arrays of length n. Speed and direction are
+            NaN for tracks without a speed measurement yet.
+        """
+        positions = np.asarray(positions, dtype=np.float64).reshape(-1, 2)
+        if len(track_ids) == 0:
+            empty = np.zeros(0)
+            return empty, empty, empty
+        slots = np.fromiter((self._slot(track_id) for track_id in track_ids), dtype=np.int64, count=len(track_ids))
+
+        seen = self._samples[slots] > 0
+        delta_t = timestamp - self._last_time[slots]
+        measured = seen & (delta_t > 0)
+        safe_delta_t = np.where(measured, delta_t, 1.0)
+        velocity = (positions - self._last_position[slots]) / safe_delta_t[:, None]
+        speed = np.hypot(velocity[:, 0], velocity[:, 1])
+
+        # The first measurement initializes the averages, later ones are blended in
+        alpha = np.where(self._speed_samples[slots] == 0, 1.0, self.smoothing)
+        m = slots[measured]
+        self._speed[m] += alpha[measured] * (speed[measured] - self._speed[m])
+        self._velocity[m] += alpha[measured][:, None] * (velocity[measured] - self._velocity[m])
+        self._speed_samples[m] += 1
+
+        # Samples with a non-increasing timestamp do not move the reference point
+        moved = ~seen | measured
+        self._last_position[slots[moved]] = positions[moved]
+        self._last_time[slots[moved]] = timestamp
+        self._samples[slots] += 1
+
+        has_speed = self._speed_samples[slots] > 0
+        speeds = np.where(has_speed, self._speed[slots], np.nan)
+        directions = np.where(has_speed, np.arctan2(self._velocity[slots, 1], self._velocity[slots, 0]), np.nan)
+        return speeds, directions, reliability_from_samples(self._samples[slots])
+
+    def remove(self, track_ids):
+        """
+        Forget the given tracks and free their slots.
+        """
+        for track_id in track_ids:
+            slot = self._slots.pop(track_id, None)
+            if slot is not None:
+                self._free.append(slot)
+
+    def clear(self):
+        self._slots.clear()
+        self._free = list(range(self._last_time.shape[0] - 1, -1, -1))
@@ -0,0 +1,388 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict, deque, namedtuple
+from contextlib import closing
+
+from VehicleDetectionTracker.instrumentation import metrics
+from VehicleDetectionTracker.VehicleDetectionTracker import VehicleDetectionTracker
+from VehicleDetectionTracker.track_plates import TrackPlateReader
+from VehicleDetectionTracker.video_pipeline import read_frames
+
+# One processed frame of a stream: the stream it belongs to, its time in seconds, the frame and the
+# tracker response.
+StreamFrameResult = namedtuple("StreamFrameResult", ["stream_id", "timestamp", "frame", "response"])
+
+
+def _claim_tracks(stream_id, vehicles, selected, claimed, index=lambda item: item):
+    """
+    Keep the selected items whose (stream, track) has not been claimed yet in this step, and claim them.
+    """
+    kept = []
+    for item in selected:
+        key = (stream_id, vehicles[index(item)]["vehicle_id"])
+        if key not in claimed:
+            claimed.add(key)
+            kept.append(item)
+    return kept
+
+
+class _Stream:
+    """
+    Queue, tracker and counters of one stream.
+    """
+
+    def __init__(self, tracker, queue_size):
+        self.tracker = tracker
+        self.frames = deque()
+        self.queue_size = queue_size
+        self.submitted = 0
+        self.processed = 0
+        self.dropped = 0
+        self.latency_seconds = 0.0  # Sum of submit-to-result wall time of the processed frames
+        self.last_submitted_timestamp = None
+        self.last_processed_timestamp = None
+
+
+class MultiStreamRunner:
+    """
+    Runs many video streams on one shared detector.
+
+    All streams share a single YOLO model and a single pair of color and make/model classifiers.
+    Each stream gets its own `VehicleDetectionTracker` that holds only the per-stream state
+    (ByteTrack tracker, track history and kinematics), so adding a camera costs a few kilobytes
+    instead of another set of models.
+
+    Frames are queued per stream with `submit()`. Each `step()` takes up to `max_batch_size`
+    frames round-robin over the streams, starting at a different stream every time so that no
+    stream is favoured, runs one batched YOLO forward pass over them and classifies the tracks
+    of all streams that need it in one batch per classifier. A full stream queue drops its oldest
+    frame, so a slow consumer never makes a live camera lag behind.
+
+    Example:
+        runner = MultiStreamRunner(max_batch_size=8)
+        for result in runner.run({"north": "north.mp4", "south": "rtsp://camera-2/stream"}):
+            print(result.stream_id, result.response["number_of_vehicles_detected"])
+    """
+
+    def __init__(self, detector=None, max_batch_size=8, queue_size=4, lean=True, annotate=False, anpr=None,
+                 plate_options=None, **tracker_options):
+        """
+        Args:
+            detector (VehicleDetectionTracker, optional): Provides the shared YOLO model and classifiers.
+                A new one is created when omitted.
+            max_batch_size (int): Largest number of frames per forward pass.
+            queue_size (int): Frames queued per stream before the oldest one is dropped.
+            lean (bool): Passed on as in `process_frame`.
+            annotate (bool): Passed on as in `process_frame`.
+            anpr (optional): Shared plate reader (e.g. `fastanpr.FastANPR`). When given, every stream reads
+                the plates of its tracks with a `TrackPlateReader`, and the OCR of all streams is batched.
+            plate_options (dict, optional): Keyword arguments for the `TrackPlateReader`s.
+            **tracker_options: Passed to the per-stream `VehicleDetectionTracker`s
+                (e.g. `track_max_age_frames`, `speed_smoothing`).
+        """
+        self._owns_detector = detector is None
+        self.detector = detector if detector is not None else VehicleDetectionTracker()
+        self.detector._initialize_classifiers()
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.queue_size = max(1, int(queue_size))
+        self.lean = lean
+        self.annotate = annotate
+        self.anpr = anpr
+        self.plate_options = plate_options or {}
+        self.tracker_options = tracker_options
+        self._loop = None  # Event loop for the plate reader
+        self.batches = 0
+        self._streams = OrderedDict()  # stream id -> _Stream
+        self._next_stream = 0  # Round-robin start position of the next batch
+        self._lock = threading.Condition()
+
+    def close(self):
+        """
+        Stop the classifier threads of a detector created by the runner and close the plate reader's event loop.
+        """
+        if self._owns_detector:
+            self.detector.close()
+        if self._loop is not None:
+            self._loop.close()
+            self._loop = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
+
+    def add_stream(self, stream_id, **tracker_options):
+        """
+        Register a stream. Options override the runner's `tracker_options` for this stream.
+        """
+        options = dict(self.tracker_options, **tracker_options)
+        if self.anpr is not None and "plate_reader" not in options:
+            options["plate_reader"] = TrackPlateReader(self.anpr, **self.plate_options)
+        tracker = VehicleDetectionTracker(model=self.detector.model, color_classifier=self.detector.color_classifier,
+                                          model_classifier=self.detector.model_classifier, **options)
+        with self._lock:
+            if stream_id in self._streams:
+                raise ValueError(f"Stream already registered: {stream_id}")
+            self._streams[stream_id] = _Stream(tracker, self.queue_size)
+
+    def remove_stream(self, stream_id):
+        """
+        Forget a stream together with its queued frames and track state.
+        """
+        with self._lock:
+            self._streams.pop(stream_id, None)
+            self._lock.notify_all()
+
+    @property
+    def stream_ids(self):
+        with self._lock:
+            return list(self._streams)
+
+    def submit(self, stream_id, frame, timestamp, block=False, timeout=None):
+        """
+        Queue a frame of a stream, registering the stream on first use.
+
+        Args:
+            stream_id (hashable): Stream the frame belongs to.
+            frame (numpy.ndarray): BGR frame.
+            timestamp (datetime or float): Capture time of the frame (seconds when numeric).
+            block (bool): Wait for room in the stream queue instead of dropping its oldest frame.
+            timeout (float, optional): Longest wait in seconds when blocking.
+
+        Returns:
+            bool: False if the frame was not queued (blocking timed out or the stream was removed).
+        """
+        with self._lock:
+            registered = stream_id in self._streams
+        if not registered:
+            try:
+                self.add_stream(stream_id)
+            except ValueError:
+                pass  # Registered concurrently
+        with self._lock:
+            stream = self._streams.get(stream_id)
+            if block and stream is not None:
+                self._lock.wait_for(lambda: len(stream.frames) < stream.queue_size
+                                    or self._streams.get(stream_id) is not stream, timeout)
+            if stream is None or self._streams.get(stream_id) is not stream:
+                return False
+            if len(stream.frames) >= stream.queue_size:
+                if block:
+                    return False
+                stream.frames.popleft()
+                stream.dropped += 1
+            stream.frames.append((frame, timestamp, time.perf_counter()))
+            stream.submitted += 1
+            stream.last_submitted_timestamp = stream.tracker._timestamp_seconds(timestamp)
+            self._lock.notify_all()
+            return True
+
+    def pending(self):
+        """
+        Number of frames queued over all streams.
+        """
+        with self._lock:
+            return sum(len(stream.frames) for stream in self._streams.values())
+
+    def _next_batch(self):
+        """
+        Dequeue up to `max_batch_size` frames, one per stream per round, rotating the first stream.
+        """
+        batch = []
+        with self._lock:
+            streams = list(self._streams.items())
+            if not streams:
+                return batch
+            start = self._next_stream % len(streams)
+            order = streams[start:] + streams[:start]
+            self._next_stream = start + 1
+            while len(batch) < self.max_batch_size:
+                taken = False
+                for stream_id, stream in order:
+                    if len(batch) >= self.max_batch_size:
+                        break
+                    if stream.frames:
+                        batch.append((stream_id, stream) + stream.frames.popleft())
+                        taken = True
+                if not taken:
+                    break
+            if batch:
+                self._lock.notify_all()
+        return batch
+
+    def step(self):
+        """
+        Process one batch of queued frames.
+
+        Returns:
+            list of StreamFrameResult: Results in processing order; frames of the same stream stay
+            in submission order. Empty if nothing was queued.
+        """
+        batch = self._next_batch()
+        if not batch:
+            return []
+        self.batches += 1
+        # One forward pass over the frames of all streams
+        images = [self.detector._increase_brightness(frame) for _, _, frame, _, _ in batch]
+        with metrics.timer("predict"):
+            detections = self.detector.model.predict(images, verbose=False)
+
+        results = []
+        pending = []  # (stream id, tracker, vehicles, vehicle crops, selected crops) per processed frame
+        crops = []
+        # A batch can hold several frames of one stream; each track is classified at most once per step,
+        # so the per-track sample budget holds however many of its frames are batched together
+        claimed = set()
+        for (stream_id, stream, frame, timestamp, _), detection in zip(batch, detections):
+            # Tracking is sequential per stream, in the order the frames were queued
+            response, vehicle_frames = stream.tracker._process_detections(frame, detection, timestamp,
+                                                                          lean=self.lean, annotate=self.annotate)
+            vehicles = response["detected_vehicles"]
+            selected = _claim_tracks(stream_id, vehicles, stream.tracker._select_track_crops(vehicles, vehicle_frames),
+                                     claimed, index=lambda item: item[0])
+            pending.append((stream_id, stream.tracker, vehicles, vehicle_frames, selected))
+            crops.extend(vehicle_frames[i] for i, _ in selected)
+            results.append(StreamFrameResult(stream_id, timestamp, frame, response))
+
+        # Classify the tracks that need it, over all streams, in one batch per classifier
+        color_probs, model_probs = self.detector._classify_crops_proba(crops) if crops else ([], [])
+        offset = 0
+        for _, tracker, vehicles, _, selected in pending:
+            tracker._apply_track_classes(vehicles, selected, color_probs[offset:offset + len(selected)],
+                                         model_probs[offset:offset + len(selected)])
+            offset += len(selected)
+
+        self._read_plates(pending)
+
+        finished = time.perf_counter()
+        with self._lock:
+            for stream_id, stream, _, timestamp, queued_at in batch:
+                stream.processed += 1
+                stream.latency_seconds += finished - queued_at
+                stream.last_processed_timestamp = stream.tracker._timestamp_seconds(timestamp)
+        return results
+
+    def _read_plates(self, pending):
+        """
+        Run OCR for the tracks of all streams that have no final plate yet, in one plate reader call.
+        """
+        plate_jobs = []  # (reader, vehicles, selected) per processed frame
+        crops = []
+        claimed = set()  # As for classification, each track is read at most once per step
+        for stream_id, tracker, vehicles, vehicle_frames, _ in pending:
+            reader = tracker.plate_reader
+            if reader is None:
+                continue
+            selected = _claim_tracks(stream_id, vehicles, reader.select(vehicles, vehicle_frames), claimed)
+            reader.ocr_crops += len(selected)
+            plate_jobs.append((reader, vehicles, selected))
+            crops.extend(reader.prepare_crops([vehicle_frames[i] for i in selected]))
+        if not plate_jobs:
+            return
+        number_plates = []
+        if crops:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+            metrics.inc("vrs_ocr_calls_total")
+            metrics.inc("vrs_ocr_images_total", len(crops))
+            with metrics.timer("anpr"):
+                number_plates = self._loop.run_until_complete(self.anpr.run(crops))
+        offset = 0
+        for reader, vehicles, selected in plate_jobs:
+            reader.record(vehicles, selected, number_plates[offset:offset + len(selected)])
+            reader.attach(vehicles)
+            offset += len(selected)
+
+    def stats(self):
+        """
+        Per-stream counters, queue depth and lag.
+
+        `lag_seconds` is the distance on the stream's own clock between the newest submitted and the
+        newest processed frame; `mean_latency_ms` is the mean wall time from `submit()` to result.
+        """
+        with self._lock:
+            streams = {}
+            for stream_id, stream in self._streams.items():
+                lag = None
+                if stream.last_submitted_timestamp is not None and stream.last_processed_timestamp is not None:
+                    lag = max(0.0, stream.last_submitted_timestamp - stream.last_processed_timestamp)
+                streams[str(stream_id)] = {
+                    "submitted": stream.submitted,
+                    "processed": stream.processed,
+                    "dropped": stream.dropped,
+                    "queue_depth": len(stream.frames),
+                    "live_tracks": stream.tracker.live_tracks,
+                    "lag_seconds": lag,
+                    "mean_latency_ms": 1000.0 * stream.latency_seconds / stream.processed if stream.processed else 0.0,
+                }
+            processed = sum(stream["processed"] for stream in streams.values())
+            return {
+                "streams": streams,
+                "batches": self.batches,
+                "mean_batch_size": processed / self.batches if self.batches else 0.0,
+            }
+
+    def _decode(self, stream_id, source, stride, block, stop, errors):
+        try:
+            with closing(read_frames(source, stride, stop=stop)) as decoded:
+                for _, timestamp, frame in decoded:
+                    while not self.submit(stream_id, frame, timestamp, block=block, timeout=0.1):
+                        if stop.is_set() or stream_id not in self.stream_ids:
+                            return
+        except Exception as e:
+            errors.append(e)
+        finally:
+            with self._lock:
+                self._lock.notify_all()
+
+    def run(self, sources, stride=1, backpressure="drop"):
+        """
+        Decode several video sources in background threads and yield their results as they are processed.
+
+        Args:
+            sources (dict): Stream id -> anything accepted by `cv2.VideoCapture`.
+            stride (int): Process every `stride`-th frame of each source.
+            backpressure (str): "drop" discards the oldest queued frame of a stream that falls behind
+                (live cameras); "block" pauses its decoder instead (files).
+
+        Yields:
+            StreamFrameResult: One per processed frame.
+        """
+        if backpressure not in ("block", "drop"):
+            raise ValueError("backpressure must be 'block' or 'drop'")
+        for stream_id in sources:
+            if stream_id not in self.stream_ids:
+                self.add_stream(stream_id)
+        stop = threading.Event()
+        errors = []
+        threads = [
+            threading.Thread(target=self._decode, name=f"decode-{stream_id}", daemon=True,
+                             args=(stream_id, source, max(1, int(stride)), backpressure == "block", stop, errors))
+            for stream_id, source in sources.items()
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            while True:
+                if errors:
+                    raise errors[0]
+                results = self.step()
+                if results:
+                    yield from results
+                    continue
+                if not any(thread.is_alive() for thread in threads):
+                    if self.pending() == 0:
+                        if errors:
+                            raise errors[0]
+                        return
+                    continue
+                # Wait for a decoder to queue a frame
+                with self._lock:
+                    self._lock.wait(0.05)
+        finally:
+            stop.set()
+            for thread in threads:
+                thread.join()
@@ -0,0 +1,14 @@
+import os
+from importlib import resources
+
+
+def data_file(name):
+    """
+    Path of a file in the package's data/ directory.
+
+    Resolved with `importlib.resources`; nothing is opened or imported besides the package itself.
+    """
+    if hasattr(resources, "files"):
+        return str(resources.files("VehicleDetectionTracker") / "data" / name)
+    # Python < 3.9 has no resources.files; the package is installed as plain files next to this module
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", name)
@@ -0,0 +1,70 @@
+import numpy as np
+
+
+def _as_boxes(boxes):
+    return np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+
+
+def box_overlaps(plate_boxes, vehicle_boxes):
+    """
+    Pairwise containment and IoU of plate boxes in vehicle boxes.
+
+    Args:
+        plate_boxes (array-like): (m, 4) boxes as x1, y1, x2, y2.
+        vehicle_boxes (array-like): (n, 4) boxes as x1, y1, x2, y2.
+
+    Returns:
+        tuple: (containment, iou) arrays of shape (m, n). Containment is the share of the plate's
+        area that lies inside the vehicle box.
+    """
+    plates = _as_boxes(plate_boxes)[:, None, :]
+    vehicles = _as_boxes(vehicle_boxes)[None, :, :]
+    width = np.clip(np.minimum(plates[..., 2], vehicles[..., 2]) - np.maximum(plates[..., 0], vehicles[..., 0]), 0, None)
+    height = np.clip(np.minimum(plates[..., 3], vehicles[..., 3]) - np.maximum(plates[..., 1], vehicles[..., 1]), 0, None)
+    intersection = width * height
+    plate_area = np.clip(plates[..., 2] - plates[..., 0], 0, None) * np.clip(plates[..., 3] - plates[..., 1], 0, None)
+    vehicle_area = (np.clip(vehicles[..., 2] - vehicles[..., 0], 0, None)
+                    * np.clip(vehicles[..., 3] - vehicles[..., 1], 0, None))
+    union = plate_area + vehicle_area - intersection
+    containment = np.divide(intersection, plate_area, out=np.zeros_like(intersection), where=plate_area > 0)
+    iou = np.divide(intersection, union, out=np.zeros_like(intersection), where=union > 0)
+    return containment, iou
+
+
+def associate_plates(plate_boxes, vehicle_boxes, min_containment=0.6, plate_scores=None):
+    """
+    Assign plates detected on a whole image to the vehicles they belong to.
+
+    A plate can only go to a vehicle box that contains at least `min_containment` of it. The
+    candidate pairs are ranked mainly by containment, with IoU as a smaller term that favours the
+    tighter (usually nearer) vehicle where boxes overlap and the plate score as a tie-breaker, and
+    matched greedily: every vehicle gets at most one plate and every plate at most one vehicle.
+
+    Args:
+        plate_boxes (array-like): (m, 4) plate boxes as x1, y1, x2, y2.
+        vehicle_boxes (array-like): (n, 4) vehicle boxes as x1, y1, x2, y2, in the same image.
+        min_containment (float): Smallest share of the plate inside the vehicle box.
+        plate_scores (array-like, optional): (m,) plate detection confidences, used to break ties.
+
+    Returns:
+        numpy.ndarray: (m,) index of the assigned vehicle for every plate, -1 if unassigned.
+    """
+    plate_boxes = _as_boxes(plate_boxes)
+    vehicle_boxes = _as_boxes(vehicle_boxes)
+    assignment = np.full(len(plate_boxes), -1, dtype=np.int64)
+    if len(plate_boxes) == 0 or len(vehicle_boxes) == 0:
+        return assignment
+    containment, iou = box_overlaps(plate_boxes, vehicle_boxes)
+    scores = np.zeros(len(plate_boxes)) if plate_scores is None else np.nan_to_num(
+        np.asarray(plate_scores, dtype=np.float64).reshape(-1))
+    key = np.where(containment >= min_containment, containment + 0.5 * iou + 1e-3 * scores[:, None], -np.inf)
+    # Greedy one-to-one matching, best pair first
+    order = np.argsort(-key, axis=None)
+    order = order[np.isfinite(key.ravel()[order])]
+    plates, vehicles = np.unravel_index(order, key.shape)
+    vehicle_taken = np.zeros(len(vehicle_boxes), dtype=bool)
+    for plate, vehicle in zip(plates, vehicles):
+        if assignment[plate] == -1 and not vehicle_taken[vehicle]:
+            assignment[plate] = vehicle
+            vehicle_taken[vehicle] = True
+    return assignment
@@ -0,0 +1,147 @@
+import threading
+
+import cv2
+import numpy as np
+
+# uint8 -> float32 in [-1, 1] (x / 127.5 - 1, the scaling used to train the classifiers). Normalizing
+# through this table is a single pass that writes straight into the float batch.
+NORMALIZE_LUT = (np.arange(256, dtype=np.float32) / np.float32(127.5) - np.float32(1.0)).astype(np.float32)
+
+
+def letterbox_geometry(h, w, size):
+    """
+    Scaled size and padding that fit an h x w image into `size` keeping its aspect ratio.
+
+    Returns:
+        tuple: (new_w, new_h, pad_top, pad_left, interpolation).
+    """
+    sh, sw = size
+    # interpolation method
+    if h > sh or w > sw:  # shrinking image
+        interp = cv2.INTER_AREA
+    else:  # stretching image
+        interp = cv2.INTER_CUBIC
+    # aspect ratio of image
+    aspect = w / h
+    # compute scaling and pad sizing
+    if aspect > 1:  # horizontal image
+        new_w = sw
+        new_h = max(1, int(np.round(new_w / aspect)))
+        pad_top, pad_left = int(np.floor((sh - new_h) / 2)), 0
+    elif aspect < 1:  # vertical image
+        new_h = sh
+        new_w = max(1, int(np.round(new_h * aspect)))
+        pad_top, pad_left = 0, int(np.floor((sw - new_w) / 2))
+    else:  # square image
+        new_h, new_w = sh, sw
+        pad_top, pad_left = 0, 0
+    return new_w, new_h, pad_top, pad_left, interp
+
+
+def resizeAndPad(img, size, padColor=0):
+    """
+    Letterbox an image into `size` (height, width), padding with `padColor`.
+    """
+    new_w, new_h, pad_top, pad_left, interp = letterbox_geometry(img.shape[0], img.shape[1], size)
+    # set pad color
+    if len(img.shape) == 3 and not isinstance(padColor, (list, tuple, np.ndarray)):  # color image but only one color provided
+        padColor = [padColor] * 3
+    # scale and pad
+    scaled_img = cv2.resize(img, (new_w, new_h), interpolation=interp)
+    scaled_img = cv2.copyMakeBorder(scaled_img, pad_top, size[0] - new_h - pad_top, pad_left,
+                                    size[1] - new_w - pad_left, borderType=cv2.BORDER_CONSTANT, value=padColor)
+    return scaled_img
+
+
+def letterbox_into(img, out):
+    """
+    Letterbox an image into a preallocated uint8 array of shape (height, width, 3), zero padded.
+    """
+    new_w, new_h, pad_top, pad_left, interp = letterbox_geometry(img.shape[0], img.shape[1], out.shape[:2])
+    out.fill(0)
+    region = out[pad_top:pad_top + new_h, pad_left:pad_left + new_w]
+    resized = cv2.resize(img, (new_w, new_h), dst=region, interpolation=interp)
+    if resized is not region:
+        # Older OpenCV bindings may not write into a strided view
+        region[...] = resized
+    return out
+
+
+class LetterboxBatch:
+    """
+    Preallocated input batch of one classifier size.
+
+    Crops are letterboxed into a reused uint8 buffer and normalized into a reused float32 buffer
+    with one table lookup, so a batch costs no per-crop allocations.
+    """
+
+    def __init__(self, size, capacity):
+        """
+        Args:
+            size (tuple): (height, width) of the classifier input.
+            capacity (int): Largest batch.
+        """
+        self.size = tuple(size)
+        self.capacity = int(capacity)
+        self._pixels = np.zeros((self.capacity,) + self.size + (3,), dtype=np.uint8)
+        self._inputs = np.empty((self.capacity,) + self.size + (3,), dtype=np.float32)
+
+    def fill(self, crops):
+        """
+        Letterbox and normalize up to `capacity` crops.
+
+        Returns:
+            numpy.ndarray: (len(crops), height, width, 3) float32 view into the buffer, valid until the
+            next call.
+        """
+        n = len(crops)
+        if n > self.capacity:
+            raise ValueError(f"Batch of {n} crops exceeds the buffer capacity of {self.capacity}")
+        if n == 0:
+            return self._inputs[:0]
+        for i, crop in enumerate(crops):
+            letterbox_into(crop, self._pixels[i])
+        # The batch is viewed as one 2-D image so the lookup writes straight into the float buffer
+        height, width = self.size
+        pixels = self._pixels[:n].reshape(n * height, width * 3)
+        inputs = self._inputs[:n].reshape(n * height, width * 3)
+        cv2.LUT(pixels, NORMALIZE_LUT, dst=inputs)
+        return self._inputs[:n]
+
+
+class ClassifierPreprocessor:
+    """
+    Builds the inputs of several classifiers from the same crops in one call.
+
+    Every thread gets its own buffers, so one preprocessor can be shared by concurrent callers.
+    A returned batch stays valid until the same thread calls `prepare` again.
+
+    Example:
+        preprocessor = ClassifierPreprocessor([(224, 224), (128, 128)], capacity=32)
+        color_inputs, model_inputs = preprocessor.prepare(crops)
+    """
+
+    def __init__(self, sizes, capacity=32):
+        """
+        Args:
+            sizes (list of tuple): (height, width) of every classifier input.
+            capacity (int): Largest number of crops per call.
+        """
+        self.sizes = [tuple(size) for size in sizes]
+        self.capacity = int(capacity)
+        self._local = threading.local()
+
+    def _batches(self):
+        batches = getattr(self._local, "batches", None)
+        if batches is None:
+            batches = self._local.batches = [LetterboxBatch(size, self.capacity) for size in self.sizes]
+        return batches
+
+    def prepare(self, crops):
+        """
+        Letterbox and normalize the crops for every size.
+
+        Returns:
+            list of numpy.ndarray: One (len(crops), height, width, 3) float32 batch per size.
+        """
+        return [batch.fill(crops) for batch in self._batches()]
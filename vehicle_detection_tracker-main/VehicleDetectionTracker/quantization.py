@@ -0,0 +1,238 @@
+"""
+Post-training INT8 quantization of the color and make/model classifiers.
+
+The float ONNX export of each frozen graph is quantized with ONNX Runtime's static quantization,
+calibrated on crops of the images in examples/, and written next to the graph as
+`<model>.int8.onnx` (`config.int8_onnx_file`), where the classifiers load it from with
+`VRS_CLASSIFIER_PRECISION=int8`. The crops are split into a calibration set and a held-out
+evaluation set, and a report compares the INT8 model with the float ONNX model on the held-out
+crops only: top-1 agreement and per-crop latency. When TensorFlow is installed, both are also
+compared with the original frozen graph; otherwise the float ONNX export is the only baseline.
+
+Usage:
+    python -m VehicleDetectionTracker.quantization --examples examples --report quantization_report.json
+"""
+import argparse
+import glob
+import importlib.util
+import json
+import os
+import time
+
+import cv2
+import numpy as np
+
+from VehicleDetectionTracker.color_classifier import config as color_config
+from VehicleDetectionTracker.inference_backend import create_backend, export_onnx
+from VehicleDetectionTracker.model_classifier import config as model_config
+from VehicleDetectionTracker.preprocessing import ClassifierPreprocessor
+
+CLASSIFIERS = {"color": color_config, "make_model": model_config}
+VEHICLE_CLASSES = [2, 3, 5, 7]  # COCO car, motorcycle, bus, truck
+
+
+def load_crops(examples_dir, detector_path=None):
+    """
+    Vehicle crops of the images in `examples_dir`.
+
+    Without a detector the whole images are used, which suits the mostly single-vehicle photos in
+    examples/. With a YOLO model every detected vehicle is cropped instead.
+    """
+    paths = sorted(glob.glob(os.path.join(examples_dir, "*.jpg")) + glob.glob(os.path.join(examples_dir, "*.png")))
+    images = [image for image in (cv2.imread(path) for path in paths) if image is not None]
+    if detector_path is None:
+        return images
+    from ultralytics import YOLO
+
+    detector = YOLO(detector_path)
+    crops = []
+    for image in images:
+        boxes = detector.predict(image, classes=VEHICLE_CLASSES, verbose=False)[0].boxes.xyxy.cpu().numpy()
+        for x1, y1, x2, y2 in boxes.astype(int):
+            crop = image[max(0, y1):y2, max(0, x1):x2]
+            if crop.size > 0:
+                crops.append(crop)
+    return crops
+
+
+def split_crops(crops, holdout=0.3, seed=0):
+    """
+    Split the crops into a calibration set and a held-out evaluation set.
+
+    Args:
+        crops (list): Vehicle crops.
+        holdout (float): Share of the crops held out for evaluation.
+        seed (int): Seed of the shuffle, so the split is the same on every run.
+
+    Returns:
+        tuple: (calibration crops, evaluation crops), both non-empty.
+    """
+    if len(crops) < 2:
+        raise ValueError(f"At least 2 crops are needed to calibrate and evaluate, got {len(crops)}")
+    order = np.random.default_rng(seed).permutation(len(crops))
+    evaluation = min(max(1, round(len(crops) * holdout)), len(crops) - 1)
+    return [crops[i] for i in sorted(order[evaluation:])], [crops[i] for i in sorted(order[:evaluation])]
+
+
+def tensorflow_available():
+    return importlib.util.find_spec("tensorflow") is not None
+
+
+def preprocess(crops, size, batch_size):
+    """
+    Letterboxed and normalized batches of the crops, as the classifiers feed them to their backend.
+    """
+    preprocessor = ClassifierPreprocessor([size], capacity=batch_size)
+    return [preprocessor.prepare(crops[start:start + batch_size])[0].copy()
+            for start in range(0, len(crops), batch_size)]
+
+
+class CropCalibrationReader:
+    """
+    Feeds preprocessed crop batches to ONNX Runtime's calibrator (`CalibrationDataReader` interface).
+    """
+
+    def __init__(self, input_name, batches):
+        self.input_name = input_name
+        self.batches = batches
+        self._next = 0
+
+    def get_next(self):
+        if self._next >= len(self.batches):
+            return None
+        self._next += 1
+        return {self.input_name: self.batches[self._next - 1]}
+
+    def rewind(self):
+        self._next = 0
+
+
+def quantize_classifier(config, batches, per_channel=False):
+    """
+    Quantize one classifier to INT8, calibrated on `batches`.
+
+    Args:
+        config (module): `color_classifier.config` or `model_classifier.config`.
+        batches (list of numpy.ndarray): Preprocessed calibration batches.
+        per_channel (bool): Quantize the weights per output channel instead of per tensor.
+
+    Returns:
+        str: Path of the INT8 model.
+    """
+    import onnxruntime as ort
+    from onnxruntime.quantization import CalibrationMethod, QuantFormat, QuantType, quantize_static
+
+    if not os.path.exists(config.onnx_file):
+        export_onnx(config.model_file, config.input_layer, config.output_layer, config.onnx_file)
+    input_name = ort.InferenceSession(config.onnx_file, providers=["CPUExecutionProvider"]).get_inputs()[0].name
+    quantize_static(config.onnx_file, config.int8_onnx_file, CropCalibrationReader(input_name, batches),
+                    quant_format=QuantFormat.QDQ, activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8,
+                    per_channel=per_channel, calibrate_method=CalibrationMethod.MinMax)
+    return config.int8_onnx_file
+
+
+def _timed_run(backend, batches):
+    backend.run(batches[0])  # warm-up
+    outputs = []
+    start = time.perf_counter()
+    for batch in batches:
+        outputs.append(backend.run(batch))
+    return np.concatenate(outputs, axis=0), time.perf_counter() - start
+
+
+def _agreement(probs, reference):
+    return round(float(np.mean(probs.argmax(axis=1) == reference.argmax(axis=1))), 4)
+
+
+def compare(config, batches, threads=1, tf_baseline=False):
+    """
+    Top-1 agreement and per-crop latency of the INT8 model against the float ONNX model.
+
+    Args:
+        config (module): `color_classifier.config` or `model_classifier.config`.
+        batches (list of numpy.ndarray): Preprocessed held-out batches, not used for calibration.
+        threads (int): Intra-op threads of every backend.
+        tf_baseline (bool): Also run the frozen graph with TensorFlow and report the agreement of
+            both ONNX models with it (`tf_*` keys).
+
+    Returns:
+        dict: The comparison, as written to the report.
+    """
+    options = dict(onnx_file=config.onnx_file, int8_onnx_file=config.int8_onnx_file,
+                   intra_op_threads=threads, inter_op_threads=1)
+    float_backend = create_backend("onnxruntime", config.model_file, config.input_layer, config.output_layer,
+                                   precision="float32", **options)
+    int8_backend = create_backend("onnxruntime", config.model_file, config.input_layer, config.output_layer,
+                                  precision="int8", **options)
+    float_probs, float_seconds = _timed_run(float_backend, batches)
+    int8_probs, int8_seconds = _timed_run(int8_backend, batches)
+    crops = len(float_probs)
+    result = {
+        "evaluation_crops": crops,
+        "top1_agreement": _agreement(int8_probs, float_probs),
+        "mean_abs_prob_diff": round(float(np.abs(float_probs - int8_probs).mean()), 6),
+        "float32_ms_per_crop": round(1000 * float_seconds / crops, 3),
+        "int8_ms_per_crop": round(1000 * int8_seconds / crops, 3),
+        "speedup": round(float_seconds / int8_seconds, 2) if int8_seconds > 0 else None,
+        "float32_model_bytes": os.path.getsize(config.onnx_file),
+        "int8_model_bytes": os.path.getsize(config.int8_onnx_file),
+    }
+    if tf_baseline:
+        tf_backend = create_backend("tf", config.model_file, config.input_layer, config.output_layer,
+                                    intra_op_threads=threads, inter_op_threads=1)
+        tf_probs, tf_seconds = _timed_run(tf_backend, batches)
+        tf_backend.close()
+        result.update({
+            "tf_float32_ms_per_crop": round(1000 * tf_seconds / crops, 3),
+            "tf_top1_agreement_float32": _agreement(float_probs, tf_probs),
+            "tf_top1_agreement_int8": _agreement(int8_probs, tf_probs),
+        })
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Quantize the classifiers to INT8 and report agreement and latency")
+    parser.add_argument("--examples", default="examples", help="Directory of calibration images")
+    parser.add_argument("--detector", default=None, help="YOLO model to crop vehicles with (whole images otherwise)")
+    parser.add_argument("--classifiers", nargs="+", choices=sorted(CLASSIFIERS), default=sorted(CLASSIFIERS))
+    parser.add_argument("--holdout", type=float, default=0.3,
+                        help="Share of the crops held out from calibration to measure agreement on")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the calibration/evaluation split")
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--per-channel", action="store_true", help="Per-channel weight quantization")
+    parser.add_argument("--threads", type=int, default=1, help="Intra-op threads while timing")
+    parser.add_argument("--report", default=None, help="Write the report to this JSON file")
+    parser.add_argument("--report-only", action="store_true", help="Compare existing INT8 models without quantizing")
+    args = parser.parse_args()
+
+    crops = load_crops(args.examples, args.detector)
+    if len(crops) < 2:
+        raise SystemExit(f"At least 2 images are needed in {args.examples}, found {len(crops)}")
+    calibration_crops, evaluation_crops = split_crops(crops, args.holdout, args.seed)
+    tf_baseline = tensorflow_available()
+    report = {
+        "calibration_crops": len(calibration_crops),
+        "evaluation_crops": len(evaluation_crops),
+        "per_channel": args.per_channel,
+        "tf_baseline": tf_baseline,
+        "classifiers": {},
+    }
+    if not tf_baseline:
+        report["note"] = ("TensorFlow is not installed: agreement is measured against the float ONNX export, "
+                          "so conversion differences between it and the frozen graph are not included")
+    for name in args.classifiers:
+        config = CLASSIFIERS[name]
+        if not args.report_only:
+            calibration = preprocess(calibration_crops, config.classifier_input_size, args.batch_size)
+            quantize_classifier(config, calibration, per_channel=args.per_channel)
+        evaluation = preprocess(evaluation_crops, config.classifier_input_size, args.batch_size)
+        report["classifiers"][name] = compare(config, evaluation, threads=args.threads, tf_baseline=tf_baseline)
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.report:
+        with open(args.report, "w") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+import asyncio
+from collections import defaultdict
+
+import cv2
+
+from VehicleDetectionTracker.instrumentation import metrics
+
+
+def vote_plate(reads):
+    """
+    Combine several OCR reads of the same plate character by character.
+
+    Reads are grouped by text length and the group with the largest total weight wins. Within it,
+    every position takes the character with the largest summed weight.
+
+    Args:
+        reads (list): (text, weight) pairs; the weight is typically the OCR confidence.
+
+    Returns:
+        tuple: (text, consensus, votes) where `consensus` is the smallest share of the group weight
+        that agreed on a character over all positions and `votes` is the number of reads in the
+        winning group; (None, 0.0, 0) without reads.
+    """
+    groups = defaultdict(list)
+    for text, weight in reads:
+        if text:
+            groups[len(text)].append((text, weight))
+    if not groups:
+        return None, 0.0, 0
+    group = max(groups.values(), key=lambda group: sum(weight for _, weight in group))
+    total = sum(weight for _, weight in group)
+    characters = []
+    consensus = 1.0
+    for position in range(len(group[0][0])):
+        scores = defaultdict(float)
+        for text, weight in group:
+            scores[text[position]] += weight
+        character, score = max(scores.items(), key=lambda item: item[1])
+        characters.append(character)
+        consensus = min(consensus, score / total if total > 0 else 0.0)
+    return "".join(characters), consensus, len(group)
+
+
+class TrackPlate:
+    """
+    OCR reads of the plate of a single track and the result of the vote.
+    """
+
+    __slots__ = ("reads", "attempts", "text", "confidence", "consensus", "votes", "final")
+
+    def __init__(self):
+        self.reads = []  # (text, weight) of every read that found a plate
+        self.attempts = 0  # OCR runs on this track, including those that found nothing
+        self.text = None
+        self.confidence = None
+        self.consensus = 0.0
+        self.votes = 0
+        self.final = False
+
+    def as_dict(self):
+        return {
+            "recognition_text": self.text,
+            "recognition_confidence": round(self.confidence, 2) if self.confidence is not None else None,
+            "consensus": round(self.consensus, 2),
+            "votes": self.votes,
+            "final": self.final,
+        }
+
+
+class TrackPlateReader:
+    """
+    Reads the plate of each track once instead of in every frame.
+
+    Every frame, only the crops of tracks without a final plate are sent to the plate reader
+    (`anpr`, e.g. a `fastanpr.FastANPR`), all in one call. The reads of a track are combined with
+    `vote_plate`, each weighted by its recognition confidence. A track's plate becomes final, and
+    OCR for it stops, as soon as one read reaches `stop_confidence`, or `min_votes` reads of the
+    same length agree on every character by at least `consensus` of their weight, or
+    `max_attempts` OCR runs have been spent on it. The current plate of every track is attached
+    to its vehicle entry as `plate_info`.
+    """
+
+    def __init__(self, anpr, stop_confidence=0.95, min_votes=3, consensus=0.6, max_attempts=15, bgr=True):
+        """
+        Args:
+            anpr: Object with an async `run(images)` that returns, per image, a list of plates with
+                `rec_text`, `rec_conf` and `det_conf` (FastANPR's interface).
+            stop_confidence (float): A single read at least this confident is final.
+            min_votes (int): Agreeing reads needed to finalize by consensus.
+            consensus (float): Smallest per-character agreement (share of weight) to finalize.
+            max_attempts (int): OCR runs per track at most.
+            bgr (bool): Crops are BGR (OpenCV frames) and are converted to the RGB the plate reader expects.
+        """
+        self.anpr = anpr
+        self.stop_confidence = stop_confidence
+        self.min_votes = max(1, int(min_votes))
+        self.consensus = consensus
+        self.max_attempts = max(1, int(max_attempts))
+        self.bgr = bgr
+        self._tracks = {}
+        self._loop = None
+        self.ocr_crops = 0  # Crops sent to the plate reader
+        self.skipped_crops = 0  # Crops of tracks whose plate was already final
+
+    def __len__(self):
+        return len(self._tracks)
+
+    def get(self, track_id):
+        return self._tracks.get(track_id)
+
+    def select(self, vehicles, vehicle_frames):
+        """
+        Indices of the vehicles whose crops still need OCR.
+        """
+        selected = []
+        for i, (vehicle, vehicle_frame) in enumerate(zip(vehicles, vehicle_frames)):
+            state = self._tracks.get(vehicle["vehicle_id"])
+            if state is not None and state.final:
+                self.skipped_crops += 1
+            elif vehicle_frame.size > 0:
+                selected.append(i)
+        return selected
+
+    def prepare_crops(self, crops):
+        """
+        Convert crops to the color order of the plate reader.
+        """
+        if self.bgr:
+            return [cv2.cvtColor(crop, cv2.COLOR_BGR2RGB) for crop in crops]
+        return list(crops)
+
+    def _finalize(self, state):
+        text, consensus, votes = vote_plate(state.reads)
+        state.text = text
+        state.consensus = consensus
+        state.votes = votes
+        if text is None:
+            state.confidence = None
+            state.final = state.attempts >= self.max_attempts
+            return
+        # Mean confidence of the reads that took part in the vote, discounted by their disagreement
+        weights = [weight for read, weight in state.reads if len(read) == len(text)]
+        state.confidence = consensus * sum(weights) / len(weights)
+        best = max(weight for _, weight in state.reads)
+        state.final = (best >= self.stop_confidence
+                       or (votes >= self.min_votes and consensus >= self.consensus)
+                       or state.attempts >= self.max_attempts)
+        if best >= self.stop_confidence:
+            # A read confident enough on its own wins over the vote
+            state.text, state.confidence = max(state.reads, key=lambda read: read[1])
+
+    def record(self, vehicles, selected, number_plates):
+        """
+        Add the OCR output of the selected crops to their tracks.
+
+        Args:
+            vehicles (list of dict): Vehicle entries of the frame.
+            selected (list of int): Indices returned by `select`.
+            number_plates (list): Plate reader output, one list of plates per selected crop.
+        """
+        for i, plates in zip(selected, number_plates):
+            state = self._tracks.get(vehicles[i]["vehicle_id"])
+            if state is None:
+                state = self._tracks[vehicles[i]["vehicle_id"]] = TrackPlate()
+            state.attempts += 1
+            plates = [plate for plate in plates if plate.rec_text]
+            if plates:
+                # The most confidently detected plate of the crop belongs to the vehicle
+                plate = max(plates, key=lambda plate: plate.det_conf if plate.det_conf is not None else 0.0)
+                weight = plate.rec_conf if plate.rec_conf is not None else (plate.det_conf or 0.0)
+                state.reads.append((plate.rec_text, float(weight)))
+            self._finalize(state)
+
+    def attach(self, vehicles):
+        """
+        Store the current plate of every track in its vehicle entry (`plate_info`, None if unread).
+        """
+        for vehicle in vehicles:
+            state = self._tracks.get(vehicle["vehicle_id"])
+            vehicle["plate_info"] = state.as_dict() if state is not None and state.text is not None else None
+
+    async def update(self, vehicles, vehicle_frames):
+        """
+        Run OCR on the tracks of a frame that still need it and attach the plates.
+        """
+        selected = self.select(vehicles, vehicle_frames)
+        if selected:
+            self.ocr_crops += len(selected)
+            metrics.inc("vrs_ocr_calls_total")
+            metrics.inc("vrs_ocr_images_total", len(selected))
+            crops = self.prepare_crops([vehicle_frames[i] for i in selected])
+            with metrics.timer("anpr"):
+                number_plates = await self.anpr.run(crops)
+            self.record(vehicles, selected, number_plates)
+        self.attach(vehicles)
+
+    def update_sync(self, vehicles, vehicle_frames):
+        """
+        `update` for callers without an event loop, such as the video pipeline threads.
+        """
+        if self._loop is None:
+            self._loop = asyncio.new_event_loop()
+        self._loop.run_until_complete(self.update(vehicles, vehicle_frames))
+
+    def remove(self, track_ids):
+        for track_id in track_ids:
+            self._tracks.pop(track_id, None)
+
+    def clear(self):
+        self._tracks.clear()
+
+    def stats(self):
+        return {
+            "tracks": len(self._tracks),
+            "final": sum(state.final for state in self._tracks.values()),
+            "ocr_crops": self.ocr_crops,
+            "skipped_crops": self.skipped_crops,
+        }
@@ -0,0 +1,155 @@
+import numpy as np
+
+
+class RingBuffer:
+    """
+    Fixed-capacity FIFO of float rows backed by a preallocated numpy array.
+
+    Appending is O(1); once full, the oldest row is overwritten.
+    """
+
+    def __init__(self, capacity, width):
+        self._data = np.zeros((capacity, width), dtype=np.float64)
+        self._start = 0
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def capacity(self):
+        return self._data.shape[0]
+
+    @property
+    def nbytes(self):
+        return self._data.nbytes
+
+    def append(self, row):
+        end = (self._start + self._size) % self.capacity
+        self._data[end] = row
+        if self._size < self.capacity:
+            self._size += 1
+        else:
+            self._start = (self._start + 1) % self.capacity
+
+    def first(self):
+        return self._data[self._start]
+
+    def last(self):
+        return self._data[(self._start + self._size - 1) % self.capacity]
+
+    def values(self):
+        """
+        Rows in insertion order, oldest first (a copy).
+        """
+        end = self._start + self._size
+        if end <= self.capacity:
+            return self._data[self._start:end].copy()
+        return np.concatenate((self._data[self._start:], self._data[:end - self.capacity]))
+
+    def clear(self):
+        self._start = 0
+        self._size = 0
+
+
+class TrackState:
+    """
+    Bounded history of a single track: its last positions and the times they were observed.
+    """
+
+    __slots__ = ("track_id", "positions", "timestamps", "first_seen_frame", "last_seen_frame", "last_seen_time")
+
+    def __init__(self, track_id, max_history):
+        self.track_id = track_id
+        self.positions = RingBuffer(max_history, 2)
+        self.timestamps = RingBuffer(max_history, 1)
+        self.first_seen_frame = None
+        self.last_seen_frame = None
+        self.last_seen_time = None
+
+    @property
+    def nbytes(self):
+        return self.positions.nbytes + self.timestamps.nbytes
+
+
+class TrackStore:
+    """
+    Per-track state of a tracker, with memory bounded by the number of live tracks.
+
+    Each track keeps at most `max_history` samples. Tracks that have not been updated for
+    `max_age_frames` frames, or for `max_age_seconds` seconds of frame time, are evicted by `evict()`.
+    """
+
+    def __init__(self, max_history=30, max_age_frames=90, max_age_seconds=None):
+        """
+        Args:
+            max_history (int): Samples kept per track.
+            max_age_frames (int or None): Evict tracks unseen for more than this many frames.
+            max_age_seconds (float or None): Evict tracks unseen for more than this many seconds.
+        """
+        self.max_history = max_history
+        self.max_age_frames = max_age_frames
+        self.max_age_seconds = max_age_seconds
+        self._tracks = {}
+
+    def __len__(self):
+        return len(self._tracks)
+
+    def __contains__(self, track_id):
+        return track_id in self._tracks
+
+    def get(self, track_id):
+        return self._tracks.get(track_id)
+
+    def track_ids(self):
+        return list(self._tracks)
+
+    def update(self, track_id, x, y, timestamp, frame_index):
+        """
+        Record an observation of a track, creating its state on first sight.
+
+        Args:
+            track_id (int): Tracker id.
+            x (float), y (float): Center of the bounding box.
+            timestamp (float): Frame time in seconds.
+            frame_index (int): Index of the frame in the processed sequence.
+
+        Returns:
+            TrackState: The updated state.
+        """
+        state = self._tracks.get(track_id)
+        if state is None:
+            state = self._tracks[track_id] = TrackState(track_id, self.max_history)
+            state.first_seen_frame = frame_index
+        state.positions.append((x, y))
+        state.timestamps.append(timestamp)
+        state.last_seen_frame = frame_index
+        state.last_seen_time = timestamp
+        return state
+
+    def evict(self, frame_index, timestamp=None):
+        """
+        Drop tracks that are too old.
+
+        Returns:
+            list: Ids of the evicted tracks.
+        """
+        expired = []
+        for track_id, state in self._tracks.items():
+            if self.max_age_frames is not None and frame_index - state.last_seen_frame > self.max_age_frames:
+                expired.append(track_id)
+            elif (self.max_age_seconds is not None and timestamp is not None
+                  and timestamp - state.last_seen_time > self.max_age_seconds):
+                expired.append(track_id)
+        for track_id in expired:
+            del self._tracks[track_id]
+        return expired
+
+    def memory_bytes(self):
+        """
+        Bytes held by the sample buffers of all live tracks.
+        """
+        return sum(state.nbytes for state in self._tracks.values())
+
+    def clear(self):
+        self._tracks.clear()
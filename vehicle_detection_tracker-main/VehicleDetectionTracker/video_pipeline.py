@@ -0,0 +1,193 @@
+import queue
+import threading
+from collections import namedtuple
+from contextlib import closing
+
+import cv2
+
+# One processed frame: its index in the video, its time in seconds on the video clock,
+# the decoded frame and the tracker response.
+VideoFrameResult = namedtuple("VideoFrameResult", ["frame_index", "timestamp", "frame", "response"])
+
+_END = object()  # Marks the end of a stage's output
+
+
+def read_frames(source, stride=1, start_time=None, end_time=None, stop=None):
+    """
+    Decode every `stride`-th frame of a video source.
+
+    Every frame is grabbed and its time checked, but only the kept ones are decoded, so skipped
+    frames cost no decoding and `end_time` applies to them too.
+
+    Args:
+        source (str or int): Anything accepted by `cv2.VideoCapture`.
+        stride (int): Keep every `stride`-th frame, counting from the first one read.
+        start_time (float, optional): Seek to this position (seconds) before reading.
+        end_time (float, optional): Stop after this position (seconds).
+        stop (threading.Event, optional): Stops reading when set.
+
+    Yields:
+        tuple: (frame_index, timestamp, frame); the index counts from the start of the file.
+    """
+    stride = max(1, int(stride))
+    cap = cv2.VideoCapture(source)
+    try:
+        if not cap.isOpened():
+            raise IOError(f"Cannot open video source: {source}")
+        if start_time:
+            cap.set(cv2.CAP_PROP_POS_MSEC, start_time * 1000.0)
+        # Frame indices count from the start of the file, not from the seek point (live sources report 0)
+        first_index = max(0, int(cap.get(cv2.CAP_PROP_POS_FRAMES)))
+        grabbed = 0
+        while stop is None or not stop.is_set():
+            if not cap.grab():
+                break
+            frame_index = first_index + grabbed
+            grabbed += 1
+            timestamp = cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+            if end_time is not None and timestamp > end_time:
+                break
+            if (frame_index - first_index) % stride != 0:
+                continue
+            success, frame = cap.retrieve()
+            if not success:
+                break
+            yield frame_index, timestamp, frame
+    finally:
+        cap.release()
+
+
+class _StageError:
+    def __init__(self, error):
+        self.error = error
+
+
+class VideoPipeline:
+    """
+    Headless, threaded video processing with a generator interface.
+
+    A decode thread reads frames into a bounded queue, an inference thread runs
+    `VehicleDetectionTracker.process_frame` on them and puts the results into a second bounded
+    queue, and iterating the pipeline consumes those results (the sink stage). Decoding therefore
+    overlaps inference, and the queue sizes bound memory.
+
+    With `backpressure="block"` the decoder waits when the inference stage falls behind, so no
+    frame is lost (files). With `backpressure="drop"` the oldest queued frame is discarded instead,
+    so a live source never lags behind (streams).
+
+    Example:
+        for result in VideoPipeline(tracker, "traffic.mp4", stride=2, lean=True):
+            print(result.timestamp, result.response["number_of_vehicles_detected"])
+    """
+
+    def __init__(self, tracker, video_path, stride=1, start_time=None, end_time=None, queue_size=8,
+                 backpressure="block", lean=True, annotate=False):
+        """
+        Args:
+            tracker (VehicleDetectionTracker): Tracker that processes the frames.
+            video_path (str or int): Anything accepted by `cv2.VideoCapture`.
+            stride (int): Process every `stride`-th frame; the others are skipped without decoding.
+            start_time (float, optional): Seek to this position (seconds) before reading.
+            end_time (float, optional): Stop after this position (seconds).
+            queue_size (int): Capacity of each queue between stages.
+            backpressure (str): "block" or "drop", see the class description.
+            lean (bool): Passed to `process_frame`.
+            annotate (bool): Passed to `process_frame`; needed to display annotated frames.
+        """
+        if backpressure not in ("block", "drop"):
+            raise ValueError("backpressure must be 'block' or 'drop'")
+        self.tracker = tracker
+        self.video_path = video_path
+        self.stride = max(1, int(stride))
+        self.start_time = start_time
+        self.end_time = end_time
+        self.queue_size = max(1, int(queue_size))
+        self.backpressure = backpressure
+        self.lean = lean
+        self.annotate = annotate
+        self.frames_decoded = 0
+        self.frames_dropped = 0
+        self._stop = threading.Event()
+
+    def _put(self, q, item, drop_oldest=False):
+        """
+        Put into a bounded queue, giving up when the pipeline is stopped.
+        """
+        while not self._stop.is_set():
+            if drop_oldest and q.full():
+                try:
+                    q.get_nowait()
+                    self.frames_dropped += 1
+                except queue.Empty:
+                    pass
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, q):
+        while not self._stop.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _END
+
+    def _decode(self, frames):
+        try:
+            with closing(read_frames(self.video_path, self.stride, self.start_time, self.end_time,
+                                     self._stop)) as decoded:
+                for frame_index, timestamp, frame in decoded:
+                    self.frames_decoded += 1
+                    if not self._put(frames, (frame_index, timestamp, frame),
+                                     drop_oldest=self.backpressure == "drop"):
+                        break
+        except Exception as e:
+            self._put(frames, _StageError(e))
+        finally:
+            self._put(frames, _END)
+
+    def _infer(self, frames, results):
+        try:
+            while True:
+                item = self._get(frames)
+                if item is _END or isinstance(item, _StageError):
+                    self._put(results, item)
+                    return
+                frame_index, timestamp, frame = item
+                response = self.tracker.process_frame(frame, timestamp, lean=self.lean, annotate=self.annotate)
+                if not self._put(results, VideoFrameResult(frame_index, timestamp, frame, response)):
+                    return
+        except Exception as e:
+            self._put(results, _StageError(e))
+
+    def __iter__(self):
+        self._stop.clear()
+        frames = queue.Queue(maxsize=self.queue_size)
+        results = queue.Queue(maxsize=self.queue_size)
+        threads = [
+            threading.Thread(target=self._decode, args=(frames,), name="video-decode", daemon=True),
+            threading.Thread(target=self._infer, args=(frames, results), name="video-inference", daemon=True),
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            while True:
+                item = self._get(results)
+                if item is _END:
+                    return
+                if isinstance(item, _StageError):
+                    raise item.error
+                yield item
+        finally:
+            self._stop.set()
+            for thread in threads:
+                thread.join()
+
+    def stop(self):
+        """
+        Ask all stages to finish; iteration ends before the next result.
+        """
+        self._stop.set()
@@ -0,0 +1,219 @@
+"""
+Per-stage benchmark of the detection pipeline over the images in examples/.
+
+Every image goes through the stages of `VehicleDetectionTracker.process_frame` one at a time:
+
+- decode: `cv2.imdecode` of the file bytes
+- brightness: `_increase_brightness`
+- predict: the detector
+- track: ByteTrack association
+- crop
+- color_classifier and make_model_classifier: preprocessing plus the network
+- base64: JPEG/base64 of the frame, the annotated frame and the crops, as in non-lean responses
+- anpr: plate reading on the RGB frame
+
+The whole `process_frame` call is also timed as `end_to_end`. A first pass measures wall time;
+a second pass, with tracemalloc on, measures what each stage allocates. Results are written as
+JSON.
+
+By default the detector, the classifier networks and the plate reader are the deterministic stubs
+from `benchmarks/stubs.py`, so the numbers show the pipeline's own overhead and can be compared
+across commits on machines without weights. `--models real` loads YOLO, the configured classifier
+backend and FastANPR instead.
+
+The stub run also works without torch and ultralytics. ByteTrack comes from ultralytics, so it then
+skips the track stage and times `detect_image` (no tracking) as `end_to_end` instead of
+`process_frame`; the report says which one was timed. Only compare runs with the same `end_to_end`.
+
+Usage:
+    python benchmarks/pipeline_benchmark.py --output pipeline_benchmark.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from VehicleDetectionTracker.VehicleDetectionTracker import VehicleDetectionTracker  # noqa: E402
+from VehicleDetectionTracker.color_classifier.classifier import Classifier as ColorClassifier  # noqa: E402
+from VehicleDetectionTracker.model_classifier.classifier import Classifier as ModelClassifier  # noqa: E402
+from stubs import ultralytics_available  # noqa: E402
+
+STAGES = ["decode", "brightness", "predict", "track", "crop", "color_classifier", "make_model_classifier",
+          "base64", "anpr", "end_to_end"]
+
+
+class StageRecorder:
+    """
+    Collects the wall time and, when tracing, the allocation peak of every stage call.
+    """
+
+    def __init__(self, trace_allocations=False):
+        self.trace_allocations = trace_allocations
+        self.seconds = {stage: [] for stage in STAGES}
+        self.peak_bytes = {stage: [] for stage in STAGES}
+
+    @contextmanager
+    def stage(self, name):
+        if self.trace_allocations:
+            baseline, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.seconds[name].append(time.perf_counter() - start)
+            if self.trace_allocations:
+                _, peak = tracemalloc.get_traced_memory()
+                self.peak_bytes[name].append(peak - baseline)
+
+
+def build_models(kind):
+    if kind == "stub":
+        from stubs import StubANPR, StubDetector, register_stub_backend
+
+        register_stub_backend()
+        return StubDetector(), ColorClassifier(backend="stub"), ModelClassifier(backend="stub"), StubANPR()
+    from fastanpr import FastANPR
+    from ultralytics import YOLO
+
+    return YOLO(os.environ.get("VRS_DETECTOR_MODEL", "yolov8n.pt")), ColorClassifier(), ModelClassifier(), FastANPR()
+
+
+def run_stages(vd, anpr, loop, contents, recorder, tracking=True):
+    """
+    Run one image through the stages of `process_frame`, one at a time.
+    """
+    with recorder.stage("decode"):
+        frame = cv2.imdecode(np.frombuffer(contents, dtype=np.uint8), cv2.IMREAD_COLOR)
+    with recorder.stage("brightness"):
+        bright = vd._increase_brightness(frame)
+    with recorder.stage("predict"):
+        result = vd.model.predict(bright, verbose=False)[0]
+    if tracking:
+        with recorder.stage("track"):
+            result = vd._track(result, frame)
+    with recorder.stage("crop"):
+        crops = []
+        for x, y, w, h in result.boxes.xywh.cpu().numpy():
+            x1, y1, x2, y2 = vd._vehicle_bbox(x, y, w, h, frame.shape)
+            crops.append(frame[y1:y2, x1:x2])
+        crops = [crop for crop in crops if crop.size > 0]
+    with recorder.stage("color_classifier"):
+        vd.color_classifier.predict_proba_batch(crops)
+    with recorder.stage("make_model_classifier"):
+        vd.model_classifier.predict_proba_batch(crops)
+    with recorder.stage("base64"):
+        vd._encode_image_base64(frame)
+        vd._encode_image_base64(result.plot())
+        for crop in crops:
+            vd._encode_image_base64(crop)
+    with recorder.stage("anpr"):
+        loop.run_until_complete(anpr.run([cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)]))
+
+
+def run_pass(vd, anpr, loop, images, repeat, recorder, tracking=True):
+    for _ in range(repeat):
+        vd.reset()
+        for contents in images:
+            run_stages(vd, anpr, loop, contents, recorder, tracking)
+        vd.reset()
+        for timestamp, contents in enumerate(images):
+            frame = cv2.imdecode(np.frombuffer(contents, dtype=np.uint8), cv2.IMREAD_COLOR)
+            with recorder.stage("end_to_end"):
+                if tracking:
+                    vd.process_frame(frame, float(timestamp))
+                else:
+                    vd.detect_image(frame)
+
+
+def summarize(timing, allocations):
+    stages = {}
+    for stage in STAGES:
+        seconds = np.array(timing.seconds[stage]) * 1000
+        summary = {
+            "calls": len(seconds),
+            "total_ms": round(float(seconds.sum()), 3),
+            "mean_ms": round(float(seconds.mean()), 4) if len(seconds) else None,
+            "p50_ms": round(float(np.percentile(seconds, 50)), 4) if len(seconds) else None,
+            "p95_ms": round(float(np.percentile(seconds, 95)), 4) if len(seconds) else None,
+        }
+        if allocations is not None and allocations.peak_bytes[stage]:
+            peaks = np.array(allocations.peak_bytes[stage])
+            summary["alloc_peak_bytes_mean"] = int(peaks.mean())
+            summary["alloc_peak_bytes_max"] = int(peaks.max())
+        stages[stage] = summary
+    return stages
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-stage benchmark of the detection pipeline over examples/")
+    parser.add_argument("--examples", default=str(Path(__file__).parent.parent / "examples"))
+    parser.add_argument("--models", choices=["stub", "real"], default="stub")
+    parser.add_argument("--repeat", type=int, default=3, help="Passes over the images for the timing")
+    parser.add_argument("--limit", type=int, default=None, help="Use only the first N images")
+    parser.add_argument("--no-allocations", action="store_true", help="Skip the tracemalloc pass")
+    parser.add_argument("--output", default=None, help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    paths = sorted(p for p in Path(args.examples).iterdir() if p.suffix.lower() in (".jpg", ".jpeg", ".png"))
+    images = [path.read_bytes() for path in paths[:args.limit]]
+    if not images:
+        raise SystemExit(f"No images found in {args.examples}")
+
+    # ByteTrack and the result annotation of process_frame need ultralytics; the stubs do not
+    tracking = args.models == "real" or ultralytics_available()
+    detector, color_classifier, model_classifier, anpr = build_models(args.models)
+    vd = VehicleDetectionTracker(model=detector, color_classifier=color_classifier, model_classifier=model_classifier)
+    vd._initialize_classifiers()
+    loop = asyncio.new_event_loop()
+
+    # Warm-up: lazy model initialization, ByteTrack configuration and OpenCV/NumPy first-call costs
+    run_pass(vd, anpr, loop, images[:2], 1, StageRecorder(), tracking)
+    timing = StageRecorder()
+    start = time.perf_counter()
+    run_pass(vd, anpr, loop, images, args.repeat, timing, tracking)
+    wall = time.perf_counter() - start
+    allocations = None
+    if not args.no_allocations:
+        allocations = StageRecorder(trace_allocations=True)
+        tracemalloc.start()
+        run_pass(vd, anpr, loop, images, 1, allocations, tracking)
+        tracemalloc.stop()
+    loop.close()
+
+    report = {
+        "models": args.models,
+        "images": len(images),
+        "repeat": args.repeat,
+        "wall_seconds": round(wall, 3),
+        "end_to_end": "process_frame" if tracking else "detect_image",
+        "environment": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "opencv": cv2.__version__,
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "classifier_backend": color_classifier.backend_name,
+        },
+        "stages": summarize(timing, allocations),
+    }
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
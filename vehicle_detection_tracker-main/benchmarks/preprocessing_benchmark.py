@@ -0,0 +1,147 @@
+"""
+Micro-benchmark of the classifier preprocessing.
+
+Compares the per-crop path the classifiers used before (the original resizeAndPad, np.stack,
+astype and in-place scaling, once per classifier) with `ClassifierPreprocessor.prepare`, which
+writes both classifier inputs into reused buffers. Crops are cut from the images in examples/.
+
+`peak_bytes_per_batch` is measured with tracemalloc, which sees the Python and numpy heap (the
+stacked and converted batches) but not OpenCV's internal buffers.
+
+Usage:
+    python benchmarks/preprocessing_benchmark.py --batch 16 --repeat 50
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from VehicleDetectionTracker.preprocessing import ClassifierPreprocessor  # noqa: E402
+
+SIZES = [(224, 224), (128, 128)]  # color and make/model classifier inputs
+
+
+def load_crops(examples_dir, count, seed=0):
+    """
+    Cut `count` crops of varied size and aspect ratio from the example images.
+    """
+    paths = sorted(glob.glob(os.path.join(examples_dir, "*.jpg")) + glob.glob(os.path.join(examples_dir, "*.png")))
+    images = [image for image in (cv2.imread(path) for path in paths) if image is not None]
+    if not images:
+        raise SystemExit(f"No images found in {examples_dir}")
+    rng = np.random.default_rng(seed)
+    crops = []
+    for i in range(count):
+        image = images[i % len(images)]
+        h, w = image.shape[:2]
+        ch = int(rng.integers(max(2, h // 8), max(3, h // 2)))
+        cw = int(rng.integers(max(2, w // 8), max(3, w // 2)))
+        y = int(rng.integers(0, h - ch + 1))
+        x = int(rng.integers(0, w - cw + 1))
+        crops.append(image[y:y + ch, x:x + cw])
+    return crops
+
+
+def legacy_resize_and_pad(img, size, padColor=0):
+    """
+    resizeAndPad as the classifiers shipped it before the shared preprocessing, kept verbatim as
+    the baseline.
+    """
+    h, w = img.shape[:2]
+    sh, sw = size
+
+    # interpolation method
+    if h > sh or w > sw: # shrinking image
+        interp = cv2.INTER_AREA
+    else: # stretching image
+        interp = cv2.INTER_CUBIC
+
+    # aspect ratio of image
+    aspect = w/h  # if on Python 2, you might need to cast as a float: float(w)/h
+
+    # compute scaling and pad sizing
+    if aspect > 1: # horizontal image
+        new_w = sw
+        new_h = np.round(new_w/aspect).astype(int)
+        pad_vert = (sh-new_h)/2
+        pad_top, pad_bot = np.floor(pad_vert).astype(int), np.ceil(pad_vert).astype(int)
+        pad_left, pad_right = 0, 0
+    elif aspect < 1: # vertical image
+        new_h = sh
+        new_w = np.round(new_h*aspect).astype(int)
+        pad_horz = (sw-new_w)/2
+        pad_left, pad_right = np.floor(pad_horz).astype(int), np.ceil(pad_horz).astype(int)
+        pad_top, pad_bot = 0, 0
+    else: # square image
+        new_h, new_w = sh, sw
+        pad_left, pad_right, pad_top, pad_bot = 0, 0, 0, 0
+
+    # set pad color
+    if len(img.shape) == 3 and not isinstance(padColor, (list, tuple, np.ndarray)): # color image but only one color provided
+        padColor = [padColor]*3
+
+    # scale and pad
+    scaled_img = cv2.resize(img, (new_w, new_h), interpolation=interp)
+    scaled_img = cv2.copyMakeBorder(scaled_img, pad_top, pad_bot, pad_left, pad_right, borderType=cv2.BORDER_CONSTANT, value=padColor)
+
+    return scaled_img
+
+
+def legacy_prepare(crops):
+    batches = []
+    for size in SIZES:
+        batch = np.stack([legacy_resize_and_pad(crop, size) for crop in crops]).astype(np.float32)
+        batch /= 127.5
+        batch -= 1.
+        batches.append(batch)
+    return batches
+
+
+def measure(prepare, crops, repeat):
+    prepare(crops)  # warm-up: buffers and OpenCV state
+    start = time.perf_counter()
+    for _ in range(repeat):
+        prepare(crops)
+    elapsed = time.perf_counter() - start
+    # Peak of the memory allocated while one batch is prepared, on top of what was already held
+    tracemalloc.start()
+    baseline, _ = tracemalloc.get_traced_memory()
+    prepare(crops)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "ms_per_batch": round(1000 * elapsed / repeat, 3),
+        "peak_bytes_per_batch": peak - baseline,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--examples", default=os.path.join(os.path.dirname(__file__), "..", "examples"))
+    parser.add_argument("--batch", type=int, default=16, help="Crops per batch")
+    parser.add_argument("--repeat", type=int, default=50, help="Timed batches per path")
+    args = parser.parse_args()
+
+    crops = load_crops(args.examples, args.batch)
+    preprocessor = ClassifierPreprocessor(SIZES, capacity=args.batch)
+
+    for legacy, shared in zip(legacy_prepare(crops), preprocessor.prepare(crops)):
+        if not np.allclose(legacy, shared, atol=1e-6):
+            raise SystemExit("Shared preprocessing does not match the legacy output")
+
+    report = {"batch": args.batch, "repeat": args.repeat, "sizes": SIZES}
+    for name, prepare in (("legacy", legacy_prepare), ("shared", preprocessor.prepare)):
+        report[name] = measure(prepare, crops, args.repeat)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
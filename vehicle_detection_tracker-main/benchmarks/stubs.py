@@ -0,0 +1,209 @@
+"""
+Deterministic stand-ins for the models, so the benchmarks run without weights.
+
+The stubs return plausible, repeatable outputs at almost no cost. A benchmark run on them
+measures the Python, NumPy and OpenCV work around the models: decoding, cropping, preprocessing,
+tracking, response building and encoding.
+
+- `StubDetector` replaces the YOLO model. It returns real `ultralytics` `Results` with boxes
+  derived from the image size, or NumPy-backed `StubResults` with the same boxes when ultralytics
+  (and torch) are not installed.
+- `StubBackend` is an inference backend that `register_stub_backend()` adds as "stub". The real
+  `Classifier` classes then run unchanged except for the network.
+- `StubANPR` replaces `fastanpr.FastANPR`.
+"""
+import hashlib
+from dataclasses import dataclass
+
+import cv2
+import numpy as np
+
+from VehicleDetectionTracker import inference_backend
+from VehicleDetectionTracker.color_classifier import config as color_config
+from VehicleDetectionTracker.model_classifier import config as model_config
+
+COCO_VEHICLES = {2: "car", 3: "motorcycle", 5: "bus", 7: "truck"}
+
+
+def _seed(*values):
+    return int.from_bytes(hashlib.sha256(repr(values).encode()).digest()[:8], "little")
+
+
+def ultralytics_available():
+    try:
+        import torch  # noqa: F401
+        import ultralytics  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class StubTensor(np.ndarray):
+    """
+    NumPy array with the few torch tensor methods the pipeline calls on detection boxes.
+    """
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return self.view(np.ndarray)
+
+    def int(self):
+        return self.astype(np.int64)
+
+
+class StubBoxes:
+    """
+    `ultralytics` `Boxes` stand-in over (x1, y1, x2, y2, confidence, class) rows.
+    """
+
+    def __init__(self, data):
+        self.data = np.asarray(data, dtype=np.float32).reshape(-1, 6).view(StubTensor)
+        self.id = None
+
+    @property
+    def xyxy(self):
+        return self.data[:, :4]
+
+    @property
+    def xywh(self):
+        xyxy = self.data[:, :4]
+        return np.concatenate([(xyxy[:, :2] + xyxy[:, 2:]) / 2, xyxy[:, 2:] - xyxy[:, :2]], axis=1).view(StubTensor)
+
+    @property
+    def conf(self):
+        return self.data[:, 4]
+
+    @property
+    def cls(self):
+        return self.data[:, 5]
+
+    def __len__(self):
+        return len(self.data)
+
+
+class StubResults:
+    """
+    `ultralytics` `Results` stand-in for runs without ultralytics: boxes, class names and `plot()`.
+    """
+
+    def __init__(self, orig_img, names, boxes):
+        self.orig_img = orig_img
+        self.names = names
+        self.boxes = StubBoxes(boxes)
+
+    def plot(self):
+        annotated = self.orig_img.copy()
+        for x1, y1, x2, y2 in self.boxes.xyxy.numpy().astype(int):
+            cv2.rectangle(annotated, (x1, y1), (x2, y2), (0, 255, 0), 2)
+        return annotated
+
+
+class StubDetector:
+    """
+    YOLO stand-in with `predict(source, verbose=False)`.
+
+    Every image gets 1 to `max_boxes` vehicle boxes whose number, position and class depend only
+    on the image size, so repeated runs see the same detections. The results are `ultralytics`
+    `Results` when ultralytics is installed and `StubResults` otherwise.
+    """
+
+    def __init__(self, max_boxes=3):
+        self.max_boxes = max_boxes
+        self.names = {i: COCO_VEHICLES.get(i, str(i)) for i in range(80)}
+        self.ultralytics = ultralytics_available()
+
+    def _boxes(self, h, w):
+        rng = np.random.default_rng(_seed("detector", h, w))
+        count = 1 + int(rng.integers(0, self.max_boxes))
+        boxes = []
+        for _ in range(count):
+            bw = w * rng.uniform(0.25, 0.8)
+            bh = h * rng.uniform(0.25, 0.8)
+            x1 = rng.uniform(0, w - bw)
+            y1 = rng.uniform(0, h - bh)
+            conf = rng.uniform(0.4, 0.95)
+            cls = float(rng.choice(list(COCO_VEHICLES)))
+            boxes.append([x1, y1, x1 + bw, y1 + bh, conf, cls])
+        return np.array(boxes, dtype=np.float32)
+
+    def predict(self, source, verbose=False, **kwargs):
+        images = source if isinstance(source, list) else [source]
+        if not self.ultralytics:
+            return [StubResults(image, self.names, self._boxes(*image.shape[:2])) for image in images]
+        import torch
+        from ultralytics.engine.results import Results
+
+        return [Results(image, path=None, names=self.names, boxes=torch.as_tensor(self._boxes(*image.shape[:2])))
+                for image in images]
+
+    __call__ = predict
+
+
+_LABEL_FILES = {
+    color_config.model_file: color_config.label_file,
+    model_config.model_file: model_config.label_file,
+}
+
+
+class StubBackend:
+    """
+    Inference backend that turns each input into a fixed pseudo-random probability vector.
+
+    The output depends only on the per-channel means of the input, so the same crop always gets
+    the same class, and its size matches the label file of the classifier it stands in for.
+    """
+
+    name = "stub"
+
+    def __init__(self, model_file, input_layer, output_layer, **kwargs):
+        with open(_LABEL_FILES[model_file], "r", encoding="cp1251") as f:
+            labels = sum(1 for _ in f)
+        self.projection = np.random.default_rng(_seed("classifier", model_file)).standard_normal((3, labels))
+        self.projection = self.projection.astype(np.float32)
+
+    def run(self, batch):
+        logits = batch.mean(axis=(1, 2)) @ self.projection * 8
+        logits -= logits.max(axis=1, keepdims=True)
+        probs = np.exp(logits)
+        return probs / probs.sum(axis=1, keepdims=True)
+
+    def close(self):
+        pass
+
+
+def register_stub_backend():
+    """
+    Make `Classifier(backend="stub")` available.
+    """
+    inference_backend.BACKENDS[StubBackend.name] = StubBackend
+
+
+@dataclass
+class StubPlate:
+    det_box: list
+    det_conf: float
+    rec_poly: list
+    rec_text: str
+    rec_conf: float
+
+
+class StubANPR:
+    """
+    FastANPR stand-in: one plate near the bottom centre of every image, with a text derived from
+    the image size.
+    """
+
+    async def run(self, images):
+        plates = []
+        for image in images:
+            h, w = image.shape[:2]
+            rng = np.random.default_rng(_seed("anpr", h, w))
+            x1, y1 = int(w * 0.4), int(h * 0.75)
+            x2, y2 = int(w * 0.6), int(h * 0.82)
+            text = "".join(rng.choice(list("ABCDEFGHJKLMNPRSTUVYZ0123456789"), size=7))
+            plates.append([StubPlate(det_box=[x1, y1, x2, y2], det_conf=float(rng.uniform(0.5, 0.99)),
+                                     rec_poly=[[x1, y1], [x2, y1], [x2, y2], [x1, y2]], rec_text=text,
+                                     rec_conf=float(rng.uniform(0.5, 0.99)))])
+        return plates
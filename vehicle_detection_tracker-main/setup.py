@@ -12,6 +12,9 @@ setup(
         'ultralytics==8.0.145',
         'tensorflow==2.14.0'
     ],
+    extras_require={
+        'onnx': ['onnxruntime', 'tf2onnx'],
+    },
     author='Sergio Sánchez Sánchez',
     author_email='dreamsoftware92@gmail.com',
     description='VehicleDetectionTracker 🚗: Effortlessly track and detect vehicles in images and videos with advanced algorithms. 🚙🚕 Boost your computer vision project!" 🔍📹',
@@ -51,6 +54,9 @@ Requirements:
 - imutils 0.5.4
 - ultralytics 8.0.145
 
+Optional:
+- onnx: onnxruntime and tf2onnx, for the ONNX Runtime classifier backend and INT8 quantization
+
 Development Status: Beta
 
 License: MIT License
@@ -0,0 +1,158 @@
+import json
+
+import numpy as np
+import pytest
+
+from VehicleDetectionTracker.attribute_cache import TrackAttributeCache, crop_sharpness
+from VehicleDetectionTracker.track_state import TrackStore
+from VehicleDetectionTracker.VehicleDetectionTracker import VehicleDetectionTracker
+
+
+def flat(height, width, value=100):
+    return np.full((height, width, 3), value, dtype=np.uint8)
+
+
+def checkerboard(height, width):
+    crop = np.zeros((height, width, 3), dtype=np.uint8)
+    crop[::2, ::2] = 255
+    crop[1::2, 1::2] = 255
+    return crop
+
+
+def test_first_crop_is_sampled_and_empty_crops_never_are():
+    cache = TrackAttributeCache()
+
+    assert cache.wants_sample(1, flat(0, 10)) is None
+    assert cache.wants_sample(1, flat(10, 20)) == (200, 0.0)
+
+
+def test_later_crops_need_more_area_or_sharpness():
+    cache = TrackAttributeCache(area_gain=1.5, sharpness_gain=1.3)
+    cache.add(1, cache.wants_sample(1, flat(10, 10)), [1.0], [1.0])
+
+    assert cache.wants_sample(1, flat(10, 14)) is None  # 1.4x the area
+    assert cache.wants_sample(1, flat(10, 15)) == (150, 0.0)  # 1.5x the area
+    # As large and much sharper is worth a sample, sharper but smaller is not
+    assert cache.wants_sample(1, checkerboard(10, 10)) is not None
+    assert cache.wants_sample(1, checkerboard(9, 10)) is None
+
+
+def test_sharpness_is_laplacian_variance():
+    assert crop_sharpness(flat(10, 10)) == 0.0
+    assert crop_sharpness(checkerboard(10, 10)) > 0.0
+
+
+def test_max_samples_caps_classifications():
+    cache = TrackAttributeCache(max_samples=2, area_gain=1.0)
+    for size in (10, 20):
+        cache.add(1, cache.wants_sample(1, flat(size, size)), [1.0], [1.0])
+
+    assert cache.wants_sample(1, flat(100, 100)) is None
+    assert cache.get(1).samples == 2
+    assert cache.stats() == {'tracks': 1, 'classified': 2, 'reused': 0}
+
+
+def test_probabilities_are_weighted_by_crop_area():
+    cache = TrackAttributeCache()
+    cache.add(1, (100, 0.0), [1.0, 0.0], [0.2, 0.8])
+    state = cache.add(1, (300, 0.0), [0.0, 1.0], [0.6, 0.4])
+
+    color, model = state.probabilities()
+
+    np.testing.assert_allclose(color, [0.25, 0.75])
+    np.testing.assert_allclose(model, [0.5, 0.5])
+    assert state.best_area == 300
+
+
+def test_tracks_are_evicted_together_with_the_track_store():
+    store = TrackStore(max_age_frames=2)
+    cache = TrackAttributeCache()
+    for track_id in (1, 2):
+        store.update(track_id, 0.0, 0.0, 0.0, frame_index=0)
+        cache.add(track_id, (100, 0.0), [1.0], [1.0])
+    store.update(2, 0.0, 0.0, 1.0, frame_index=3)
+
+    # The same sequence VehicleDetectionTracker runs after every frame
+    cache.remove(store.evict(frame_index=3))
+
+    assert 1 not in cache and 2 in cache
+    assert len(cache) == len(store) == 1
+
+
+class FakeClassifier:
+    input_size = (8, 8)
+    max_batch_size = 16
+
+    def __init__(self, probabilities):
+        self.probabilities = probabilities  # Output per call, one row per crop
+        self.crops = 0
+
+    def predict_proba_inputs(self, batch):
+        self.crops += len(batch)
+        return np.tile(np.asarray(self.probabilities.pop(0), dtype=np.float32), (len(batch), 1))
+
+    def decode_predictions(self, probs):
+        return [[{'probs': [round(float(p), 3) for p in row]}] for row in probs]
+
+
+def test_detector_reuses_the_area_weighted_aggregate():
+    color = FakeClassifier([[1.0, 0.0], [0.0, 1.0]])
+    model = FakeClassifier([[1.0], [1.0]])
+    detector = VehicleDetectionTracker(model=object(), color_classifier=color, model_classifier=model,
+                                       attribute_area_gain=2.0)
+    vehicle = {'vehicle_id': 7}
+
+    detector._attach_track_classes([vehicle], [flat(10, 10)])
+    detector._attach_track_classes([vehicle], [flat(12, 12)])  # Not enough larger: reused
+    detector._attach_track_classes([vehicle], [flat(10, 30)])  # Three times the area: sampled
+
+    assert color.crops == 2
+    assert json.loads(vehicle['color_info']) == [{'probs': [0.25, 0.75]}]
+    assert detector.attributes.stats() == {'tracks': 1, 'classified': 2, 'reused': 1}
+
+
+class CPUArray(np.ndarray):
+    """
+    NumPy array with the torch tensor methods used on `Results.boxes`.
+    """
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return np.asarray(self)
+
+    def int(self):
+        return self.astype(np.int64).view(CPUArray)
+
+
+class TrackedBoxes:
+    def __init__(self, track_ids):
+        count = len(track_ids)
+        self.xywh = np.tile(np.asarray([20, 20, 10, 10], dtype=np.float32), (count, 1)).view(CPUArray)
+        self.conf = np.full(count, 0.9, dtype=np.float32).view(CPUArray)
+        self.cls = np.full(count, 2, dtype=np.float32).view(CPUArray)
+        self.id = np.asarray(track_ids, dtype=np.float32).view(CPUArray)
+
+
+class TrackedResult:
+    names = {2: 'car'}
+
+    def __init__(self, track_ids):
+        self.boxes = TrackedBoxes(track_ids)
+
+
+def test_process_frame_drops_the_attributes_of_evicted_tracks(monkeypatch):
+    pytest.importorskip('ultralytics')
+    frames = iter([[1, 2], [2], [2], [2]])
+    model = type('Model', (), {'predict': lambda self, frame, verbose=False: [TrackedResult([])]})()
+    detector = VehicleDetectionTracker(model=model, color_classifier=FakeClassifier([[1.0]] * 4),
+                                       model_classifier=FakeClassifier([[1.0]] * 4), track_max_age_frames=1)
+    monkeypatch.setattr(detector, '_track', lambda result, frame: TrackedResult(next(frames)))
+
+    for index in range(4):
+        detector.process_frame(flat(40, 40), float(index), lean=True)
+
+    assert 1 not in detector.attributes
+    assert 2 in detector.attributes
+    assert len(detector.attributes) == detector.live_tracks == 1
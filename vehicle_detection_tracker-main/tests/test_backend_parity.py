@@ -0,0 +1,48 @@
+import os
+from pathlib import Path
+
+import cv2
+import numpy as np
+import pytest
+
+pytest.importorskip("tensorflow")
+
+from VehicleDetectionTracker.color_classifier import config as color_config
+from VehicleDetectionTracker.model_classifier import config as model_config
+from VehicleDetectionTracker.inference_backend import create_backend
+from VehicleDetectionTracker.preprocessing import ClassifierPreprocessor
+
+EXAMPLES = Path(__file__).parent.parent / 'examples'
+CONFIGS = [color_config, model_config]
+TOLERANCE = 1e-4
+
+
+def example_batch(size, count=8):
+    images = [cv2.imread(str(path)) for path in sorted(EXAMPLES.glob('*.jpg'))[:count]]
+    batch, = ClassifierPreprocessor([size], capacity=len(images)).prepare(images)
+    return batch.copy()
+
+
+def backend_or_skip(name, config):
+    if not os.path.getsize(config.model_file):
+        pytest.skip(f'{config.model_file} is not downloaded')
+    if name == 'onnxruntime':
+        pytest.importorskip('onnxruntime')
+        if not os.path.exists(config.onnx_file):
+            pytest.importorskip('tf2onnx')
+    return create_backend(name, config.model_file, config.input_layer, config.output_layer,
+                          onnx_file=config.onnx_file, intra_op_threads=1, inter_op_threads=1)
+
+
+@pytest.mark.parametrize('config', CONFIGS, ids=['color', 'make_model'])
+@pytest.mark.parametrize('name', ['onnxruntime', 'opencv'])
+def test_backend_matches_tf(name, config):
+    batch = example_batch(config.classifier_input_size)
+    expected = backend_or_skip('tf', config).run(batch)
+    predicted = backend_or_skip(name, config).run(batch)
+
+    assert predicted.shape == expected.shape
+    # same probabilities within tolerance and same top class for every crop
+    np.testing.assert_allclose(predicted, expected, atol=TOLERANCE)
+    assert (predicted.argmax(axis=1) == expected.argmax(axis=1)).all()
+
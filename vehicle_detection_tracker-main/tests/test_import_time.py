@@ -0,0 +1,47 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+PACKAGE_ROOT = Path(__file__).parent.parent
+HEAVY_MODULES = ['ultralytics', 'torch', 'tensorflow', 'onnxruntime', 'fastanpr', 'pkg_resources']
+# Cold-start budget per module in seconds; raise it with VRS_IMPORT_BUDGET_SECONDS on slow machines
+BUDGET_SECONDS = float(os.environ.get('VRS_IMPORT_BUDGET_SECONDS', '1.5'))
+
+MODULES = [
+    'VehicleDetectionTracker.VehicleDetectionTracker',
+    'VehicleDetectionTracker.multi_stream',
+    'VehicleDetectionTracker.color_classifier.classifier',
+    'VehicleDetectionTracker.model_classifier.classifier',
+]
+
+PROBE = '''
+import json, sys, time
+start = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - start
+print(json.dumps({{"seconds": seconds, "loaded": [name for name in {heavy!r} if name in sys.modules]}}))
+'''
+
+
+def cold_import(module):
+    # A fresh interpreter per module, so nothing is already imported
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [str(PACKAGE_ROOT), os.environ.get('PYTHONPATH')])))
+    output = subprocess.run([sys.executable, '-c', PROBE.format(module=module, heavy=HEAVY_MODULES)],
+                            capture_output=True, text=True, env=env, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+@pytest.mark.parametrize('module', MODULES)
+def test_import_does_not_load_frameworks(module):
+    assert cold_import(module)['loaded'] == []
+
+
+@pytest.mark.parametrize('module', MODULES)
+def test_import_time_within_budget(module):
+    # Best of three, to keep scheduler noise out of the measurement
+    seconds = min(cold_import(module)['seconds'] for _ in range(3))
+    assert seconds < BUDGET_SECONDS, f'importing {module} took {seconds:.2f} s (budget {BUDGET_SECONDS} s)'
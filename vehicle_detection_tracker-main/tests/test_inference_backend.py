@@ -0,0 +1,191 @@
+import numpy as np
+import pytest
+
+from VehicleDetectionTracker.inference_backend import create_backend
+
+# A tiny classifier, softmax(mean over the image of a 1x1 convolution), written without TensorFlow
+INPUT_LAYER = 'input_1'
+OUTPUT_LAYER = 'softmax/Softmax'
+DT_FLOAT, DT_INT32 = 1, 3
+
+
+def _varint(value):
+    out = bytearray()
+    while True:
+        byte = value & 0x7f
+        value >>= 7
+        if not value:
+            out.append(byte)
+            return bytes(out)
+        out.append(byte | 0x80)
+
+
+def _field(number, payload):
+    # Protocol buffer field: varint for ints, length-delimited for strings and messages
+    if isinstance(payload, int):
+        return _varint(number << 3) + _varint(payload)
+    if isinstance(payload, str):
+        payload = payload.encode()
+    return _varint(number << 3 | 2) + _varint(len(payload)) + payload
+
+
+def _tensor(array):
+    shape = b''.join(_field(2, _field(1, size)) for size in array.shape)
+    dtype = DT_FLOAT if array.dtype == np.float32 else DT_INT32
+    return _field(1, dtype) + _field(2, shape) + _field(4, array.tobytes())
+
+
+def _node(name, op, inputs=(), **attrs):
+    body = _field(1, name) + _field(2, op) + b''.join(_field(3, value) for value in inputs)
+    for key, value in attrs.items():
+        body += _field(5, _field(1, key) + _field(2, value))
+    return _field(1, body)
+
+
+def write_frozen_graph(path, weights):
+    """
+    Serialize the tiny classifier as a frozen TensorFlow GraphDef, the format of the bundled models.
+    """
+    float_type = _field(6, DT_FLOAT)
+    graph = b''.join([
+        _node(INPUT_LAYER, 'Placeholder', dtype=float_type),
+        _node('kernel', 'Const', dtype=float_type, value=_field(8, _tensor(weights[None, None]))),
+        _node('conv', 'Conv2D', [INPUT_LAYER, 'kernel'], T=float_type,
+              strides=_field(1, b''.join(_field(3, 1) for _ in range(4))),
+              padding=_field(2, 'VALID'), data_format=_field(2, 'NHWC')),
+        _node('axes', 'Const', dtype=_field(6, DT_INT32), value=_field(8, _tensor(np.array([1, 2], np.int32)))),
+        _node('mean', 'Mean', ['conv', 'axes'], T=float_type, keep_dims=_field(5, 0)),
+        _node(OUTPUT_LAYER, 'Softmax', ['mean'], T=float_type),
+    ])
+    path.write_bytes(graph)
+    return str(path)
+
+
+def write_onnx_model(path, weights):
+    """
+    The same classifier as an ONNX model with an NHWC input, like the tf2onnx export.
+    """
+    onnx = pytest.importorskip('onnx')
+    from onnx import TensorProto, helper, numpy_helper
+
+    graph = helper.make_graph(
+        [helper.make_node('ReduceMean', [INPUT_LAYER], ['mean'], axes=[1, 2], keepdims=0),
+         helper.make_node('MatMul', ['mean', 'kernel'], ['logits']),
+         helper.make_node('Softmax', ['logits'], ['probabilities'], axis=-1)],
+        'tiny_classifier',
+        [helper.make_tensor_value_info(INPUT_LAYER, TensorProto.FLOAT, [None, None, None, 3])],
+        [helper.make_tensor_value_info('probabilities', TensorProto.FLOAT, [None, weights.shape[1]])],
+        initializer=[numpy_helper.from_array(weights, 'kernel')])
+    # IR version 7 goes with opset 13 and loads in older ONNX Runtime releases too
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid('', 13)], ir_version=7)
+    onnx.save(model, str(path))
+    return str(path)
+
+
+def expected_probabilities(batch, weights):
+    logits = batch.mean(axis=(1, 2)) @ weights
+    probabilities = np.exp(logits - logits.max(axis=1, keepdims=True))
+    return probabilities / probabilities.sum(axis=1, keepdims=True)
+
+
+@pytest.fixture
+def weights():
+    return np.random.default_rng(0).standard_normal((3, 5)).astype(np.float32)
+
+
+@pytest.fixture
+def batch():
+    # Not square, so a wrong transpose cannot give the right shape by accident
+    return np.random.default_rng(1).random((4, 6, 10, 3), dtype=np.float32)
+
+
+def test_opencv_backend_runs_frozen_graph(tmp_path, weights, batch):
+    model_file = write_frozen_graph(tmp_path / 'tiny.pb', weights)
+    backend = create_backend('opencv', model_file, INPUT_LAYER, OUTPUT_LAYER)
+
+    probabilities = backend.run(batch)
+
+    assert probabilities.shape == (len(batch), weights.shape[1])
+    np.testing.assert_allclose(probabilities, expected_probabilities(batch, weights), atol=1e-5)
+
+
+def test_opencv_backend_feeds_nchw_blob(monkeypatch, batch):
+    class RecordingNet:
+        def setPreferableBackend(self, backend):
+            pass
+
+        def setPreferableTarget(self, target):
+            pass
+
+        def setInput(self, blob):
+            self.blob = blob
+
+        def forward(self, output_layer):
+            self.output_layer = output_layer
+            return np.zeros((len(self.blob), 5, 1, 1), dtype=np.float32)
+
+    net = RecordingNet()
+    monkeypatch.setattr('cv2.dnn.readNetFromTensorflow', lambda model_file: net)
+    backend = create_backend('opencv', 'tiny.pb', INPUT_LAYER, OUTPUT_LAYER)
+
+    probabilities = backend.run(batch)
+
+    assert net.blob.shape == (4, 3, 6, 10)
+    assert net.blob.flags['C_CONTIGUOUS']
+    np.testing.assert_array_equal(net.blob, batch.transpose(0, 3, 1, 2))
+    assert net.output_layer == OUTPUT_LAYER
+    assert probabilities.shape == (4, 5)
+
+
+def test_onnxruntime_backend_matches_opencv(tmp_path, weights, batch):
+    pytest.importorskip('onnxruntime')
+    model_file = write_frozen_graph(tmp_path / 'tiny.pb', weights)
+    onnx_file = write_onnx_model(tmp_path / 'tiny.onnx', weights)
+
+    expected = create_backend('opencv', model_file, INPUT_LAYER, OUTPUT_LAYER).run(batch)
+    predicted = create_backend('onnxruntime', model_file, INPUT_LAYER, OUTPUT_LAYER, onnx_file=onnx_file,
+                               intra_op_threads=1, inter_op_threads=1).run(batch)
+
+    np.testing.assert_allclose(predicted, expected, atol=1e-5)
+    assert (predicted.argmax(axis=1) == expected.argmax(axis=1)).all()
+
+
+def test_int8_runs_quantized_file(tmp_path, weights):
+    pytest.importorskip('onnxruntime')
+    int8_onnx_file = write_onnx_model(tmp_path / 'tiny.int8.onnx', weights)
+
+    backend = create_backend('onnxruntime', str(tmp_path / 'tiny.pb'), INPUT_LAYER, OUTPUT_LAYER,
+                             onnx_file=str(tmp_path / 'missing.onnx'), precision='int8',
+                             int8_onnx_file=int8_onnx_file)
+
+    assert backend.onnx_file == int8_onnx_file
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError, match='tensorrt'):
+        create_backend('tensorrt', 'tiny.pb', INPUT_LAYER, OUTPUT_LAYER)
+
+
+def test_unknown_precision():
+    with pytest.raises(ValueError, match='float16'):
+        create_backend('opencv', 'tiny.pb', INPUT_LAYER, OUTPUT_LAYER, precision='float16')
+
+
+@pytest.mark.parametrize('name', ['tf', 'opencv'])
+def test_int8_needs_onnxruntime(tmp_path, name):
+    int8_onnx_file = tmp_path / 'tiny.int8.onnx'
+    int8_onnx_file.write_bytes(b'')
+
+    with pytest.raises(ValueError, match='onnxruntime'):
+        create_backend(name, 'tiny.pb', INPUT_LAYER, OUTPUT_LAYER, precision='int8',
+                       int8_onnx_file=str(int8_onnx_file))
+
+
+@pytest.mark.parametrize('int8_onnx_file', [None, 'missing.int8.onnx'])
+def test_int8_missing_file(tmp_path, int8_onnx_file):
+    # Raised before the backend is built, so onnxruntime is not needed
+    path = str(tmp_path / int8_onnx_file) if int8_onnx_file else None
+
+    with pytest.raises(FileNotFoundError, match='quantization'):
+        create_backend('onnxruntime', 'tiny.pb', INPUT_LAYER, OUTPUT_LAYER, precision='int8',
+                       int8_onnx_file=path)
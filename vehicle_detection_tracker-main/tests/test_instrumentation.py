@@ -0,0 +1,84 @@
+import threading
+
+import pytest
+
+from VehicleDetectionTracker.instrumentation import LATENCY_BUCKETS, Metrics, _NULL_TIMER
+
+
+@pytest.fixture
+def metrics():
+    metrics = Metrics(enabled=True)
+    metrics.counter('vrs_ocr_calls_total', 'Calls to the plate reader.')
+    metrics.histogram('vrs_request_seconds', 'Latency of the API endpoints.')
+    return metrics
+
+
+def sample_lines(text):
+    return [line for line in text.splitlines() if not line.startswith('#')]
+
+
+def test_disabled_metrics_record_nothing(metrics):
+    metrics.enable(False)
+
+    assert metrics.timer('predict') is _NULL_TIMER
+    with metrics.timer('predict'):
+        pass
+    metrics.inc('vrs_ocr_calls_total')
+    metrics.observe('vrs_request_seconds', 0.2, endpoint='/process_image/')
+    assert metrics.timed_call('anpr', lambda x: x + 1, 1) == 2
+    # Unknown names are not even looked up
+    metrics.inc('not_registered')
+
+    assert sample_lines(metrics.render()) == []
+
+
+def test_stage_timings_are_rendered(metrics, monkeypatch):
+    clock = iter([10.0, 10.004, 20.0, 20.3])
+    monkeypatch.setattr('VehicleDetectionTracker.instrumentation.time.perf_counter', lambda: next(clock))
+
+    with metrics.timer('predict'):
+        pass
+    with metrics.timer('predict'):
+        pass
+
+    lines = sample_lines(metrics.render())
+    assert 'vrs_stage_seconds_bucket{stage="predict",le="0.001"} 0' in lines
+    assert 'vrs_stage_seconds_bucket{stage="predict",le="0.005"} 1' in lines
+    assert 'vrs_stage_seconds_bucket{stage="predict",le="0.25"} 1' in lines
+    assert 'vrs_stage_seconds_bucket{stage="predict",le="0.5"} 2' in lines
+    assert 'vrs_stage_seconds_bucket{stage="predict",le="+Inf"} 2' in lines
+    assert 'vrs_stage_seconds_count{stage="predict"} 2' in lines
+    total = next(line for line in lines if line.startswith('vrs_stage_seconds_sum{stage="predict"}'))
+    assert float(total.split()[-1]) == pytest.approx(0.304)
+    assert sum(line.startswith('vrs_stage_seconds_bucket{stage="predict"') for line in lines) == \
+        len(LATENCY_BUCKETS) + 1
+
+
+def test_counters_histograms_and_collectors_are_rendered(metrics):
+    metrics.inc('vrs_ocr_calls_total')
+    metrics.inc('vrs_ocr_calls_total', 2)
+    metrics.observe('vrs_request_seconds', 0.02, endpoint='/process_"image"/')
+    metrics.register_collector(lambda: [('vrs_ready', 'gauge', 'Whether the models are ready.', [({}, 1)])])
+
+    text = metrics.render()
+
+    assert '# TYPE vrs_ocr_calls_total counter' in text
+    assert 'vrs_ocr_calls_total 3' in sample_lines(text)
+    assert 'vrs_request_seconds_count{endpoint="/process_\\"image\\"/"} 1' in sample_lines(text)
+    assert '# TYPE vrs_ready gauge' in text
+    assert 'vrs_ready 1' in sample_lines(text)
+    assert text.endswith('\n')
+
+
+def test_counters_are_thread_safe(metrics):
+    def work():
+        for _ in range(1000):
+            metrics.inc('vrs_ocr_calls_total')
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert 'vrs_ocr_calls_total 4000' in sample_lines(metrics.render())
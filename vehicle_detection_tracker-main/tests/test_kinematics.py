@@ -0,0 +1,89 @@
+import math
+
+import numpy as np
+import pytest
+
+from VehicleDetectionTracker.kinematics import KinematicsEstimator, direction_to_label, reliability_from_samples
+
+
+@pytest.mark.parametrize('dx, dy, label', [
+    (1, 0, 'Right'),
+    (1, 1, 'Bottom Right'),
+    (0, 1, 'Bottom'),
+    (-1, 1, 'Bottom Left'),
+    (-1, 0, 'Left'),
+    (-1, -1, 'Top Left'),
+    (0, -1, 'Top'),
+    (1, -1, 'Top Right'),
+])
+def test_direction_labels(dx, dy, label):
+    assert direction_to_label(math.atan2(dy, dx)) == label
+
+
+def test_left_sector_covers_both_sides_of_pi():
+    # atan2 returns +pi or -pi for leftward motion depending on the sign of a tiny dy
+    assert direction_to_label(math.pi) == 'Left'
+    assert direction_to_label(-math.pi) == 'Left'
+    assert direction_to_label(math.pi - 0.3) == 'Left'
+    assert direction_to_label(-math.pi + 0.3) == 'Left'
+    # Sector boundaries are 22.5° either side of the axis
+    assert direction_to_label(7 * math.pi / 8 - 1e-6) == 'Bottom Left'
+    assert direction_to_label(-7 * math.pi / 8 + 1e-6) == 'Top Left'
+
+
+@pytest.mark.parametrize('direction', [None, float('nan'), float('inf')])
+def test_unknown_direction(direction):
+    assert direction_to_label(direction) == 'Unknown'
+
+
+def test_reliability_grows_with_samples():
+    np.testing.assert_array_equal(reliability_from_samples(np.array([1, 2, 4, 5, 9, 10])),
+                                  [0.0, 0.5, 0.5, 0.7, 0.7, 1.0])
+
+
+def test_constant_velocity():
+    estimator = KinematicsEstimator(smoothing=0.5)
+    speeds, directions, _ = estimator.update([1], [(0, 0)], 0.0)
+    assert np.isnan(speeds[0]) and np.isnan(directions[0])
+
+    for step in range(1, 5):
+        speeds, directions, reliabilities = estimator.update([1], [(3 * step, 4 * step)], step * 0.5)
+    assert speeds[0] == pytest.approx(10.0)
+    assert directions[0] == pytest.approx(math.atan2(4, 3))
+    assert reliabilities[0] == 0.7
+
+
+def test_smoothing_blends_new_speed():
+    estimator = KinematicsEstimator(smoothing=0.25)
+    estimator.update([1], [(0, 0)], 0.0)
+    estimator.update([1], [(10, 0)], 1.0)  # first measurement: 10
+    speeds, _, _ = estimator.update([1], [(30, 0)], 2.0)  # raw 20, blended 10 + 0.25 * 10
+    assert speeds[0] == pytest.approx(12.5)
+
+
+def test_repeated_timestamp_does_not_produce_a_measurement():
+    estimator = KinematicsEstimator()
+    estimator.update([1], [(0, 0)], 1.0)
+    speeds, _, _ = estimator.update([1], [(50, 0)], 1.0)
+    assert np.isnan(speeds[0])
+    # The reference point was not moved by the repeated sample
+    speeds, _, _ = estimator.update([1], [(10, 0)], 2.0)
+    assert speeds[0] == pytest.approx(10.0)
+
+
+def test_tracks_are_independent_and_slots_are_reused():
+    estimator = KinematicsEstimator(capacity=2)
+    estimator.update([1, 2, 3], [(0, 0), (0, 0), (0, 0)], 0.0)  # grows past the initial capacity
+    speeds, _, _ = estimator.update([1, 2, 3], [(1, 0), (0, 2), (3, 0)], 1.0)
+    np.testing.assert_allclose(speeds, [1, 2, 3])
+
+    estimator.remove([2])
+    assert len(estimator) == 2
+    # A new track reusing the freed slot starts without history
+    speeds, _, _ = estimator.update([4], [(100, 100)], 2.0)
+    assert np.isnan(speeds[0])
+
+
+def test_empty_update():
+    speeds, directions, reliabilities = KinematicsEstimator().update([], np.zeros((0, 2)), 0.0)
+    assert speeds.size == directions.size == reliabilities.size == 0
@@ -0,0 +1,181 @@
+import cv2
+import numpy as np
+import pytest
+
+from VehicleDetectionTracker.multi_stream import MultiStreamRunner, _Stream
+
+
+class FakeModel:
+    def predict(self, images, verbose=False):
+        return [None] * len(images)
+
+
+class FakeDetector:
+    """
+    Shared detector: counts the crops sent to the classifiers.
+    """
+
+    def __init__(self):
+        self.model = FakeModel()
+        self.classified = 0
+
+    def _initialize_classifiers(self):
+        pass
+
+    def _increase_brightness(self, frame):
+        return frame
+
+    def _classify_crops_proba(self, crops):
+        self.classified += len(crops)
+        return np.zeros((len(crops), 2)), np.zeros((len(crops), 2))
+
+
+class FakeTracker:
+    """
+    Per-stream tracker that sees the same two tracks in every frame and always wants a new sample.
+    """
+
+    plate_reader = None
+
+    def __init__(self):
+        self.applied = []
+
+    def _process_detections(self, frame, detection, timestamp, lean=True, annotate=False):
+        vehicles = [{'vehicle_id': 1}, {'vehicle_id': 2}]
+        return {'detected_vehicles': vehicles}, [np.ones((4, 4, 3), np.uint8)] * len(vehicles)
+
+    def _select_track_crops(self, vehicles, vehicle_frames):
+        return [(i, 1.0) for i in range(len(vehicles))]
+
+    def _apply_track_classes(self, vehicles, selected, color_probs, model_probs):
+        self.applied.append([vehicles[i]['vehicle_id'] for i, _ in selected])
+
+    def _timestamp_seconds(self, timestamp):
+        return float(timestamp)
+
+
+class FakeReader:
+    def __init__(self):
+        self.recorded = []
+        self.ocr_crops = 0
+
+    def select(self, vehicles, vehicle_frames):
+        return list(range(len(vehicles)))
+
+    def prepare_crops(self, crops):
+        return list(crops)
+
+    def record(self, vehicles, selected, number_plates):
+        self.recorded.extend(vehicles[i]['vehicle_id'] for i in selected)
+
+    def attach(self, vehicles):
+        pass
+
+
+class FakeANPR:
+    def __init__(self):
+        self.images = 0
+
+    async def run(self, images):
+        self.images += len(images)
+        return [[] for _ in images]
+
+
+def runner_with_streams(stream_ids, anpr=None):
+    runner = MultiStreamRunner(detector=FakeDetector(), max_batch_size=8, queue_size=8, anpr=anpr)
+    for stream_id in stream_ids:
+        tracker = FakeTracker()
+        if anpr is not None:
+            tracker.plate_reader = FakeReader()
+        runner._streams[stream_id] = _Stream(tracker, runner.queue_size)
+    return runner
+
+
+def test_track_is_classified_once_per_step_across_batched_frames():
+    runner = runner_with_streams(['a', 'b'])
+    frame = np.zeros((8, 8, 3), np.uint8)
+    for timestamp in range(3):
+        runner.submit('a', frame, float(timestamp))
+    runner.submit('b', frame, 0.0)
+
+    results = runner.step()
+
+    assert len(results) == 4
+    # Stream a: tracks 1 and 2 on the first frame only; stream b has its own tracks 1 and 2
+    assert runner._streams['a'].tracker.applied == [[1, 2], [], []]
+    assert runner._streams['b'].tracker.applied == [[1, 2]]
+    assert runner.detector.classified == 4
+
+
+def test_track_is_read_once_per_step_across_batched_frames():
+    anpr = FakeANPR()
+    runner = runner_with_streams(['a'], anpr=anpr)
+    frame = np.zeros((8, 8, 3), np.uint8)
+    for timestamp in range(3):
+        runner.submit('a', frame, float(timestamp))
+
+    runner.step()
+    runner.close()
+
+    assert runner._streams['a'].tracker.plate_reader.recorded == [1, 2]
+    assert anpr.images == 2
+
+
+def test_next_step_samples_the_tracks_again():
+    runner = runner_with_streams(['a'])
+    frame = np.zeros((8, 8, 3), np.uint8)
+    runner.submit('a', frame, 0.0)
+    runner.step()
+    runner.submit('a', frame, 1.0)
+    runner.step()
+
+    assert runner._streams['a'].tracker.applied == [[1, 2], [1, 2]]
+
+
+def batch_streams(runner):
+    return [stream_id for stream_id, *_ in runner._next_batch()]
+
+
+def test_batches_rotate_the_first_stream():
+    runner = runner_with_streams(['a', 'b', 'c'])
+    runner.max_batch_size = 2
+    frame = np.zeros((8, 8, 3), np.uint8)
+    for stream_id in 'abc':
+        for timestamp in range(4):
+            runner.submit(stream_id, frame, float(timestamp))
+
+    batches = [batch_streams(runner) for _ in range(6)]
+
+    # Every stream leads in turn, so with batches smaller than the number of streams none is starved
+    assert batches == [['a', 'b'], ['b', 'c'], ['c', 'a'], ['a', 'b'], ['b', 'c'], ['c', 'a']]
+    assert runner.pending() == 0
+
+
+def test_batch_takes_one_frame_per_stream_per_round():
+    runner = runner_with_streams(['a', 'b'])
+    frame = np.zeros((8, 8, 3), np.uint8)
+    for timestamp in range(3):
+        runner.submit('a', frame, float(timestamp))
+    runner.submit('b', frame, 0.0)
+
+    batch = runner._next_batch()
+
+    assert [(stream_id, timestamp) for stream_id, _, _, timestamp, _ in batch] == [
+        ('a', 0.0), ('b', 0.0), ('a', 1.0), ('a', 2.0)]
+
+
+def test_run_decodes_every_nth_frame(tmp_path):
+    path = str(tmp_path / 'clip.avi')
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), 10, (32, 24))
+    if not writer.isOpened():
+        pytest.skip('OpenCV cannot write MJPG video here')
+    for i in range(12):
+        writer.write(np.full((24, 32, 3), 8 * i, np.uint8))
+    writer.release()
+    runner = runner_with_streams(['a', 'b'])
+
+    results = list(runner.run({'a': path, 'b': path}, stride=5, backpressure='block'))
+
+    for stream_id in 'ab':
+        timestamps = [result.timestamp for result in results if result.stream_id == stream_id]
+        assert timestamps == pytest.approx([0.0, 0.5, 1.0])
@@ -0,0 +1,43 @@
+import numpy as np
+
+from VehicleDetectionTracker.plate_association import associate_plates, box_overlaps
+
+
+def test_containment_and_iou():
+    containment, iou = box_overlaps([[0, 0, 10, 10]], [[5, 0, 105, 100]])
+    assert containment[0, 0] == 0.5
+    assert iou[0, 0] == 50 / (100 + 10000 - 50)
+
+
+def test_plate_needs_sixty_percent_inside_the_vehicle():
+    vehicle = [[0, 0, 100, 100]]
+    # 70% and 50% of a 10 x 10 plate inside the vehicle box
+    assert associate_plates([[93, 50, 103, 60]], vehicle).tolist() == [0]
+    assert associate_plates([[95, 50, 105, 60]], vehicle).tolist() == [-1]
+    assert associate_plates([[94, 50, 104, 60]], vehicle).tolist() == [0]  # exactly 60%
+
+
+def test_each_vehicle_gets_at_most_one_plate():
+    vehicles = [[0, 0, 100, 100]]
+    plates = [[10, 10, 20, 20], [40, 40, 50, 50]]
+    # Both plates are fully inside; the higher detection score wins the tie
+    assert associate_plates(plates, vehicles, plate_scores=[0.4, 0.9]).tolist() == [-1, 0]
+
+
+def test_overlapping_vehicles_prefer_the_tighter_box():
+    # A plate on the near car, whose box lies inside the far truck's box
+    vehicles = [[0, 0, 400, 300], [100, 100, 200, 200]]
+    assert associate_plates([[140, 170, 160, 180]], vehicles).tolist() == [1]
+
+
+def test_greedy_matching_is_one_to_one():
+    vehicles = [[0, 0, 100, 100], [100, 0, 200, 100]]
+    plates = [[20, 50, 40, 60], [150, 50, 170, 60], [160, 20, 180, 30]]
+    assignment = associate_plates(plates, vehicles, plate_scores=[0.9, 0.8, 0.7])
+    assert assignment.tolist() == [0, 1, -1]
+
+
+def test_empty_inputs():
+    assert associate_plates([], [[0, 0, 10, 10]]).tolist() == []
+    assert associate_plates([[0, 0, 10, 10]], []).tolist() == [-1]
+    assert associate_plates(np.zeros((0, 4)), np.zeros((0, 4))).dtype == np.int64
@@ -0,0 +1,105 @@
+import cv2
+import numpy as np
+import pytest
+
+from VehicleDetectionTracker.preprocessing import ClassifierPreprocessor, LetterboxBatch, letterbox_into
+
+SIZES = [(224, 224), (128, 128)]
+
+# (height, width) of crops that are wide, tall, square, smaller and larger than the inputs
+CROP_SHAPES = [(7, 301), (301, 7), (13, 250), (250, 13), (97, 61), (61, 97), (33, 33), (5, 9), (9, 5),
+               (300, 401), (129, 127)]
+
+
+def original_resize_and_pad(img, size):
+    """
+    The letterbox the classifiers used before the shared preprocessing, padding with black.
+    """
+    h, w = img.shape[:2]
+    sh, sw = size
+    interp = cv2.INTER_AREA if h > sh or w > sw else cv2.INTER_CUBIC
+    aspect = w / h
+    if aspect > 1:
+        new_w = sw
+        new_h = np.round(new_w / aspect).astype(int)
+        pad_vert = (sh - new_h) / 2
+        pad_top, pad_bot = np.floor(pad_vert).astype(int), np.ceil(pad_vert).astype(int)
+        pad_left, pad_right = 0, 0
+    elif aspect < 1:
+        new_h = sh
+        new_w = np.round(new_h * aspect).astype(int)
+        pad_horz = (sw - new_w) / 2
+        pad_left, pad_right = np.floor(pad_horz).astype(int), np.ceil(pad_horz).astype(int)
+        pad_top, pad_bot = 0, 0
+    else:
+        new_h, new_w = sh, sw
+        pad_left, pad_right, pad_top, pad_bot = 0, 0, 0, 0
+    scaled_img = cv2.resize(img, (new_w, new_h), interpolation=interp)
+    return cv2.copyMakeBorder(scaled_img, pad_top, pad_bot, pad_left, pad_right,
+                              borderType=cv2.BORDER_CONSTANT, value=[0, 0, 0])
+
+
+def original_inputs(crops, size):
+    batch = np.stack([original_resize_and_pad(crop, size) for crop in crops]).astype(np.float32)
+    batch /= 127.5
+    batch -= 1.
+    return batch
+
+
+@pytest.fixture
+def crops():
+    rng = np.random.default_rng(0)
+    return [rng.integers(0, 256, shape + (3,), dtype=np.uint8) for shape in CROP_SHAPES]
+
+
+@pytest.mark.parametrize('size', SIZES)
+def test_letterbox_into_matches_original(crops, size):
+    out = np.full(size + (3,), 255, dtype=np.uint8)  # stale pixels must be cleared
+
+    for crop in crops:
+        np.testing.assert_array_equal(letterbox_into(crop, out), original_resize_and_pad(crop, size))
+
+
+def test_letterbox_into_non_contiguous_crop(crops):
+    crop = crops[4][::2, ::3]
+    out = np.empty((128, 128, 3), dtype=np.uint8)
+
+    np.testing.assert_array_equal(letterbox_into(crop, out), original_resize_and_pad(crop, (128, 128)))
+
+
+@pytest.mark.parametrize('size', SIZES)
+def test_letterbox_batch_matches_original(crops, size):
+    batch = LetterboxBatch(size, capacity=len(crops))
+
+    inputs = batch.fill(crops)
+
+    assert inputs.dtype == np.float32
+    assert inputs.shape == (len(crops),) + size + (3,)
+    np.testing.assert_allclose(inputs, original_inputs(crops, size), rtol=0, atol=1e-6)
+
+
+def test_letterbox_batch_reuse_with_fewer_crops(crops):
+    batch = LetterboxBatch((128, 128), capacity=len(crops))
+    batch.fill(crops)
+
+    inputs = batch.fill(crops[:3][::-1])
+
+    np.testing.assert_allclose(inputs, original_inputs(crops[:3][::-1], (128, 128)), rtol=0, atol=1e-6)
+
+
+def test_letterbox_batch_capacity(crops):
+    batch = LetterboxBatch((128, 128), capacity=2)
+
+    assert batch.fill([]).shape == (0, 128, 128, 3)
+    with pytest.raises(ValueError, match='capacity'):
+        batch.fill(crops[:3])
+
+
+def test_preprocessor_matches_original_for_every_size(crops):
+    preprocessor = ClassifierPreprocessor(SIZES, capacity=len(crops))
+
+    prepared = preprocessor.prepare(crops)
+
+    assert len(prepared) == len(SIZES)
+    for inputs, size in zip(prepared, SIZES):
+        np.testing.assert_allclose(inputs, original_inputs(crops, size), rtol=0, atol=1e-6)
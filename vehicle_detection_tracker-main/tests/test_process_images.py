@@ -0,0 +1,133 @@
+import json
+
+import numpy as np
+
+from VehicleDetectionTracker.VehicleDetectionTracker import VehicleDetectionTracker
+
+
+class CPUArray(np.ndarray):
+    """
+    NumPy array with the `.cpu()` of a torch tensor, enough for the ultralytics boxes API.
+    """
+
+    def cpu(self):
+        return self
+
+
+def tensor(values):
+    return np.asarray(values, dtype=np.float32).view(CPUArray)
+
+
+class FakeBoxes:
+    def __init__(self, boxes):
+        # (x, y, w, h, class, confidence) per box
+        boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 6)
+        self.xywh = tensor(boxes[:, :4])
+        self.cls = tensor(boxes[:, 4])
+        self.conf = tensor(boxes[:, 5])
+
+
+class FakeResult:
+    names = {2: 'car', 7: 'truck'}
+
+    def __init__(self, boxes):
+        self.boxes = FakeBoxes(boxes)
+
+
+class FakeModel:
+    """
+    YOLO stand-in returning scripted boxes per image and recording every predict call.
+    """
+
+    def __init__(self, boxes_per_image):
+        self.boxes_per_image = boxes_per_image
+        self.calls = []
+
+    def predict(self, images, verbose=False):
+        self.calls.append(len(images))
+        return [FakeResult(self.boxes_per_image[i]) for i in range(len(images))]
+
+    def track(self, *args, **kwargs):
+        raise AssertionError('still images must not be tracked')
+
+
+class FakeClassifier:
+    input_size = (8, 8)
+    max_batch_size = 16
+
+    def __init__(self, label):
+        self.label = label
+        self.batches = []
+
+    def predict_proba_inputs(self, batch):
+        self.batches.append(len(batch))
+        return np.ones((len(batch), 1), dtype=np.float32)
+
+    def decode_predictions(self, probs):
+        return [[{'label': self.label, 'prob': str(row[0])}] for row in probs]
+
+
+def tracker(boxes_per_image):
+    return VehicleDetectionTracker(model=FakeModel(boxes_per_image), color_classifier=FakeClassifier('red'),
+                                   model_classifier=FakeClassifier('Ford\tFocus'))
+
+
+def frames(count, height=60, width=80):
+    return [np.full((height, width, 3), 40 * (i + 1), dtype=np.uint8) for i in range(count)]
+
+
+def test_one_predict_and_one_classifier_batch_for_all_images():
+    detector = tracker([[(20, 20, 10, 10, 2, 0.9), (50, 30, 20, 10, 7, 0.8)], [], [(40, 30, 10, 10, 2, 0.7)]])
+
+    responses = detector.process_images(frames(3))
+
+    assert detector.model.calls == [3]
+    assert detector.color_classifier.batches == [3]
+    assert detector.model_classifier.batches == [3]
+    assert [response['number_of_vehicles_detected'] for response in responses] == [2, 0, 1]
+    first, second = responses[0]['detected_vehicles']
+    assert (first['vehicle_id'], first['vehicle_type']) == (1, 'car')
+    assert (second['vehicle_id'], second['vehicle_type']) == (2, 'truck')
+    assert responses[2]['detected_vehicles'][0]['vehicle_id'] == 1
+    assert json.loads(first['color_info'])[0]['label'] == 'red'
+
+
+def test_no_tracking_state_or_speed():
+    detector = tracker([[(20, 20, 10, 10, 2, 0.9)]] * 2)
+
+    for _ in range(2):
+        response = detector.process_images(frames(1))
+
+    vehicle = response[0]['detected_vehicles'][0]
+    assert 'speed_info' not in vehicle
+    assert len(detector.tracks) == 0
+    assert detector.frame_index == 0
+
+
+def test_lean_crops_are_clipped_views_of_the_frame():
+    detector = tracker([[(75, 5, 20, 20, 2, 0.9)]])
+    frame, = frames(1)
+
+    vehicle = detector.process_images([frame], lean=True)[0]['detected_vehicles'][0]
+
+    assert vehicle['vehicle_bbox'] == {'x1': 65, 'y1': 0, 'x2': 80, 'y2': 15}
+    assert vehicle['vehicle_frame'].shape == (15, 15, 3)
+    assert np.shares_memory(vehicle['vehicle_frame'], frame)
+    assert 'vehicle_frame_base64' not in vehicle
+
+
+def test_empty_input_skips_the_detector():
+    detector = tracker([])
+
+    assert detector.process_images([]) == []
+    assert detector.model.calls == []
+
+
+def test_detect_image_is_a_single_image_batch():
+    detector = tracker([[(20, 20, 10, 10, 2, 0.9)]])
+    frame, = frames(1)
+
+    response = detector.detect_image(frame, lean=True)
+
+    assert detector.model.calls == [1]
+    assert response['number_of_vehicles_detected'] == 1
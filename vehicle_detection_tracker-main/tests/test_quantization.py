@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+from VehicleDetectionTracker.quantization import split_crops
+
+
+def crops(count):
+    return [np.full((4, 4, 3), i, dtype=np.uint8) for i in range(count)]
+
+
+def ids(items):
+    return [int(item[0, 0, 0]) for item in items]
+
+
+def test_split_holds_out_share_of_crops():
+    calibration, evaluation = split_crops(crops(80), holdout=0.3)
+
+    assert len(calibration) == 56
+    assert len(evaluation) == 24
+    assert sorted(ids(calibration) + ids(evaluation)) == list(range(80))
+
+
+def test_split_is_deterministic():
+    assert ids(split_crops(crops(20))[1]) == ids(split_crops(crops(20))[1])
+    assert ids(split_crops(crops(20), seed=1)[1]) != ids(split_crops(crops(20), seed=0)[1])
+
+
+@pytest.mark.parametrize('holdout', [0.0, 0.99])
+def test_split_keeps_both_sets_non_empty(holdout):
+    calibration, evaluation = split_crops(crops(2), holdout=holdout)
+
+    assert len(calibration) == 1
+    assert len(evaluation) == 1
+
+
+def test_split_needs_two_crops():
+    with pytest.raises(ValueError):
+        split_crops(crops(1))
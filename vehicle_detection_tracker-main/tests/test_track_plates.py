@@ -0,0 +1,107 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from VehicleDetectionTracker.track_plates import TrackPlateReader, vote_plate
+
+
+def plate(text, rec_conf, det_conf=0.9):
+    return SimpleNamespace(rec_text=text, rec_conf=rec_conf, det_conf=det_conf)
+
+
+class ScriptedANPR:
+    """
+    Returns the next scripted read for every crop and counts the crops it was given.
+    """
+
+    def __init__(self, reads):
+        self.reads = list(reads)
+        self.crops = 0
+
+    async def run(self, images):
+        self.crops += len(images)
+        return [[plate(*self.reads.pop(0))] if self.reads else [] for _ in images]
+
+
+def vehicles(*track_ids):
+    return [{'vehicle_id': track_id} for track_id in track_ids]
+
+
+def crops(count):
+    return [np.zeros((8, 8, 3), np.uint8) for _ in range(count)]
+
+
+def test_vote_fixes_single_character_errors():
+    text, consensus, votes = vote_plate([('34ABC12', 0.8), ('34A8C12', 0.6), ('34ABC12', 0.7)])
+    assert text == '34ABC12'
+    assert votes == 3
+    assert consensus == pytest.approx(1.5 / 2.1)
+
+
+def test_vote_uses_the_heaviest_length_group():
+    text, _, votes = vote_plate([('34ABC1', 0.9), ('34ABC12', 0.5), ('34ABC12', 0.5)])
+    assert (text, votes) == ('34ABC12', 2)
+
+
+def test_vote_without_reads():
+    assert vote_plate([]) == (None, 0.0, 0)
+    assert vote_plate([('', 0.9)]) == (None, 0.0, 0)
+
+
+def test_one_confident_read_stops_ocr_for_the_track():
+    anpr = ScriptedANPR([('34ABC12', 0.97)])
+    reader = TrackPlateReader(anpr)
+    frame_vehicles = vehicles(1)
+    for _ in range(5):
+        reader.update_sync(frame_vehicles, crops(1))
+
+    assert anpr.crops == 1
+    assert reader.skipped_crops == 4
+    assert frame_vehicles[0]['plate_info']['recognition_text'] == '34ABC12'
+    assert frame_vehicles[0]['plate_info']['final']
+
+
+def test_agreeing_reads_finalize_by_vote():
+    anpr = ScriptedANPR([('34ABC12', 0.7), ('34A8C12', 0.5), ('34ABC12', 0.7), ('XXXXXXX', 0.9)])
+    reader = TrackPlateReader(anpr, min_votes=3, consensus=0.6)
+    frame_vehicles = vehicles(1)
+    for _ in range(6):
+        reader.update_sync(frame_vehicles, crops(1))
+
+    state = reader.get(1)
+    assert state.final and state.text == '34ABC12'
+    # Final after the third read: three votes, and the weakest position agrees by 1.4 / 1.9 >= 0.6
+    assert anpr.crops == 3
+    assert state.votes == 3
+
+
+def test_attempts_are_capped_when_nothing_is_read():
+    anpr = ScriptedANPR([])
+    reader = TrackPlateReader(anpr, max_attempts=4)
+    frame_vehicles = vehicles(1)
+    for _ in range(10):
+        reader.update_sync(frame_vehicles, crops(1))
+
+    assert anpr.crops == 4
+    assert reader.get(1).final
+    assert frame_vehicles[0]['plate_info'] is None
+
+
+def test_tracks_are_read_in_one_call_and_independently():
+    anpr = ScriptedANPR([('34ABC12', 0.99), ('06XYZ99', 0.5)])
+    reader = TrackPlateReader(anpr)
+    frame_vehicles = vehicles(1, 2)
+    reader.update_sync(frame_vehicles, crops(2))
+
+    assert reader.get(1).final and not reader.get(2).final
+    assert [vehicle['plate_info']['recognition_text'] for vehicle in frame_vehicles] == ['34ABC12', '06XYZ99']
+    reader.remove([1])
+    assert reader.get(1) is None and len(reader) == 1
+
+
+def test_empty_crops_are_not_sent():
+    anpr = ScriptedANPR([])
+    reader = TrackPlateReader(anpr)
+    reader.update_sync(vehicles(1), [np.zeros((0, 0, 3), np.uint8)])
+    assert anpr.crops == 0
@@ -0,0 +1,72 @@
+import numpy as np
+
+from VehicleDetectionTracker.track_state import RingBuffer, TrackStore
+
+
+def test_ring_buffer_keeps_the_newest_rows_in_order():
+    buffer = RingBuffer(3, 2)
+    for i in range(5):
+        buffer.append((i, 10 * i))
+
+    assert len(buffer) == 3
+    np.testing.assert_array_equal(buffer.values(), [[2, 20], [3, 30], [4, 40]])
+    np.testing.assert_array_equal(buffer.first(), [2, 20])
+    np.testing.assert_array_equal(buffer.last(), [4, 40])
+
+
+def test_ring_buffer_before_and_at_wrap():
+    buffer = RingBuffer(3, 1)
+    buffer.append(1)
+    np.testing.assert_array_equal(buffer.values(), [[1]])
+    buffer.append(2)
+    buffer.append(3)
+    np.testing.assert_array_equal(buffer.values(), [[1], [2], [3]])
+    buffer.append(4)
+    np.testing.assert_array_equal(buffer.values(), [[2], [3], [4]])
+
+
+def test_ring_buffer_values_is_a_copy_and_clear_empties():
+    buffer = RingBuffer(2, 1)
+    buffer.append(1)
+    values = buffer.values()
+    values[0] = 99
+    assert buffer.last()[0] == 1
+    buffer.clear()
+    assert len(buffer) == 0
+    assert buffer.values().shape == (0, 1)
+
+
+def test_history_per_track_is_bounded():
+    store = TrackStore(max_history=4, max_age_frames=None)
+    for frame in range(100):
+        store.update(7, frame, frame, frame / 30.0, frame)
+
+    state = store.get(7)
+    assert len(state.positions) == 4
+    np.testing.assert_array_equal(state.positions.values()[:, 0], [96, 97, 98, 99])
+    assert state.first_seen_frame == 0 and state.last_seen_frame == 99
+    # Memory depends on the number of tracks, not on how long they have lived
+    assert store.memory_bytes() == state.nbytes
+
+
+def test_evicts_tracks_unseen_for_too_many_frames():
+    store = TrackStore(max_age_frames=10)
+    store.update(1, 0, 0, 0.0, 0)
+    store.update(2, 0, 0, 0.0, 0)
+    store.update(2, 0, 0, 0.5, 15)
+
+    assert store.evict(10) == []  # exactly max_age_frames old is still kept
+    assert store.evict(11) == [1]
+    assert 1 not in store and 2 in store
+
+
+def test_evicts_tracks_unseen_for_too_many_seconds():
+    store = TrackStore(max_age_frames=None, max_age_seconds=2.0)
+    store.update(1, 0, 0, 10.0, 0)
+    store.update(2, 0, 0, 11.5, 1)
+
+    assert store.evict(2, timestamp=12.0) == []
+    assert store.evict(3, timestamp=12.5) == [1]
+    assert store.track_ids() == [2]
+    # Without a timestamp only the frame limit applies
+    assert store.evict(1000) == []
@@ -0,0 +1,72 @@
+import cv2
+import numpy as np
+import pytest
+
+from VehicleDetectionTracker.video_pipeline import VideoPipeline
+
+FPS = 10
+
+
+class RecordingTracker:
+    def process_frame(self, frame, timestamp, lean=True, annotate=False):
+        return {'level': int(frame[0, 0, 0])}
+
+
+@pytest.fixture
+def video(tmp_path):
+    # 30 frames at 10 fps; frame i is filled with 8 * i so it can be recognized after decoding
+    path = str(tmp_path / 'clip.avi')
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), FPS, (64, 48))
+    if not writer.isOpened():
+        pytest.skip('OpenCV cannot write MJPG video here')
+    for i in range(30):
+        writer.write(np.full((48, 64, 3), 8 * i, np.uint8))
+    writer.release()
+    return path
+
+
+def run(video, **options):
+    return list(VideoPipeline(RecordingTracker(), video, **options))
+
+
+def test_stride_decodes_every_nth_frame(video):
+    results = run(video, stride=4)
+    assert [result.frame_index for result in results] == [0, 4, 8, 12, 16, 20, 24, 28]
+    for result in results:
+        assert result.timestamp == pytest.approx(result.frame_index / FPS)
+        assert abs(result.response['level'] - 8 * result.frame_index) <= 4
+
+
+def test_frame_index_is_absolute_after_seeking(video):
+    results = run(video, start_time=1.0, stride=5)
+    assert [result.frame_index for result in results] == [10, 15, 20, 25]
+    assert results[0].timestamp == pytest.approx(1.0)
+
+
+def test_end_time_applies_to_skipped_frames(video, monkeypatch):
+    grabbed = []
+    video_capture = cv2.VideoCapture
+
+    class CountingCapture:
+        def __init__(self, source):
+            self.capture = video_capture(source)
+
+        def __getattr__(self, name):
+            return getattr(self.capture, name)
+
+        def grab(self):
+            grabbed.append(True)
+            return self.capture.grab()
+
+        def read(self):
+            grabbed.append(True)
+            return self.capture.read()
+
+    monkeypatch.setattr(cv2, 'VideoCapture', CountingCapture)
+    pipeline = VideoPipeline(RecordingTracker(), video, stride=7, end_time=1.5)
+    results = list(pipeline)
+
+    assert [result.frame_index for result in results] == [0, 7, 14]
+    assert pipeline.frames_decoded == 3
+    # Reading stops at the first frame past the end (frame 16 at 1.6 s), not at the next stride position
+    assert len(grabbed) == 17
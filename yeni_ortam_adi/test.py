@@ -1,9 +1,14 @@
 import cv2
 import asyncio
-import json
 import os
+import sys
 from fastanpr import FastANPR
 
+# result_log depo kök dizininde
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from result_log import JsonlWriter, completed_keys, record_key  # noqa: E402
+
 # FastANPR sınıfından bir örnek oluştur
 fast_anpr = FastANPR()
 
@@ -15,78 +20,69 @@ async def main():
         # Klasördeki diğer resim dosyalarını da buraya ekleyebilirsiniz
     ]
 
-    # Resimleri yükle
-    images = [cv2.cvtColor(cv2.imread(file), cv2.COLOR_BGR2RGB) for file in image_files]
-
-    # ANPR işlemini çalıştır
-    number_plates = await fast_anpr.run(images)
-
-    # JSON çıktısı için veri yapısını oluştur
-    output_data = {}
-
-    # Sonuçları işleme
-    for file, plates in zip(image_files, number_plates):
-        # JSON dosyasına eklemek için her resim için veri hazırlama
-        file_data = []
-        # Orijinal resmi yeniden yükle (renkli hali)
-        image = cv2.imread(file)
-
-        # Görüntüyü 500x500 olarak yeniden boyutlandır
-        target_size = (500, 500)
-        resized_image = cv2.resize(image, target_size, interpolation=cv2.INTER_AREA)
-
-        # Oranları hesapla
-        x_ratio = target_size[0] / image.shape[1]
-        y_ratio = target_size[1] / image.shape[0]
-
-        # Plakaların kutu bilgilerini incele
-        for plate in plates:
-            plate_info = {
-                "detection_bounding_box": plate.det_box,
-                "detection_confidence": plate.det_conf,
-                "recognition_text": plate.rec_text,
-                "recognition_polygon": plate.rec_poly,
-                "recognition_confidence": plate.rec_conf
-            }
-            file_data.append(plate_info)
-
-            # Plaka kutusunu çiz
-            box = plate.det_box
-            if isinstance(box, list) and len(box) == 4:
-                top_left = (int(box[0] * x_ratio), int(box[1] * y_ratio))
-                bottom_right = (int(box[2] * x_ratio), int(box[3] * y_ratio))
-                cv2.rectangle(resized_image, top_left, bottom_right, (0, 255, 0), 2)
-
-                # Tanımlı metni resim üzerine yaz
-                text = plate.rec_text
-                cv2.putText(resized_image, text, (top_left[0], top_left[1] - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.9,
-                            (0, 255, 0), 2)
-
-        # JSON çıktısına ekle
-        output_data[file] = file_data
-
-        # Yeniden boyutlandırılmış görseli göster
-        cv2.imshow('ANPR Results', resized_image)
-        cv2.waitKey(0)  # Her görselin gösterilmesi için bir tuşa basmayı bekler
-        cv2.destroyAllWindows()
-
-    # JSON dosyasının mevcut olup olmadığını kontrol et
-    json_file_path = 'anpr_results.json'
-    if not os.path.exists(json_file_path):
-        # JSON dosyası yoksa oluştur ve veriyi yaz
-        with open(json_file_path, 'w') as json_file:
-            json.dump(output_data, json_file, indent=4)
-    else:
-        # JSON dosyası varsa, mevcut veriyi yükle ve yeni veriyi ekle
-        with open(json_file_path, 'r') as json_file:
-            existing_data = json.load(json_file)
-
-        # Yeni veriyi mevcut veriye ekle
-        existing_data.update(output_data)
-
-        # Güncellenmiş veriyi JSON dosyasına yaz
-        with open(json_file_path, 'w') as json_file:
-            json.dump(existing_data, json_file, indent=4)
+    # Her resmin sonucu işlendiği anda JSONL dosyasına tek satır olarak eklenir; yarıda kalan bir
+    # çalışmanın yarım yazılmış son satırı açılışta silinir ve yeniden çalıştırıldığında daha önce
+    # yazılmış resimler atlanır, böylece aynı resim iki kez eklenmez.
+    # Eski anpr_results.json biçimine dönüştürmek için:
+    #   result_log.jsonl_to_json("anpr_results.jsonl", "anpr_results.json", key_field="filePath",
+    #                            value_field="plates")
+    jsonl_file_path = 'anpr_results.jsonl'
+    done = completed_keys(jsonl_file_path)
+    with JsonlWriter(jsonl_file_path) as log:
+        for index, file in enumerate(image_files):
+            if record_key(index, file) in done:
+                continue
+
+            # Orijinal resmi yükle (renkli hali)
+            image = cv2.imread(file)
+            if image is None:
+                log.write({"index": index, "filePath": file, "error": "Resim okunamadı"})
+                continue
+
+            # ANPR işlemini bu resim için çalıştır
+            plates = (await fast_anpr.run([cv2.cvtColor(image, cv2.COLOR_BGR2RGB)]))[0]
+
+            # JSON dosyasına eklemek için her resim için veri hazırlama
+            file_data = []
+
+            # Görüntüyü 500x500 olarak yeniden boyutlandır
+            target_size = (500, 500)
+            resized_image = cv2.resize(image, target_size, interpolation=cv2.INTER_AREA)
+
+            # Oranları hesapla
+            x_ratio = target_size[0] / image.shape[1]
+            y_ratio = target_size[1] / image.shape[0]
+
+            # Plakaların kutu bilgilerini incele
+            for plate in plates:
+                plate_info = {
+                    "detection_bounding_box": plate.det_box,
+                    "detection_confidence": plate.det_conf,
+                    "recognition_text": plate.rec_text,
+                    "recognition_polygon": plate.rec_poly,
+                    "recognition_confidence": plate.rec_conf
+                }
+                file_data.append(plate_info)
+
+                # Plaka kutusunu çiz
+                box = plate.det_box
+                if isinstance(box, list) and len(box) == 4:
+                    top_left = (int(box[0] * x_ratio), int(box[1] * y_ratio))
+                    bottom_right = (int(box[2] * x_ratio), int(box[3] * y_ratio))
+                    cv2.rectangle(resized_image, top_left, bottom_right, (0, 255, 0), 2)
+
+                    # Tanımlı metni resim üzerine yaz
+                    text = plate.rec_text
+                    cv2.putText(resized_image, text, (top_left[0], top_left[1] - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.9,
+                                (0, 255, 0), 2)
+
+            # Sonucu üretildiği anda JSONL çıktısına ekle; JsonlWriter satırı hemen diske aktarır
+            log.write({"index": index, "filePath": file, "plates": file_data})
+
+            # Yeniden boyutlandırılmış görseli göster
+            cv2.imshow('ANPR Results', resized_image)
+            cv2.waitKey(0)  # Her görselin gösterilmesi için bir tuşa basmayı bekler
+            cv2.destroyAllWindows()
 
 
 # Asenkron işlevi çalıştırın